@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Request metrics: time every query (see api.instrumentation); serializers
+        # time their own .data through MeasuredSerializerMixin
+        if getattr(settings, 'REQUEST_METRICS', True):
+            from django.db import connections
+            from django.db.backends.signals import connection_created
+            from .instrumentation import install_query_hook
+            connection_created.connect(install_query_hook)
+            for connection in connections.all(initialized_only=True):
+                install_query_hook(None, connection)
@@ -0,0 +1,281 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework.serializers import ListSerializer
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the request duration histogram
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Metrics of the request being handled in this context (None outside requests).
+# Context variables follow the request into sync_to_async threads, so queries
+# issued by async views are attributed too.
+_current = ContextVar('request_metrics', default=None)
+
+_in_list = re.compile(r'\((?:%s, )*%s\)')
+_whitespace = re.compile(r'\s+')
+
+
+def sql_shape(sql):
+    """
+    Normalizes a (parameterized) SQL statement so repeats of the same query
+    with different parameters or IN-list lengths compare equal.
+    """
+    return _whitespace.sub(' ', _in_list.sub('(...)', sql)).strip()
+
+
+class RequestMetrics:
+    """
+    What one request spent: database queries (count, time, shapes) and time
+    in serializers, collected through the hooks below.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.shapes = Counter()
+        self._serialize_depth = 0
+
+    def repeated_queries(self, threshold):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    connection.execute_wrapper() hook timing every query of the current request.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - start
+        metrics.queries += 1
+        metrics.shapes[sql_shape(sql)] += 1
+
+
+def install_query_hook(sender, connection, **kwargs):
+    """
+    connection_created receiver: every new connection reports to the
+    current request's metrics (the wrapper is a no-op outside requests).
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def measure_serialization():
+    """
+    Adds the enclosed time to the current request's serializer time.
+    Nested measurements (a serializer's .data inside another) count once.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    metrics._serialize_depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics._serialize_depth -= 1
+        if not metrics._serialize_depth:
+            metrics.serialize_time += time.perf_counter() - start
+
+
+class MeasuredListSerializer(ListSerializer):
+    """
+    ListSerializer whose .data counts towards the request's serializer time.
+    """
+
+    @property
+    def data(self):
+        with measure_serialization():
+            return super().data
+
+
+class MeasuredSerializerMixin:
+    """
+    Serializer mixin timing .data (where instances are turned into
+    primitives) with measure_serialization(). `many=True` instances get a
+    MeasuredListSerializer unless Meta names another list_serializer_class.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        meta = getattr(cls, 'Meta', None)
+        if meta is not None and not hasattr(meta, 'list_serializer_class'):
+            meta.list_serializer_class = MeasuredListSerializer
+
+    @property
+    def data(self):
+        with measure_serialization():
+            return super().data
+
+
+class MetricsRegistry:
+    """
+    Process-wide request counters and histograms, rendered in the Prometheus
+    text exposition format. Each worker process keeps its own registry.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = Counter()        # (method, route, status) -> count
+            self.durations = {}              # (method, route) -> [bucket counts..., +Inf, sum]
+            self.totals = Counter()          # (name, method, route) -> value
+            self.n_plus_one = Counter()      # (method, route) -> requests flagged
+
+    def observe(self, method, route, status, duration, metrics, response_bytes, flagged):
+        with self._lock:
+            self.requests[method, route, status] += 1
+            histogram = self.durations.setdefault((method, route), [0] * (len(DURATION_BUCKETS) + 1) + [0.0])
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    histogram[i] += 1
+            histogram[len(DURATION_BUCKETS)] += 1
+            histogram[-1] += duration
+            self.totals['db_queries', method, route] += metrics.queries
+            self.totals['db_seconds', method, route] += metrics.db_time
+            self.totals['serialize_seconds', method, route] += metrics.serialize_time
+            if response_bytes is not None:
+                self.totals['response_bytes', method, route] += response_bytes
+            if flagged:
+                self.n_plus_one[method, route] += 1
+
+    def render(self):
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        with self._lock:
+            family('http_requests_total', 'counter', 'Requests handled, by endpoint and status.')
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{_labels(method=method, route=route, status=status)} {count}')
+
+            family('http_request_duration_seconds', 'histogram', 'Wall time from the first middleware to the response.')
+            for (method, route), histogram in sorted(self.durations.items()):
+                # Bucket counts are cumulative already (see observe)
+                for bound, count in zip(DURATION_BUCKETS, histogram):
+                    lines.append(f'http_request_duration_seconds_bucket{_labels(method=method, route=route, le=bound)} {count}')
+                total = histogram[len(DURATION_BUCKETS)]
+                lines.append(f'http_request_duration_seconds_bucket{_labels(method=method, route=route, le="+Inf")} {total}')
+                lines.append(f'http_request_duration_seconds_sum{_labels(method=method, route=route)} {histogram[-1]:.6f}')
+                lines.append(f'http_request_duration_seconds_count{_labels(method=method, route=route)} {total}')
+
+            for name, kind, help_text in (
+                ('db_queries', 'counter', 'Database queries issued.'),
+                ('db_seconds', 'counter', 'Time spent executing database queries.'),
+                ('serialize_seconds', 'counter', 'Time spent in serializers.'),
+                ('response_bytes', 'counter', 'Response body bytes (streaming responses excluded).'),
+            ):
+                family(f'http_request_{name}_total', kind, help_text)
+                for (metric, method, route), value in sorted(self.totals.items()):
+                    if metric == name:
+                        value = f'{value:.6f}' if isinstance(value, float) else value
+                        lines.append(f'http_request_{name}_total{_labels(method=method, route=route)} {value}')
+
+            family('http_request_n_plus_one_total', 'counter', 'Requests that repeated one SQL statement N_PLUS_ONE_THRESHOLD+ times.')
+            for (method, route), count in sorted(self.n_plus_one.items()):
+                lines.append(f'http_request_n_plus_one_total{_labels(method=method, route=route)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+registry = MetricsRegistry()
+
+
+class RequestMetricsMiddleware:
+    """
+    Records, per endpoint (URL name), request count by status, wall time,
+    database query count/time, serializer time and response size into the
+    process registry served by metrics_view, and adds a Server-Timing
+    header. Requests that run one SQL shape N_PLUS_ONE_THRESHOLD or more
+    times are logged as likely N+1 queries. Works for sync and async views.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'REQUEST_METRICS', True)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        metrics, token, start = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        metrics, token, start = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, start)
+
+    def start(self):
+        metrics = RequestMetrics()
+        return metrics, _current.set(metrics), time.perf_counter()
+
+    def finish(self, request, response, metrics, start):
+        duration = time.perf_counter() - start
+        match = getattr(request, 'resolver_match', None)
+        route = (match.view_name or match.route) if match else 'unmatched'
+        if route == 'metrics':
+            return response
+
+        threshold = getattr(settings, 'N_PLUS_ONE_THRESHOLD', 5)
+        repeated = metrics.repeated_queries(threshold) if threshold else []
+        for shape, count in repeated:
+            logger.warning('Possible N+1 in %s %s: %s identical queries: %s', request.method, request.path, count, shape[:500])
+
+        response_bytes = None if response.streaming else len(response.content)
+        registry.observe(request.method, route, response.status_code, duration, metrics, response_bytes, bool(repeated))
+        response['Server-Timing'] = ', '.join([
+            f'total;dur={duration * 1000:.1f}',
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"',
+            f'serialize;dur={metrics.serialize_time * 1000:.1f}',
+        ])
+        return response
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. Only answers METRICS_ALLOWED_IPS.
+    """
+    if request.META.get('REMOTE_ADDR') not in getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1']):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
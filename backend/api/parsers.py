@@ -0,0 +1,24 @@
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from .renderers import FastJSONRenderer, json_backend, orjson
+
+
+class FastJSONParser(JSONParser):
+    """
+    DRF's JSONParser, parsed with orjson when it is the configured backend
+    (see api.renderers.json_backend). orjson only reads UTF-8 and always
+    rejects NaN/Infinity, so other encodings and non-strict settings use the
+    stdlib path.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if json_backend() != 'orjson' or not self.strict or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
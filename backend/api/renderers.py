@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError: # optional: the stdlib json module is used instead
+    orjson = None
+
+JSON_BACKENDS = ('auto', 'orjson', 'stdlib')
+
+LINE_SEPARATOR = '\u2028'.encode()
+PARAGRAPH_SEPARATOR = '\u2029'.encode()
+
+
+def json_backend():
+    """
+    Returns the JSON library the API renderer/parser use, 'orjson' or
+    'stdlib', from settings.JSON_BACKEND ('auto' picks orjson when it is
+    installed).
+    """
+    backend = getattr(settings, 'JSON_BACKEND', 'auto')
+    if backend not in JSON_BACKENDS:
+        raise ImproperlyConfigured(f'JSON_BACKEND must be one of {JSON_BACKENDS}, not {backend!r}')
+    if backend == 'orjson' and orjson is None:
+        raise ImproperlyConfigured('JSON_BACKEND is "orjson" but the orjson package is not installed')
+    if backend == 'auto':
+        return 'orjson' if orjson is not None else 'stdlib'
+    return backend
+
+
+_drf_default = encoders.JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    DRF's JSONRenderer, rendered with orjson when it is the configured
+    backend. Output matches the stdlib renderer: datetimes, decimals, lazy
+    strings and anything else orjson doesn't know go through DRF's encoder,
+    UUIDs render in their hyphenated form and U+2028/U+2029 are escaped.
+    Indented output (browsable API, `; indent=` media types), ASCII-only
+    output (UNICODE_JSON = False) and values orjson rejects (e.g. ints
+    beyond 64 bits) use the stdlib path. Unlike the stdlib path, NaN and
+    infinities render as null instead of raising.
+    """
+    # Non-str dict keys make orjson raise, which falls back to the stdlib
+    # path (OPT_NON_STR_KEYS would slow every dict down)
+    options = orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            json_backend() != 'orjson'
+            or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_drf_default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same strict-JavaScript-subset escaping as the stdlib renderer; the
+        # membership test is much cheaper than copying large bodies twice
+        if LINE_SEPARATOR in ret or PARAGRAPH_SEPARATOR in ret:
+            ret = ret.replace(LINE_SEPARATOR, b'\\u2028').replace(PARAGRAPH_SEPARATOR, b'\\u2029')
+        return ret
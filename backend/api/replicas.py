@@ -0,0 +1,262 @@
+import logging
+import random
+import time
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, InterfaceError, OperationalError, connections
+from django.utils.functional import SimpleLazyObject, empty
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Set on responses to writes: the client reads from the primary until it expires
+PIN_COOKIE = 'db_primary'
+
+# Read state of the safe-method request being handled (None: use the primary).
+# Like the request metrics, it follows the request into sync_to_async threads.
+_read_state = ContextVar('replica_read_state', default=None)
+
+# Replica alias -> time.monotonic() until which it is skipped after failing
+_down_until = {}
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+
+
+def _user_pin_key(pk):
+    return f'replicas:pin:user:{pk}'
+
+
+def _write_marker_key(namespace):
+    return f'replicas:written:{namespace}'
+
+
+def mark_down(alias):
+    _down_until[alias] = time.monotonic() + getattr(settings, 'REPLICA_RETRY_SECONDS', 30)
+
+
+def choose_replica():
+    """
+    A replica that accepts connections, in random order to spread the load;
+    replicas that failed recently are skipped. Falls back to the primary.
+    """
+    now = time.monotonic()
+    candidates = [alias for alias in replica_aliases() if _down_until.get(alias, 0) <= now]
+    random.shuffle(candidates)
+    for alias in candidates:
+        try:
+            connections[alias].ensure_connection()
+        except (OperationalError, InterfaceError):
+            logger.warning('Read replica %s is unavailable, skipping it', alias, exc_info=True)
+            mark_down(alias)
+            continue
+        return alias
+    return DEFAULT_DB_ALIAS
+
+
+def _known_user(request):
+    """
+    The request's user once authentication has run (DRF sets it on the
+    Django request), without triggering a session lookup ourselves.
+    """
+    user = request.__dict__.get('user')
+    if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        return None
+    return user
+
+
+class ReadState:
+    """
+    Where one safe-method request reads from. The replica is picked at the
+    first query; clients that wrote recently stay on the primary.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.primary = PIN_COOKIE in request.COOKIES
+        self.replica = None
+        self.user_checked = False
+        self.replica_failed = False
+
+    def use_primary(self):
+        self.primary = True
+
+    def alias_for_read(self):
+        if not self.primary and not self.user_checked:
+            user = _known_user(self.request)
+            if user is not None:
+                self.user_checked = True
+                self.primary = user.is_authenticated and bool(cache.get(_user_pin_key(user.pk)))
+        if self.primary:
+            return DEFAULT_DB_ALIAS
+        if self.replica is None:
+            self.replica = choose_replica()
+        return self.replica
+
+    @property
+    def on_replica(self):
+        return not self.primary and self.replica not in (None, DEFAULT_DB_ALIAS)
+
+
+class ReplicaRouter:
+    """
+    Sends reads of safe-method requests (see ReplicaMiddleware) to a
+    DATABASE_REPLICAS alias and everything else - writes, reads inside a
+    transaction, background jobs, management commands - to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _read_state.get()
+        if state is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return state.alias_for_read()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema by replication
+        return db not in replica_aliases()
+
+
+def _rebump_key(namespace):
+    return f'replicas:rebump:{namespace}'
+
+
+def note_write(namespace, version):
+    """
+    Records that `namespace` (a response cache namespace) changed, so for the
+    next REPLICA_PIN_SECONDS cache misses on it read from the primary: a
+    lagging replica would otherwise refill the cache with the old data.
+
+    The namespace's new `version` is remembered too, to be bumped once more
+    when the pin window is over (see rebump_due): that drops anything a
+    replica cached under it anyway, e.g. a read that picked up the new
+    version just before the marker was set.
+    """
+    if replica_aliases():
+        seconds = pin_seconds()
+        cache.set(_write_marker_key(namespace), True, seconds)
+        cache.set(_rebump_key(namespace), (time.time() + seconds, version), None)
+
+
+def rebump_keys(namespaces):
+    """
+    Cache keys of the pending second bumps of `namespaces`, fetched along
+    with their versions (see recipes.cache.namespace_versions).
+    """
+    if not replica_aliases():
+        return []
+    return [_rebump_key(namespace) for namespace in namespaces]
+
+
+def rebump_due(found, namespace, version):
+    """
+    True when `namespace`, still at the `version` a write left it at, is
+    past that write's pin window and so due for its second bump. Once
+    bumped the versions differ, so concurrent readers bump it at most once
+    more each and later reads not at all.
+    """
+    pending = found.get(_rebump_key(namespace))
+    return pending is not None and pending[1] == version and pending[0] <= time.time()
+
+
+def recent_write_keys(namespaces):
+    """
+    Cache keys of the note_write() markers of `namespaces`, to be fetched
+    along with their versions (see recipes.cache.namespace_versions); empty
+    when the current request isn't headed for a replica anyway.
+    """
+    state = _read_state.get()
+    if state is None or state.primary or not replica_aliases():
+        return []
+    return [_write_marker_key(namespace) for namespace in namespaces]
+
+
+def read_primary_if_written(found, keys):
+    """
+    Moves the current request to the primary if any marker in `keys` was
+    among the cache entries `found`.
+    """
+    if any(key in found for key in keys):
+        _read_state.get().use_primary()
+
+
+class ReplicaMiddleware:
+    """
+    Lets the reads of GET/HEAD/OPTIONS requests go to read replicas, with
+    read-your-writes: after a successful write, the client (by cookie, and by
+    user for token-authenticated clients) reads from the primary for
+    REPLICA_PIN_SECONDS. A safe request that fails with a database error on
+    its replica is retried once on the primary and the replica is skipped for
+    REPLICA_RETRY_SECONDS. Does nothing without DATABASE_REPLICAS.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replica_aliases():
+            return self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            return self.pin(request, self.get_response(request))
+        state = ReadState(request)
+        token = _read_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_state.reset(token)
+        if state.replica_failed:
+            response = self.get_response(request)
+        return response
+
+    async def __acall__(self, request):
+        if not replica_aliases():
+            return await self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            return self.pin(request, await self.get_response(request))
+        state = ReadState(request)
+        token = _read_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_state.reset(token)
+        if state.replica_failed:
+            response = await self.get_response(request)
+        return response
+
+    def process_exception(self, request, exception):
+        state = _read_state.get()
+        if state is not None and state.on_replica and isinstance(exception, (OperationalError, InterfaceError)):
+            logger.warning('Read replica %s failed during %s %s; retrying on the primary', state.replica, request.method, request.path)
+            mark_down(state.replica)
+            state.replica_failed = True
+        return None
+
+    def pin(self, request, response):
+        if response.status_code >= 400:
+            return response
+        seconds = pin_seconds()
+        response.set_cookie(PIN_COOKIE, '1', max_age=seconds, httponly=True, samesite='Lax')
+        user = _known_user(request)
+        if user is not None and user.is_authenticated:
+            cache.set(_user_pin_key(user.pk), True, seconds)
+        return response
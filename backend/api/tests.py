@@ -1,3 +1,272 @@
-from django.test import TestCase
+import datetime
+import time
+import uuid
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock, skipIf
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+from django.db import OperationalError, connections
+from django.db.utils import load_backend
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import BaseSerializer
+from rest_framework.test import APIClient
+from recipes.cache import bump_namespace, namespace_versions
+from recipes.models import Recipe, Tag
+from recipes.serializers import TagSerializer
+from users.models import CustomUser
+from . import replicas
+from .instrumentation import MeasuredListSerializer, RequestMetricsMiddleware, registry, sql_shape
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer, json_backend, orjson
 
-# Create your tests here.
+PAYLOAD = {
+    'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'created_at': datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+    'day': datetime.date(2024, 5, 1),
+    'price': Decimal('3.50'),
+    'label': gettext_lazy('Recipes'),
+    'main_image': 'http://localhost/media/recipe_images/soup.jpg',
+    'text': 'Crème brûlée\u2028line\u2029',
+    'nested': [{'a': 1, 'b': [1.5, None, True]}, ('tuple', 2)],
+}
+
+
+@skipIf(orjson is None, 'orjson is not installed')
+@override_settings(JSON_BACKEND='orjson')
+class FastJSONRendererTests(SimpleTestCase):
+    """
+    The orjson path renders exactly what DRF's stdlib renderer renders.
+    """
+
+    def test_matches_stdlib_renderer(self):
+        self.assertEqual(FastJSONRenderer().render(PAYLOAD), JSONRenderer().render(PAYLOAD))
+
+    def test_unsupported_values_fall_back(self):
+        data = {'big': 2 ** 70, 1: 'int key'}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_indent_uses_stdlib(self):
+        media_type = 'application/json; indent=2'
+        self.assertEqual(FastJSONRenderer().render(PAYLOAD, media_type), JSONRenderer().render(PAYLOAD, media_type))
+
+    def test_parser(self):
+        body = JSONRenderer().render(PAYLOAD)
+        self.assertEqual(FastJSONParser().parse(BytesIO(body)), JSONParser().parse(BytesIO(body)))
+        for bad in (b'{"a": ', b'{"a": NaN}'):
+            with self.assertRaises(ParseError):
+                FastJSONParser().parse(BytesIO(bad))
+
+
+class JSONBackendSettingTests(SimpleTestCase):
+
+    @override_settings(JSON_BACKEND='stdlib')
+    def test_stdlib_backend(self):
+        self.assertEqual(json_backend(), 'stdlib')
+        self.assertEqual(FastJSONRenderer().render(PAYLOAD), JSONRenderer().render(PAYLOAD))
+
+    @override_settings(JSON_BACKEND='simplejson')
+    def test_unknown_backend(self):
+        with self.assertRaises(ImproperlyConfigured):
+            json_backend()
+
+
+class JSONResponseTests(TestCase):
+    """
+    API responses are byte-identical whichever backend renders them.
+    """
+
+    def test_recipe_list_and_profile(self):
+        user = CustomUser.objects.create_user(email='cook@example.com', password='pass12345')
+        Recipe.objects.create(author=user, title='Soup', ingredients=[{'item': 'water', 'quantity': '1 l'}], instructions=['boil'])
+        client = APIClient()
+        client.force_authenticate(user)
+        for url in ('/api/recipes/recipes/?expand=author,ingredients', '/api/users/profile/'):
+            bodies = set()
+            for backend in ('stdlib', 'orjson') if orjson else ('stdlib',):
+                with override_settings(JSON_BACKEND=backend, RESPONSE_CACHE_TIMEOUT=0):
+                    response = client.get(url)
+                self.assertEqual(response.status_code, 200, url)
+                bodies.add(response.content)
+            self.assertEqual(len(bodies), 1, url)
+
+
+class RequestMetricsTests(TestCase):
+    """
+    Per-endpoint request metrics, the Prometheus endpoint and N+1 logging.
+    """
+
+    def setUp(self):
+        registry.reset()
+        cache.clear()
+        user = CustomUser.objects.create_user(email='cook@example.com', password='pass12345')
+        Recipe.objects.create(author=user, title='Soup', ingredients=[], instructions=['boil'])
+
+    def metric(self, text, line_start):
+        lines = [line for line in text.splitlines() if line.startswith(line_start)]
+        self.assertEqual(len(lines), 1, line_start)
+        return float(lines[0].rsplit(' ', 1)[1])
+
+    def test_records_endpoint_metrics(self):
+        response = self.client.get('/api/recipes/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", serialize;dur=[\d.]+')
+        self.client.get('/api/recipes/recipes/nope/')
+
+        text = self.client.get('/api/metrics/').content.decode()
+        labels = '{method="GET",route="recipe-list"'
+        self.assertEqual(self.metric(text, f'http_requests_total{labels},status="200"}}'), 1)
+        self.assertEqual(self.metric(text, f'http_requests_total{{method="GET",route="recipe-detail",status="404"}}'), 1)
+        self.assertEqual(self.metric(text, f'http_request_duration_seconds_count{labels}}}'), 1)
+        self.assertEqual(self.metric(text, f'http_request_duration_seconds_bucket{labels},le="+Inf"}}'), 1)
+        self.assertGreater(self.metric(text, f'http_request_db_queries_total{labels}}}'), 0)
+        self.assertGreater(self.metric(text, f'http_request_serialize_seconds_total{labels}}}'), 0)
+        self.assertEqual(self.metric(text, f'http_request_response_bytes_total{labels}}}'), len(response.content))
+        self.assertNotIn('route="metrics"', text)
+
+    def test_async_views_are_measured(self):
+        response = async_to_sync(AsyncClient().get)('/api/recipes/async/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+    def test_metrics_endpoint_is_local_only(self):
+        self.assertEqual(self.client.get('/api/metrics/', REMOTE_ADDR='203.0.113.9').status_code, 403)
+
+    @override_settings(N_PLUS_ONE_THRESHOLD=3)
+    def test_logs_repeated_queries(self):
+        def view(request):
+            for i in range(3):
+                Recipe.objects.filter(pk__in=[uuid.uuid4() for _ in range(i + 1)]).exists()
+            return HttpResponse('ok')
+
+        middleware = RequestMetricsMiddleware(view)
+        with self.assertLogs('api.instrumentation', 'WARNING') as logs:
+            middleware(RequestFactory().get('/n-plus-one/'))
+        self.assertIn('3 identical queries', logs.output[0])
+        self.assertIn('IN (...)', logs.output[0])
+        self.assertIn('http_request_n_plus_one_total', registry.render())
+
+    def test_serializers_measure_their_own_data(self):
+        def view(request):
+            TagSerializer(Tag.objects.all(), many=True).data
+            return HttpResponse('ok')
+
+        Tag.objects.create(name='Quick')
+        self.assertIsInstance(TagSerializer(many=True), MeasuredListSerializer)
+        # DRF itself is left alone
+        self.assertEqual(BaseSerializer.data.fget.__module__, 'rest_framework.serializers')
+        response = RequestMetricsMiddleware(view)(RequestFactory().get('/tags/'))
+        self.assertRegex(response['Server-Timing'], r'serialize;dur=[\d.]+')
+
+    def test_sql_shape(self):
+        self.assertEqual(
+            sql_shape('SELECT 1  FROM t WHERE id IN (%s, %s, %s)\n AND x = %s'),
+            'SELECT 1 FROM t WHERE id IN (...) AND x = %s',
+        )
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], JOB_QUEUE_MODE='immediate', RESPONSE_CACHE_TIMEOUT=300)
+class ReadReplicaTests(TransactionTestCase):
+    """
+    Safe-method reads go to the replica, writers are pinned to the primary
+    for a while, and a failing replica falls back to the primary. The
+    replica alias is a second connection to the test database.
+    """
+    url = '/api/recipes/recipes/'
+
+    def setUp(self):
+        cache.clear()
+        replicas._down_until.clear()
+        self.add_replica(connections['default'].settings_dict)
+        self.addCleanup(connections.__delitem__, 'replica1')
+        self.user = CustomUser.objects.create_user(email='cook@example.com', password='pass12345')
+        Recipe.objects.create(author=self.user, title='Soup', ingredients=[], instructions=['boil'])
+        cache.clear() # forget the write markers of the setup
+        self.client = APIClient()
+
+    def add_replica(self, settings_dict):
+        # Registered as a dynamic connection, which test isolation allows
+        if 'replica1' in connections._connections.__dict__:
+            connections['replica1'].close()
+        connections['replica1'] = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, 'replica1')
+
+    def get(self, client=None):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica1']) as replica:
+            response = (client or self.client).get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(primary), len(replica)
+
+    def test_reads_go_to_the_replica(self):
+        primary, replica = self.get()
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_writer_reads_own_writes_from_the_primary(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, {'title': 'Stew', 'ingredients': [], 'instructions': ['simmer']}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(replicas.PIN_COOKIE, response.cookies)
+        self.assertEqual(self.get()[1], 0)
+
+        # Token clients send no cookie; they are pinned by user
+        other_client = APIClient()
+        other_client.force_authenticate(self.user)
+        self.assertEqual(self.get(other_client)[1], 0)
+
+        # Other clients refill the response cache from the primary too, while the replica may lag
+        self.assertEqual(self.get(APIClient())[1], 0)
+        cache.clear()
+        self.assertEqual(self.get(APIClient())[0], 0)
+
+    def test_namespace_is_bumped_again_after_the_pin_window(self):
+        bump_namespace('recipes')
+        version = namespace_versions(['recipes'])
+        # Within the pin window the version holds
+        self.assertEqual(namespace_versions(['recipes']), version)
+        # Afterwards it moves on once, dropping anything a lagging replica cached under it
+        later = time.time() + replicas.pin_seconds() + 1
+        with mock.patch('api.replicas.time.time', return_value=later):
+            bumped = namespace_versions(['recipes'])
+            self.assertEqual(bumped, [version[0] + 1])
+            self.assertEqual(namespace_versions(['recipes']), bumped)
+
+    def test_failed_writes_do_not_pin(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, {'title': ''}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+
+    def test_unreachable_replica_falls_back_to_the_primary(self):
+        self.add_replica({**connections['default'].settings_dict, 'NAME': '/nonexistent/replica.sqlite3', 'ENGINE': 'django.db.backends.sqlite3'})
+        with self.assertLogs('api.replicas', 'WARNING'):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertIn('replica1', replicas._down_until)
+        # Skipped without retrying until REPLICA_RETRY_SECONDS pass
+        with self.assertNoLogs('api.replicas', 'WARNING'):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_replica_errors_are_retried_on_the_primary(self):
+        def fail(execute, sql, params, many, context):
+            raise OperationalError('replica went away')
+
+        self.client.raise_request_exception = False
+        with connections['replica1'].execute_wrapper(fail), self.assertLogs('api.replicas', 'WARNING'), \
+                self.assertLogs('django.request', 'ERROR'):
+            primary, _ = self.get()
+        self.assertGreater(primary, 0)
+        self.assertIn('replica1', replicas._down_until)
+
+    def test_router(self):
+        router = replicas.ReplicaRouter()
+        self.assertEqual(router.db_for_read(Recipe), 'default') # outside requests
+        self.assertEqual(router.db_for_write(Recipe), 'default')
+        self.assertFalse(router.allow_migrate('replica1', 'recipes'))
+        self.assertTrue(router.allow_migrate('default', 'recipes'))
@@ -1,9 +1,12 @@
 from django.urls import path, include
+from .instrumentation import metrics_view
 
 urlpatterns = [
     # Include user-related API URLs
     path('users/', include('users.urls')),
     # Include recipe-related API URLs
     path('recipes/', include('recipes.urls')),
+    # Prometheus metrics recorded by api.instrumentation.RequestMetricsMiddleware
+    path('metrics/', metrics_view, name='metrics'),
     # You can add more general API endpoints here if needed
 ]
@@ -1,3 +1,4 @@
+import copy
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -32,6 +33,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.sites', 
+    'django.contrib.postgres', # Full-text search fields/lookups (recipes.search)
     'corsheaders', 
     'rest_framework', #
     'rest_framework_simplejwt', 
@@ -41,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.instrumentation.RequestMetricsMiddleware', # first, so it times the whole stack
+    'api.replicas.ReplicaMiddleware', # routes safe-method reads to DATABASE_REPLICAS
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware', 
@@ -79,15 +83,98 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        # DB_ENGINE lets test/bench runs use e.g. django.db.backends.sqlite3 locally
+        "ENGINE": os.getenv("DB_ENGINE", "django.db.backends.postgresql"),
         "NAME": os.getenv("DB_NAME"),
         "USER": os.getenv("DB_USER"),
         "PASSWORD": os.getenv("DB_PWD"),
         "HOST": os.getenv("DB_HOST"),
         "PORT": os.getenv("DB_PORT"),
+        # Reuse a worker's connection across requests for DB_CONN_MAX_AGE seconds
+        # ('none': no limit, 0: a new connection per request) instead of paying the
+        # TCP/TLS/auth handshake on every call. DB_CONN_HEALTH_CHECKS pings a reused
+        # connection before a request's first query so a dropped one is replaced.
+        "CONN_MAX_AGE": None if os.getenv("DB_CONN_MAX_AGE", "60").lower() == "none" else int(os.getenv("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": os.getenv("DB_CONN_HEALTH_CHECKS", "True").lower() == "true",
+        "OPTIONS": {},
     }
 }
 
+# DB_POOL=true switches PostgreSQL to psycopg 3's driver-level pool (needs the
+# psycopg and psycopg-pool packages), e.g. for ASGI, where connections aren't
+# tied to one thread. Sizes are per worker process: keep
+# workers * DB_POOL_MAX_SIZE under the server's max_connections.
+# `manage.py bench_connections` measures what each mode saves per request.
+if os.getenv("DB_POOL", "False").lower() == "true" and DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql":
+    DATABASES["default"]["CONN_MAX_AGE"] = 0 # the pool replaces persistent connections
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+        "timeout": float(os.getenv("DB_POOL_TIMEOUT", 10)), # seconds to wait for a free connection
+    }
+
+# Read replicas (api.replicas): DB_REPLICA_HOSTS=host1,host2 adds the aliases
+# replica1, replica2 ... (the default database's settings with that HOST) and
+# GET/HEAD/OPTIONS requests read from them. A client that wrote reads from the
+# primary for DB_REPLICA_PIN_SECONDS; a failing replica is skipped for
+# DB_REPLICA_RETRY_SECONDS. Locally, DB_REPLICA_HOSTS=localhost gives a second
+# alias for the same database to try the routing with.
+DATABASE_REPLICAS = []
+for number, host in enumerate(filter(None, os.getenv("DB_REPLICA_HOSTS", "").split(",")), start=1):
+    DATABASES[f"replica{number}"] = {
+        **DATABASES["default"],
+        "HOST": host.strip(),
+        "OPTIONS": copy.deepcopy(DATABASES["default"]["OPTIONS"]),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica{number}")
+DATABASE_ROUTERS = ["api.replicas.ReplicaRouter"]
+REPLICA_PIN_SECONDS = int(os.getenv("DB_REPLICA_PIN_SECONDS", 10))
+REPLICA_RETRY_SECONDS = int(os.getenv("DB_REPLICA_RETRY_SECONDS", 30))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# CACHE_BACKEND selects locmem (default, per process), file, or redis (e.g. a local
+# redis-server at CACHE_LOCATION=redis://127.0.0.1:6379/1; needs the redis package).
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS.get(CACHE_BACKEND, CACHE_BACKEND),
+        'LOCATION': os.getenv('CACHE_LOCATION', {
+            'locmem': 'savor-default',
+            'file': str(BASE_DIR / '.cache'),
+            'redis': 'redis://127.0.0.1:6379/1',
+        }.get(CACHE_BACKEND, '')),
+    }
+}
+
+# Seconds a cached API response (recipes.cache) stays valid; 0 disables response caching.
+# Off by default on locmem: its namespace versions live in each worker process, so a
+# write would only invalidate the worker that handled it.
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 0 if CACHE_BACKEND == 'locmem' else 300))
+
+# Background jobs (recipes.jobs: search document refresh, image variants).
+# 'thread' runs them on JOB_THREADS in-process threads after the write commits;
+# 'database' queues them durably for `manage.py run_jobs` workers (with retries);
+# 'immediate' runs them inline.
+JOB_QUEUE_MODE = os.getenv('JOB_QUEUE_MODE', 'thread')
+JOB_THREADS = int(os.getenv('JOB_THREADS', 2))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 5))
+
+# Per-endpoint request metrics (api.instrumentation), scraped from /api/metrics/
+# by METRICS_ALLOWED_IPS. Requests repeating one SQL statement
+# N_PLUS_ONE_THRESHOLD or more times are logged as likely N+1 queries (0: off).
+REQUEST_METRICS = os.getenv('REQUEST_METRICS', 'True').lower() == 'true'
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -149,8 +236,22 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10, # Default page size for list views
+    # JSON goes through orjson when available (see JSON_BACKEND below)
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
+# JSON library for API responses/requests: 'auto' (orjson if the optional
+# orjson package is installed, else the stdlib json module), 'orjson' or 'stdlib'
+JSON_BACKEND = os.getenv('JSON_BACKEND', 'auto')
+
 # Simple JWT settings
 from datetime import timedelta
 
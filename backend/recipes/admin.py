@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Recipe, Tag, Equipment
+from .models import Recipe, Tag, Equipment, Ingredient
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
@@ -21,4 +21,9 @@ class EquipmentAdmin(admin.ModelAdmin):
     search_fields = ('name',)
     prepopulated_fields = {'slug': ('name',)}
 
+@admin.register(Ingredient)
+class IngredientAdmin(admin.ModelAdmin):
+    list_display = ('name', 'created_at')
+    search_fields = ('name',)
+
 # Remove unregistering of Category if you had it, as the model is gone
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
+
+    def ready(self):
+        # Connect the search document, ingredient index, recipe counter,
+        # facet count, image variant and response cache signals
+        from . import cache, counters, facets, images, ingredients, search  # noqa: F401
@@ -0,0 +1,135 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.http import HttpResponse
+from django.views import View
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.request import Request
+from api.renderers import FastJSONRenderer
+from .cache import _acount, anamespace_versions, response_cache_key
+from .conditional import acached_etag, detail_etag, list_etag, not_modified_response
+from .pagination import apaginate_page_number
+from .readers import values_reader
+from .views import EquipmentViewSet, RecipeViewSet, TagViewSet
+
+
+class AsyncReadView(View):
+    """
+    Async-native `list` / `retrieve` for a read-only DRF viewset, for ASGI
+    deployments where a request should not tie up a worker thread while it
+    waits on the database. DRF views are sync-only, so this is a plain
+    Django async view that reuses the viewset for everything that does not
+    touch the database (filters, search, ordering, ?fields= / ?expand=,
+    pagination links) and does the I/O itself with the async ORM and cache
+    APIs: ETag validator, COUNT, the page of .values() rows and the
+    through-table reads of recipes.readers. The response body matches the
+    sync endpoint's.
+
+    Requests are served anonymously (they are read-only and public).
+    Viewsets whose serializer has no values reader fall back to the sync
+    viewset, run in a thread.
+    """
+    viewset_class = None
+    action = 'list'
+    renderer_class = FastJSONRenderer
+
+    async def get(self, request, *args, **kwargs):
+        viewset = self.initialize_viewset(request, kwargs)
+        get_selection = getattr(viewset, 'get_field_selection', None)
+        reader = values_reader(viewset.get_serializer_class(), get_selection() if get_selection else None)
+        if reader is None:
+            view = self.viewset_class.as_view({'get': self.action})
+            response = await sync_to_async(view)(request, *args, **kwargs)
+            return await sync_to_async(response.render)()
+        try:
+            return await self.respond(viewset, reader)
+        except APIException as exc:
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            return self.render(viewset.request, data, status=exc.status_code)
+
+    def initialize_viewset(self, request, kwargs):
+        drf_request = Request(request, parsers=[], authenticators=[])
+        drf_request.accepted_renderer = self.renderer_class()
+        drf_request.accepted_media_type = self.renderer_class.media_type
+        viewset = self.viewset_class(request=drf_request, args=(), kwargs=kwargs, action=self.action, format_kwarg=None)
+        viewset.headers = {}
+        return viewset
+
+    async def respond(self, viewset, reader):
+        request = viewset.request
+        queryset = viewset.filter_queryset(viewset.get_queryset())
+        if self.action == 'retrieve':
+            lookup_url_kwarg = viewset.lookup_url_kwarg or viewset.lookup_field
+            queryset = queryset.filter(**{viewset.lookup_field: viewset.kwargs[lookup_url_kwarg]})
+        versions = await anamespace_versions(getattr(viewset, 'cache_namespaces', ()))
+
+        # Conditional GET, validated like recipes.conditional.ConditionalGetMixin
+        validator = queryset.order_by().prefetch_related(None)
+
+        async def compute():
+            if self.action == 'retrieve':
+                updated_at = await validator.values_list('updated_at', flat=True).afirst()
+                return None if updated_at is None else detail_etag(request, versions, updated_at)
+            aggregate = await validator.aaggregate(last_modified=Max('updated_at'))
+            return list_etag(request, versions, aggregate['last_modified'])
+
+        etag = await acached_etag(request, viewset.cache_namespaces, self.action, versions, compute)
+        if etag is None:
+            raise NotFound()
+        not_modified = not_modified_response(request._request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        timeout = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 0)
+        key = response_cache_key(request, viewset.cache_namespaces, self.action, versions) if timeout else None
+        data = await cache.aget(key) if key else None
+        if data is not None:
+            await _acount('hits')
+            status = 'HIT'
+        else:
+            if key:
+                await _acount('misses')
+            status = 'MISS'
+            data = await self.build_data(viewset, reader, queryset)
+            if key:
+                await cache.aset(key, data, timeout)
+
+        response = self.render(request, data)
+        response['ETag'] = etag
+        if key:
+            response['X-Cache'] = status
+        return response
+
+    async def build_data(self, viewset, reader, queryset):
+        request = viewset.request
+        if self.action == 'retrieve':
+            rows = [row async for row in reader.values(queryset)[:1]]
+            return (await reader.arender(rows, request))[0]
+
+        ordering = [name.lstrip('-') for name in queryset.query.order_by if isinstance(name, str)]
+        rows = reader.values(queryset, *ordering)
+        paginator = viewset.paginator
+        if paginator is None:
+            return await reader.arender([row async for row in rows], request)
+        if hasattr(paginator, 'apaginate_queryset'):
+            page = await paginator.apaginate_queryset(rows, request, viewset)
+        else:
+            page = await apaginate_page_number(paginator, rows, request)
+        if page is None:
+            return await reader.arender([row async for row in rows], request)
+        return paginator.get_paginated_response(await reader.arender(page, request)).data
+
+    def render(self, request, data, status=200):
+        renderer = self.renderer_class()
+        return HttpResponse(
+            renderer.render(data, renderer.media_type, {'request': request}),
+            status=status,
+            content_type=renderer.media_type,
+        )
+
+
+recipe_list = AsyncReadView.as_view(viewset_class=RecipeViewSet, action='list')
+recipe_detail = AsyncReadView.as_view(viewset_class=RecipeViewSet, action='retrieve')
+tag_list = AsyncReadView.as_view(viewset_class=TagViewSet, action='list')
+equipment_list = AsyncReadView.as_view(viewset_class=EquipmentViewSet, action='list')
@@ -0,0 +1,200 @@
+import hashlib
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.response import Response
+from api.replicas import note_write, read_primary_if_written, rebump_due, rebump_keys, recent_write_keys
+from users.models import CustomUser
+from .models import Recipe, Tag, Equipment
+
+KEY_PREFIX = 'respcache'
+
+# Which cache namespace each model's writes invalidate
+MODEL_NAMESPACES = {
+    Recipe: 'recipes',
+    Tag: 'tags',
+    Equipment: 'equipment',
+    CustomUser: 'users',
+}
+
+
+def _version_key(namespace):
+    return f'{KEY_PREFIX}:version:{namespace}'
+
+
+def _incr_version(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
+        return 2
+
+
+async def _aincr_version(key):
+    try:
+        return await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, 2, timeout=None)
+        return 2
+
+
+def namespace_versions(namespaces):
+    """
+    Returns the current version of each namespace (one cache round trip).
+    Missing versions start at 1. Requests served by a read replica switch to
+    the primary here if a namespace was written moments ago, and a namespace
+    whose replica pin window just ended is bumped once more (see api.replicas).
+    """
+    keys = [_version_key(namespace) for namespace in namespaces]
+    markers = recent_write_keys(namespaces)
+    found = cache.get_many(keys + markers + rebump_keys(namespaces))
+    read_primary_if_written(found, markers)
+    missing = {key: 1 for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    for namespace, key in zip(namespaces, keys):
+        if rebump_due(found, namespace, found[key]):
+            found[key] = _incr_version(key)
+    return [found[key] for key in keys]
+
+
+async def anamespace_versions(namespaces):
+    """
+    namespace_versions() for async views.
+    """
+    keys = [_version_key(namespace) for namespace in namespaces]
+    markers = recent_write_keys(namespaces)
+    found = await cache.aget_many(keys + markers + rebump_keys(namespaces))
+    read_primary_if_written(found, markers)
+    missing = {key: 1 for key in keys if key not in found}
+    if missing:
+        await cache.aset_many(missing, timeout=None)
+        found.update(missing)
+    for namespace, key in zip(namespaces, keys):
+        if rebump_due(found, namespace, found[key]):
+            found[key] = await _aincr_version(key)
+    return [found[key] for key in keys]
+
+
+def bump_namespace(namespace):
+    """
+    Invalidates every cached response depending on `namespace` by moving its
+    version on; stale entries are never read again and simply expire.
+    """
+    note_write(namespace, _incr_version(_version_key(namespace)))
+
+
+def bump_namespace_on_commit(namespace, using='default'):
+    """
+    bump_namespace() once the current transaction on `using` commits (right
+    away outside one). Bumping earlier would let a concurrent reader cache
+    the pre-commit rows under the new version.
+    """
+    transaction.on_commit(lambda: bump_namespace(namespace), using=using)
+
+
+def _count(name):
+    key = f'{KEY_PREFIX}:stats:{name}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+async def _acount(name):
+    key = f'{KEY_PREFIX}:stats:{name}'
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, 1, timeout=None)
+
+
+def response_cache_stats():
+    """
+    Returns the shared hit/miss counters, e.g. {'hits': 120, 'misses': 8}.
+    """
+    keys = {name: f'{KEY_PREFIX}:stats:{name}' for name in ('hits', 'misses')}
+    values = cache.get_many(list(keys.values()))
+    return {name: values.get(key, 0) for name, key in keys.items()}
+
+
+def response_cache_key(request, namespaces, action, versions=None):
+    """
+    Builds the cache key for a read request: host + path, the query params
+    sorted (so ?a=1&b=2 and ?b=2&a=1 share an entry), the auth scope
+    (anonymous or the user's id) and the versions of every namespace the
+    response depends on (looked up unless `versions` is given).
+    """
+    params = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+    user = getattr(request, 'user', None)
+    scope = f'user:{user.pk}' if user is not None and user.is_authenticated else 'anon'
+    raw = '|'.join([request.get_host(), request.path, urlencode(params, doseq=True), scope])
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    if versions is None:
+        versions = namespace_versions(namespaces)
+    versions = '.'.join(str(version) for version in versions)
+    return f'{KEY_PREFIX}:{action}:{versions}:{digest}'
+
+
+class CachedResponseMixin:
+    """
+    Caches the serialized data of `list` and `retrieve` responses.
+
+    `cache_namespaces` names the data a response is built from (its own
+    model plus anything nested in the serializer); a write to any of them
+    bumps that namespace's version and with it every dependent key.
+    Responses carry `X-Cache: HIT` or `X-Cache: MISS`.
+    """
+    cache_namespaces = ()
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        timeout = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 0)
+        if not timeout or request.method not in ('GET', 'HEAD'):
+            return handler(request, *args, **kwargs)
+
+        key = response_cache_key(request, self.cache_namespaces, self.action)
+        data = cache.get(key)
+        if data is not None:
+            _count('hits')
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        _count('misses')
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, timeout)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_response_cache(sender, raw=False, using='default', **kwargs):
+    """
+    Bumps the namespace of any cached model that was saved or deleted, once
+    the write commits.
+    """
+    namespace = MODEL_NAMESPACES.get(sender)
+    if namespace and not raw:
+        bump_namespace_on_commit(namespace, using=using)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.equipment.through)
+def invalidate_response_cache_m2m(sender, action, using='default', **kwargs):
+    """
+    (Un)assigning tags or equipment changes the embedded recipe data.
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_namespace_on_commit('recipes', using=using)
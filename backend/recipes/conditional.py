@@ -0,0 +1,151 @@
+import hashlib
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from .cache import namespace_versions, response_cache_key
+
+
+def _etag(*parts):
+    return quote_etag(hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest())
+
+
+def validator_parts(request, versions):
+    """
+    The request-dependent part of an ETag: path, normalized query params,
+    negotiated media type and the response-cache namespace versions.
+    """
+    params = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+    return [request.path, urlencode(params, doseq=True), request.accepted_media_type, *versions]
+
+
+def list_etag(request, versions, last_modified):
+    return _etag(*validator_parts(request, versions), last_modified)
+
+
+def detail_etag(request, versions, updated_at):
+    return _etag(*validator_parts(request, versions), updated_at.isoformat())
+
+
+def _validator_cache_key(request, namespaces, action, versions):
+    timeout = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 0)
+    if not timeout or request.method not in ('GET', 'HEAD'):
+        return None, 0
+    return response_cache_key(request, namespaces, f'{action}-etag', versions), timeout
+
+
+def cached_etag(request, namespaces, action, versions, compute):
+    """
+    The ETag of a read, kept in the response cache next to the body (under
+    the same namespace versions) so cache hits and 304s need no validator
+    query. `compute()` queries it on a miss; None (no such object) is not
+    cached. Without response caching every call computes.
+    """
+    key, timeout = _validator_cache_key(request, namespaces, action, versions)
+    etag = cache.get(key) if key else None
+    if etag is None:
+        etag = compute()
+        if key and etag is not None:
+            cache.set(key, etag, timeout)
+    return etag
+
+
+async def acached_etag(request, namespaces, action, versions, compute):
+    """
+    cached_etag() for async views; `compute` is a coroutine function.
+    """
+    key, timeout = _validator_cache_key(request, namespaces, action, versions)
+    etag = await cache.aget(key) if key else None
+    if etag is None:
+        etag = await compute()
+        if key and etag is not None:
+            await cache.aset(key, etag, timeout)
+    return etag
+
+
+def not_modified_response(request, etag):
+    """
+    The 304 response when the request's If-None-Match matches `etag`, else
+    None. Shared by ConditionalGetMixin and the async views.
+
+    No Last-Modified is sent or checked: updated_at doesn't move when tags,
+    equipment, the author's profile or image variants change, so an
+    If-Modified-Since check would return 304 for changed representations.
+    """
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response['ETag'] = etag
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Strong ETags for `list`/`retrieve`, checked before anything is serialized.
+
+    The validator comes from one indexed query: MAX(updated_at) over the
+    filtered queryset, or for a detail view the object's updated_at fetched
+    by its lookup field. It is combined with the view's response-cache
+    namespace versions (see recipes.cache), so deletions and edits to
+    embedded tags/equipment/authors that don't touch updated_at still change
+    the ETag. A matching If-None-Match short-circuits with 304. With response
+    caching on, the ETag is cached alongside the body (cached_etag()), so
+    repeat reads skip the validator query.
+    """
+    last_modified_field = 'updated_at'
+
+    def _namespaces(self):
+        return getattr(self, 'cache_namespaces', ())
+
+    def _versions(self):
+        return namespace_versions(self._namespaces())
+
+    def _validator_queryset(self):
+        # Only the timestamp column is read; drop ordering and prefetches
+        return self.filter_queryset(self.get_queryset()).order_by().prefetch_related(None)
+
+    def _conditional(self, request, handler, etag, *args, **kwargs):
+        not_modified = not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().list(request, *args, **kwargs)
+        # Versions first: that lookup also decides whether reads may use a replica (api.replicas)
+        versions = self._versions()
+
+        def compute():
+            last_modified = self._validator_queryset().aggregate(
+                last_modified=Max(self.last_modified_field),
+            )['last_modified']
+            return list_etag(request, versions, last_modified)
+
+        etag = cached_etag(request, self._namespaces(), self.action, versions, compute)
+        return self._conditional(request, super().list, etag, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().retrieve(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        versions = self._versions()
+
+        def compute():
+            updated_at = (
+                self._validator_queryset()
+                .filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+                .values_list(self.last_modified_field, flat=True)
+                .first()
+            )
+            return None if updated_at is None else detail_etag(request, versions, updated_at)
+
+        etag = cached_etag(request, self._namespaces(), self.action, versions, compute)
+        if etag is None:
+            # Let the regular retrieve produce the 404
+            return super().retrieve(request, *args, **kwargs)
+        return self._conditional(request, super().retrieve, etag, *args, **kwargs)
@@ -0,0 +1,80 @@
+from collections import Counter
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from users.models import CustomUser
+from .models import Recipe
+
+
+def adjust_recipe_counts(deltas, using='default'):
+    """
+    Applies {author_id: delta} to CustomUser.recipe_count with one
+    `UPDATE ... SET recipe_count = recipe_count + delta` per distinct delta,
+    so concurrent writers never overwrite each other's increments.
+    Decrements stop at zero; recount_recipe_counts() repairs any drift.
+    """
+    by_delta = {}
+    for author_id, delta in deltas.items():
+        if author_id is not None and delta:
+            by_delta.setdefault(delta, []).append(author_id)
+    for delta, author_ids in by_delta.items():
+        CustomUser.objects.using(using).filter(pk__in=author_ids).update(
+            recipe_count=Greatest(F('recipe_count') + delta, Value(0)),
+        )
+
+
+def count_new_recipes(recipes, using='default'):
+    """
+    Counts bulk_create()d recipes (which send no post_save) towards their authors.
+    """
+    adjust_recipe_counts(Counter(recipe.author_id for recipe in recipes), using=using)
+
+
+def actual_recipe_count():
+    return Coalesce(
+        Subquery(
+            Recipe.objects.filter(author=OuterRef('pk')).order_by()
+            .values('author').annotate(total=Count('pk')).values('total')
+        ),
+        Value(0),
+    )
+
+
+def recount_recipe_counts(using='default'):
+    """
+    Rewrites recipe_count for every user whose stored value has drifted from
+    the real number of recipes, in one set-based UPDATE. Returns the number
+    of users fixed.
+    """
+    return (
+        CustomUser.objects.using(using)
+        .alias(actual=actual_recipe_count())
+        .exclude(recipe_count=F('actual'))
+        .update(recipe_count=actual_recipe_count())
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def post_save_recipe_count(sender, instance, created, raw=False, using='default', update_fields=None, **kwargs):
+    """
+    Counts a new recipe towards its author and moves it between authors
+    when it is reassigned.
+    """
+    if raw:
+        return
+    if created:
+        adjust_recipe_counts({instance.author_id: 1}, using=using)
+        return
+    if update_fields is not None and 'author' not in update_fields:
+        return
+    previous = instance.initial_value('author')
+    if previous is not None and previous != instance.author_id:
+        adjust_recipe_counts({previous: -1, instance.author_id: 1}, using=using)
+
+
+@receiver(post_delete, sender=Recipe)
+def post_delete_recipe_count(sender, instance, using='default', **kwargs):
+    # The stored author, even if the instance was reassigned but not saved
+    author_id = instance.initial_value('author') or instance.author_id
+    adjust_recipe_counts({author_id: -1}, using=using)
@@ -0,0 +1,138 @@
+import csv
+import json
+from itertools import islice
+from django.db.models import F
+from rest_framework.renderers import BaseRenderer
+from api.renderers import FastJSONRenderer
+from .models import Recipe
+
+# Recipes fetched (and tags/equipment looked up) per round trip
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FIELDS = [
+    'id', 'slug', 'title', 'description', 'ingredients', 'instructions',
+    'prep_time_minutes', 'cook_time_minutes', 'servings', 'difficulty',
+    'created_at', 'updated_at',
+]
+
+# Header names import_recipes understands, so a CSV export can be re-imported
+CSV_HEADER = [
+    'id', 'slug', 'title', 'description', 'author', 'ingredients', 'ingredients_quantity',
+    'instructions', 'prep_time_minutes', 'cook_time_minutes', 'servings', 'difficulty',
+    'tags', 'equipment', 'created_at', 'updated_at',
+]
+
+
+def _related_names(field_name, recipe_ids):
+    """
+    Returns {recipe_id: [name, ...]} for one M2M field, in name order.
+    """
+    through = Recipe._meta.get_field(field_name).remote_field.through
+    target = Recipe._meta.get_field(field_name).m2m_reverse_field_name()
+    names = {}
+    rows = (
+        through.objects.filter(recipe_id__in=recipe_ids)
+        .order_by(f'{target}__name')
+        .values_list('recipe_id', f'{target}__name')
+    )
+    for recipe_id, name in rows:
+        names.setdefault(recipe_id, []).append(name)
+    return names
+
+
+def iter_export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields one plain dict per recipe in `queryset`, streaming it with
+    .values().iterator(chunk_size) (a server-side cursor on PostgreSQL) and
+    looking up tag and equipment names once per chunk, so memory stays flat
+    however many recipes are exported.
+    """
+    rows = (
+        queryset.prefetch_related(None)
+        .values(*EXPORT_FIELDS, author_email=F('author__email'))
+        .iterator(chunk_size=chunk_size)
+    )
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        ids = [row['id'] for row in chunk]
+        tags = _related_names('tags', ids)
+        equipment = _related_names('equipment', ids)
+        for row in chunk:
+            row['tags'] = tags.get(row['id'], [])
+            row['equipment'] = equipment.get(row['id'], [])
+            yield row
+
+
+def iter_ndjson(rows):
+    """
+    Encodes rows as newline-delimited JSON (one object per line).
+    """
+    renderer = FastJSONRenderer()
+    for row in rows:
+        yield renderer.render(row) + b'\n'
+
+
+def _ingredient_part(ingredient, key):
+    if isinstance(ingredient, dict):
+        return ingredient.get(key) or ''
+    return str(ingredient) if key == 'item' else ''
+
+
+class _Echo:
+    """
+    File-like object whose write() returns the value, for csv.writer.
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    """
+    Encodes rows as CSV with a header line. List cells are JSON arrays and
+    ingredient quantities get their own column, matching import_recipes.
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADER).encode()
+    for row in rows:
+        ingredients = row['ingredients'] or []
+        yield writer.writerow([
+            row['id'], row['slug'], row['title'], row['description'] or '', row['author_email'],
+            json.dumps([_ingredient_part(item, 'item') for item in ingredients], ensure_ascii=False),
+            json.dumps([_ingredient_part(item, 'quantity') for item in ingredients], ensure_ascii=False),
+            json.dumps(row['instructions'] or [], ensure_ascii=False),
+            row['prep_time_minutes'], row['cook_time_minutes'], row['servings'], row['difficulty'],
+            json.dumps(row['tags'], ensure_ascii=False),
+            json.dumps(row['equipment'], ensure_ascii=False),
+            row['created_at'].isoformat(), row['updated_at'].isoformat(),
+        ]).encode()
+
+
+EXPORT_ENCODERS = {
+    'ndjson': iter_ndjson,
+    'csv': iter_csv,
+}
+
+
+class ExportRenderer(BaseRenderer):
+    """
+    Lets content negotiation (Accept header or ?format=) pick an export
+    format. The export body itself is streamed by the view; this renderer
+    only renders error responses, as JSON.
+    """
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return FastJSONRenderer().render(data)
+
+
+class NDJSONExportRenderer(ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class CSVExportRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
@@ -0,0 +1,261 @@
+import uuid
+from collections import Counter
+from django.db import transaction
+from django.db.models import Case, CharField, Count, F, Q, Value, When
+from django.db.models.functions import Cast, Coalesce, Greatest
+from django.db.models.lookups import LessThan
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from .models import FacetCount, Recipe, Tag
+
+# (bucket, exclusive upper bound of prep + cook minutes); the last bucket is open-ended
+TIME_BUCKETS = [('under-15', 15), ('15-30', 30), ('30-60', 60), ('60-plus', None)]
+
+# Columns that feed the difficulty and time facets; saving anything else skips the update
+FACET_SOURCE_FIELDS = {'difficulty', 'prep_time_minutes', 'cook_time_minutes'}
+
+
+def tag_value(tag_id):
+    """
+    FacetCount.value of a tag: its id in canonical str(uuid) form (SQLite
+    hands UUIDs back without dashes).
+    """
+    return str(uuid.UUID(str(tag_id)))
+
+
+def time_bucket(prep_time_minutes, cook_time_minutes):
+    """
+    The TIME_BUCKETS name for a recipe's total time, or None when neither
+    time is known. Mirrors time_bucket_expression().
+    """
+    if prep_time_minutes is None and cook_time_minutes is None:
+        return None
+    total = (prep_time_minutes or 0) + (cook_time_minutes or 0)
+    for bucket, limit in TIME_BUCKETS:
+        if limit is None or total < limit:
+            return bucket
+
+
+def time_bucket_expression():
+    """
+    time_bucket() as a SQL expression over the recipe's columns.
+    """
+    total = Coalesce(F('prep_time_minutes'), Value(0)) + Coalesce(F('cook_time_minutes'), Value(0))
+    return Case(
+        When(prep_time_minutes__isnull=True, cook_time_minutes__isnull=True, then=Value(None)),
+        *[When(LessThan(total, limit), then=Value(bucket)) for bucket, limit in TIME_BUCKETS if limit is not None],
+        default=Value(TIME_BUCKETS[-1][0]),
+        output_field=CharField(),
+    )
+
+
+def facet_counts(queryset):
+    """
+    Counts the recipes of `queryset` per facet value, as a Counter keyed by
+    (facet, value), in a single query: the recipes grouped by difficulty and
+    time bucket, UNION ALL their tag links grouped by tag.
+    """
+    recipe_ids = queryset.order_by().values('pk')
+    by_recipe = (
+        Recipe.objects.using(queryset.db).filter(pk__in=recipe_ids).order_by()
+        .values(
+            difficulty_value=F('difficulty'),
+            time_value=time_bucket_expression(),
+            tag_value=Value(None, output_field=CharField()),
+        )
+        .annotate(total=Count('pk'))
+    )
+    by_tag = (
+        Recipe.tags.through.objects.using(queryset.db).filter(recipe_id__in=recipe_ids).order_by()
+        .values(
+            difficulty_value=Value(None, output_field=CharField()),
+            time_value=Value(None, output_field=CharField()),
+            tag_value=Cast('tag_id', CharField()),
+        )
+        .annotate(total=Count('pk'))
+    )
+    counts = Counter()
+    for row in by_recipe.union(by_tag, all=True).order_by():
+        if row['tag_value'] is not None:
+            counts[FacetCount.TAG, tag_value(row['tag_value'])] += row['total']
+            continue
+        counts[FacetCount.DIFFICULTY, row['difficulty_value']] += row['total']
+        if row['time_value'] is not None:
+            counts[FacetCount.TIME, row['time_value']] += row['total']
+    return counts
+
+
+def stored_facet_counts(using=None):
+    """
+    The facet counts of all recipes, read from the FacetCount table
+    (from the database the router picks unless `using` is given).
+    """
+    return Counter({
+        (facet, value): count
+        for facet, value, count in FacetCount.objects.using(using).filter(count__gt=0).values_list('facet', 'value', 'count')
+    })
+
+
+def facet_summary(counts, using=None):
+    """
+    Renders facet counts for the API: tags by descending count (with their
+    slug and name), difficulties and time buckets in their natural order.
+    """
+    tag_ids = [value for facet, value in counts if facet == FacetCount.TAG]
+    tags = Tag.objects.using(using).filter(pk__in=tag_ids).values('pk', 'slug', 'name') if tag_ids else []
+    return {
+        'count': sum(counts[FacetCount.DIFFICULTY, value] for value, _ in Recipe.difficulty_choices),
+        'tags': sorted(
+            (
+                {'slug': tag['slug'], 'name': tag['name'], 'count': counts[FacetCount.TAG, tag_value(tag['pk'])]}
+                for tag in tags if counts[FacetCount.TAG, tag_value(tag['pk'])]
+            ),
+            key=lambda tag: (-tag['count'], tag['name']),
+        ),
+        'difficulty': [{'value': value, 'count': counts[FacetCount.DIFFICULTY, value]} for value, _ in Recipe.difficulty_choices],
+        'time': [{'value': bucket, 'count': counts[FacetCount.TIME, bucket]} for bucket, _ in TIME_BUCKETS],
+    }
+
+
+def _keys_filter(keys):
+    by_facet = {}
+    for facet, value in keys:
+        by_facet.setdefault(facet, []).append(value)
+    condition = Q()
+    for facet, values in by_facet.items():
+        condition |= Q(facet=facet, value__in=values)
+    return condition
+
+
+def adjust_facet_counts(deltas, using='default'):
+    """
+    Applies {(facet, value): delta} to FacetCount with a single
+    `UPDATE ... SET count = count + CASE ... END` (after inserting any
+    missing rows), so concurrent writers never overwrite each other's
+    increments. Decrements stop at zero; recount_facet_counts()
+    repairs any drift.
+    """
+    by_delta = {}
+    for key, delta in deltas.items():
+        if key[1] is not None and delta:
+            by_delta.setdefault(delta, []).append(key)
+    if not by_delta:
+        return
+    missing = [FacetCount(facet=facet, value=value) for delta, keys in by_delta.items() if delta > 0 for facet, value in keys]
+    if missing:
+        FacetCount.objects.using(using).bulk_create(missing, ignore_conflicts=True)
+    change = Case(*[When(_keys_filter(keys), then=Value(delta)) for delta, keys in by_delta.items()], default=Value(0))
+    FacetCount.objects.using(using).filter(_keys_filter([key for keys in by_delta.values() for key in keys])).update(
+        count=Greatest(F('count') + change, Value(0)),
+    )
+
+
+def count_new_recipe_facets(recipes, using='default'):
+    """
+    Counts bulk_create()d recipes (which send no signals) and their tag links
+    towards the facets. Call it once the tag links are inserted.
+    """
+    adjust_facet_counts(facet_counts(Recipe.objects.using(using).filter(pk__in=[recipe.pk for recipe in recipes])), using=using)
+
+
+def recount_facet_counts(using='default'):
+    """
+    Rewrites the FacetCount rows that have drifted from the real counts.
+    The stored rows are locked first (on PostgreSQL) so concurrent writers
+    wait instead of being overwritten. Returns the number of rows fixed.
+    """
+    with transaction.atomic(using=using):
+        stored = {
+            (row.facet, row.value): row
+            for row in FacetCount.objects.using(using).select_for_update()
+        }
+        actual = facet_counts(Recipe.objects.using(using))
+        changed = []
+        for key, row in stored.items():
+            if row.count != actual.get(key, 0):
+                row.count = actual.get(key, 0)
+                changed.append(row)
+        created = [FacetCount(facet=facet, value=value, count=count) for (facet, value), count in actual.items() if (facet, value) not in stored]
+        FacetCount.objects.using(using).bulk_update(changed, ['count'])
+        FacetCount.objects.using(using).bulk_create(created)
+    return len(changed) + len(created)
+
+
+def _stored_value(instance, field_name):
+    # The value the row holds in the database (the current one if never loaded)
+    return getattr(instance, '_loaded_values', {}).get(field_name, getattr(instance, field_name))
+
+
+def _scalar_facets(difficulty, prep_time_minutes, cook_time_minutes):
+    return Counter({
+        (FacetCount.DIFFICULTY, difficulty): 1,
+        (FacetCount.TIME, time_bucket(prep_time_minutes, cook_time_minutes)): 1,
+    })
+
+
+@receiver(post_save, sender=Recipe)
+def post_save_recipe_facets(sender, instance, created, raw=False, using='default', update_fields=None, **kwargs):
+    """
+    Counts a new recipe's difficulty and time bucket, and moves an edited
+    recipe between them.
+    """
+    if raw:
+        return
+    if update_fields is not None and not FACET_SOURCE_FIELDS.intersection(update_fields):
+        return
+    deltas = _scalar_facets(instance.difficulty, instance.prep_time_minutes, instance.cook_time_minutes)
+    if not created:
+        deltas.subtract(_scalar_facets(*(_stored_value(instance, name) for name in ('difficulty', 'prep_time_minutes', 'cook_time_minutes'))))
+    adjust_facet_counts(deltas, using=using)
+
+
+@receiver(pre_delete, sender=Recipe)
+def pre_delete_recipe_facets(sender, instance, using='default', **kwargs):
+    # The tag links are deleted along with the recipe, without m2m signals
+    instance._facet_tag_ids = list(Recipe.tags.through.objects.using(using).filter(recipe_id=instance.pk).values_list('tag_id', flat=True))
+
+
+@receiver(post_delete, sender=Recipe)
+def post_delete_recipe_facets(sender, instance, using='default', **kwargs):
+    deltas = _scalar_facets(*(_stored_value(instance, name) for name in ('difficulty', 'prep_time_minutes', 'cook_time_minutes')))
+    deltas.update((FacetCount.TAG, tag_value(tag_id)) for tag_id in getattr(instance, '_facet_tag_ids', []))
+    adjust_facet_counts({key: -count for key, count in deltas.items()}, using=using)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def m2m_changed_recipe_tag_facets(sender, instance, action, reverse, pk_set, using='default', **kwargs):
+    """
+    Keeps the tag facets in step with tags being (un)assigned, from either
+    side of the relation. Removals count the links that exist beforehand,
+    so removing a tag that wasn't assigned changes nothing.
+    """
+    if action in ('pre_clear', 'pre_remove'):
+        # pk_set is not provided for clear() and may name unlinked rows for remove()
+        links = sender.objects.using(using)
+        if reverse:
+            links = links.filter(tag_id=instance.pk)
+            if pk_set is not None:
+                links = links.filter(recipe_id__in=pk_set)
+            instance._facet_removed = {tag_value(instance.pk): links.count()}
+        else:
+            links = links.filter(recipe_id=instance.pk)
+            if pk_set is not None:
+                links = links.filter(tag_id__in=pk_set)
+            instance._facet_removed = Counter(tag_value(pk) for pk in links.values_list('tag_id', flat=True))
+        return
+    if action in ('post_clear', 'post_remove'):
+        removed = getattr(instance, '_facet_removed', {})
+        adjust_facet_counts({(FacetCount.TAG, value): -count for value, count in removed.items()}, using=using)
+        return
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        deltas = {(FacetCount.TAG, tag_value(instance.pk)): len(pk_set)}
+    else:
+        deltas = {(FacetCount.TAG, tag_value(pk)): 1 for pk in pk_set}
+    adjust_facet_counts(deltas, using=using)
+
+
+@receiver(post_delete, sender=Tag)
+def post_delete_tag_facets(sender, instance, using='default', **kwargs):
+    FacetCount.objects.using(using).filter(facet=FacetCount.TAG, value=tag_value(instance.pk)).delete()
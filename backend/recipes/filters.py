@@ -0,0 +1,97 @@
+from django.db.models import Count, Exists, OuterRef
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+from .models import Recipe
+
+# Query parameter -> the M2M through model it filters on
+RELATIONS = {
+    'tags': (Recipe.tags.through, 'tag'),
+    'equipment': (Recipe.equipment.through, 'equipment'),
+}
+MATCH_MODES = ('all', 'any')
+
+
+def parse_slugs(value):
+    return list(dict.fromkeys(slug.strip() for slug in value.split(',') if slug.strip()))
+
+
+def related_exists(param, slugs):
+    """
+    EXISTS (a row linking the outer recipe to any of `slugs`): an index
+    probe per recipe on the through table, so no join fans out the rows.
+    """
+    through, field = RELATIONS[param]
+    return Exists(through.objects.filter(recipe_id=OuterRef('pk'), **{f'{field}__slug__in': slugs}))
+
+
+def related_all_exists(param, slugs):
+    """
+    EXISTS (the outer recipe is linked to every one of `slugs`): one
+    correlated subquery counting its matching links, whatever the number of slugs.
+    """
+    through, field = RELATIONS[param]
+    return Exists(
+        through.objects.filter(recipe_id=OuterRef('pk'), **{f'{field}__slug__in': slugs})
+        .values('recipe_id')
+        .annotate(matched=Count('pk'))
+        .filter(matched=len(slugs))
+    )
+
+
+class RecipeRelationFilter(BaseFilterBackend):
+    """
+    Multi-value tag and equipment filters:
+
+    - `?tags=all:vegan,quick-easy` recipes with every listed tag (`all:` is
+      the default, so `?tags=vegan,quick-easy` is the same)
+    - `?tags=any:vegan,quick-easy` recipes with at least one of them
+    - `?equipment=` the same for equipment
+    - `?exclude=wok,spicy` drops recipes with any of those tag or equipment slugs
+
+    Each filter compiles to an EXISTS subquery on the M2M table instead of a
+    join, so the results need no DISTINCT and the cost stays flat as more
+    slugs are listed.
+    """
+    exclude_param = 'exclude'
+
+    @classmethod
+    def query_params(cls):
+        return {*RELATIONS, cls.exclude_param}
+
+    def parse(self, param, value):
+        mode, _, slugs = value.rpartition(':')
+        if mode and mode not in MATCH_MODES:
+            raise ValidationError({param: f'Unknown match mode {mode!r}; use all:<slugs> or any:<slugs>.'})
+        return mode or 'all', parse_slugs(slugs)
+
+    def filter_queryset(self, request, queryset, view):
+        for param in RELATIONS:
+            value = request.query_params.get(param)
+            if not value:
+                continue
+            mode, slugs = self.parse(param, value)
+            if slugs:
+                queryset = queryset.filter(related_all_exists(param, slugs) if mode == 'all' else related_exists(param, slugs))
+        excluded = parse_slugs(request.query_params.get(self.exclude_param, ''))
+        if excluded:
+            for param in RELATIONS:
+                queryset = queryset.exclude(related_exists(param, excluded))
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': param,
+                'required': False,
+                'in': 'query',
+                'description': f'Comma-separated {param} slugs, prefixed with all: (default) or any:.',
+                'schema': {'type': 'string'},
+            }
+            for param in RELATIONS
+        ] + [{
+            'name': self.exclude_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Comma-separated tag or equipment slugs the recipes must not have.',
+            'schema': {'type': 'string'},
+        }]
@@ -0,0 +1,192 @@
+import hashlib
+import logging
+import posixpath
+from io import BytesIO
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework import serializers
+from users.models import CustomUser
+from .jobs import enqueue, task
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+# Variant name -> bounding box and whether to center-crop to it. Images are
+# never upscaled.
+RECIPE_VARIANTS = {
+    'thumbnail': {'size': (200, 200), 'crop': True},
+    'card': {'size': (640, 480)},
+    'full': {'size': (1600, 1600)},
+}
+AVATAR_VARIANTS = {
+    'thumbnail': {'size': (64, 64), 'crop': True},
+    'card': {'size': (256, 256), 'crop': True},
+    'full': {'size': (1024, 1024)},
+}
+
+# Every variant is encoded in each of these (extension -> Pillow format, options)
+IMAGE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Image fields with variants; each is stored in a `<field>_variants` JSONField
+IMAGE_FIELDS = {
+    (Recipe, 'main_image'): RECIPE_VARIANTS,
+    (CustomUser, 'profile_picture'): AVATAR_VARIANTS,
+}
+
+def variants_field(field_name):
+    return f'{field_name}_variants'
+
+
+def _resize(image, size, crop=False):
+    width, height = size
+    if crop:
+        # Largest centered crop with the target's aspect ratio, scaled down to at most `size`
+        scale = min(1, image.width / width, image.height / height)
+        return ImageOps.fit(image, (max(1, int(width * scale)), max(1, int(height * scale))), Image.LANCZOS)
+    resized = image.copy()
+    resized.thumbnail(size, Image.LANCZOS)
+    return resized
+
+
+def _encode(image, image_format, options):
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    if image_format == 'JPEG' or not has_alpha:
+        if has_alpha:
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.convert('RGBA').getchannel('A'))
+            image = background
+        else:
+            image = image.convert('RGB')
+    elif image.mode != 'RGBA':
+        image = image.convert('RGBA')
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def render_variants(name, storage, specs):
+    """
+    Renders every variant in `specs` of the image stored at `name`, in every
+    IMAGE_FORMATS format, and saves them next to it under content-hash names
+    (`<dir>/variants/<variant>/<hash>.<ext>`), so their URLs can be cached
+    forever and identical renders share one file. Returns
+    {'source': name, variant: {ext: stored name}}.
+    """
+    directory = posixpath.dirname(name)
+    with storage.open(name, 'rb') as handle, Image.open(handle) as source:
+        image = ImageOps.exif_transpose(source)
+        image.load()
+
+    variants = {'source': name}
+    for variant, spec in specs.items():
+        resized = _resize(image, spec['size'], spec.get('crop', False))
+        variants[variant] = {}
+        for extension, (image_format, options) in IMAGE_FORMATS.items():
+            data = _encode(resized, image_format, options)
+            digest = hashlib.sha256(data).hexdigest()[:16]
+            path = posixpath.join(directory, 'variants', variant, f'{digest}.{extension}')
+            if not storage.exists(path):
+                path = storage.save(path, ContentFile(data))
+            variants[variant][extension] = path
+    return variants
+
+
+def generate_variants(model, pk, field_name):
+    """
+    Renders the variants of one instance's image and stores them in its
+    `<field>_variants` column, unless the image was replaced meanwhile.
+    Returns the stored variants (None when skipped).
+    """
+    from .cache import MODEL_NAMESPACES, bump_namespace_on_commit
+
+    name = model._default_manager.filter(pk=pk).values_list(field_name, flat=True).first()
+    if not name:
+        return None
+    storage = model._meta.get_field(field_name).storage
+    try:
+        variants = render_variants(name, storage, IMAGE_FIELDS[model, field_name])
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+        logger.warning('Could not render variants of %s %s (%s)', model.__name__, pk, name, exc_info=True)
+        return None
+    manager = model._default_manager
+    updated = manager.filter(pk=pk, **{field_name: name}).update(**{variants_field(field_name): variants})
+    if updated and model in MODEL_NAMESPACES:
+        bump_namespace_on_commit(MODEL_NAMESPACES[model], using=manager.db)
+    return variants if updated else None
+
+
+@task('recipes.render_image_variants')
+def render_image_variants(model, pk, field_name):
+    """
+    Background task wrapper of generate_variants() (`model` is an app label
+    such as 'recipes.Recipe').
+    """
+    generate_variants(apps.get_model(model), pk, field_name)
+
+
+def schedule_variants(model, pk, field_name):
+    """
+    Queues variant generation as a background job (recipes.jobs), so it
+    runs after the current transaction commits and off the request thread.
+    """
+    enqueue(
+        'recipes.render_image_variants',
+        {'model': model._meta.label, 'pk': str(pk), 'field_name': field_name},
+        key=f'image:{model._meta.label}:{pk}:{field_name}',
+    )
+
+
+def sync_variants(instance, field_name):
+    """
+    Schedules new variants when `instance`'s image is not the one its
+    variants were rendered from, and clears them when the image was removed.
+    """
+    name = getattr(instance, field_name).name
+    column = variants_field(field_name)
+    variants = getattr(instance, column) or {}
+    if name and variants.get('source') != name:
+        schedule_variants(type(instance), instance.pk, field_name)
+    elif not name and variants:
+        type(instance)._default_manager.filter(pk=instance.pk).update(**{column: {}})
+        setattr(instance, column, {})
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=CustomUser)
+def image_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    for model, field_name in IMAGE_FIELDS:
+        if model is sender and (update_fields is None or field_name in update_fields):
+            sync_variants(instance, field_name)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    Renders a `<field>_variants` column as absolute URLs:
+    {'thumbnail': {'webp': url, 'jpeg': url}, 'card': {...}, 'full': {...}},
+    or {} while there is no image or the variants are still being rendered.
+    """
+
+    storage = default_storage
+
+    def to_representation(self, value):
+        return self.represent(value, self.context.get('request'))
+
+    def represent(self, value, request):
+        urls = {}
+        for variant, files in (value or {}).items():
+            if variant == 'source':
+                continue
+            urls[variant] = {}
+            for extension, name in files.items():
+                url = self.storage.url(name)
+                urls[variant][extension] = request.build_absolute_uri(url) if request is not None else url
+        return urls
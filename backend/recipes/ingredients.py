@@ -0,0 +1,127 @@
+import re
+from django.db.models import Count, F
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import Recipe, Ingredient, RecipeIngredient
+
+# Columns that feed the ingredient index; saving anything else skips the sync
+INGREDIENT_SOURCE_FIELDS = {'ingredients'}
+
+_whitespace = re.compile(r'\s+')
+
+
+def ingredient_names(ingredients):
+    """
+    Extracts the ingredient names from the Recipe.ingredients JSON list.
+    Accepts both {'item': ..., 'quantity': ...} dicts and bare strings.
+    """
+    names = []
+    for ingredient in ingredients or []:
+        if isinstance(ingredient, dict):
+            ingredient = ingredient.get('item')
+        if isinstance(ingredient, str) and ingredient.strip():
+            names.append(ingredient.strip())
+    return names
+
+
+def canonical_ingredient_name(name):
+    """
+    Normalizes an ingredient name for indexing and pantry lookups:
+    lower-cased, surrounding punctuation stripped, whitespace collapsed.
+    """
+    return _whitespace.sub(' ', name.strip().strip('.,;:').lower())[:255]
+
+
+def canonical_ingredient_names(ingredients):
+    """
+    Returns the distinct canonical names in `ingredients`, preserving order.
+    """
+    names = (canonical_ingredient_name(name) for name in ingredient_names(ingredients))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def resolve_ingredients(names, using='default'):
+    """
+    Returns {canonical name: Ingredient id}, creating missing Ingredient rows
+    with a single bulk insert.
+    """
+    if not names:
+        return {}
+    Ingredient.objects.using(using).bulk_create(
+        [Ingredient(name=name) for name in names], ignore_conflicts=True
+    )
+    return dict(Ingredient.objects.using(using).filter(name__in=names).values_list('name', 'id'))
+
+
+def sync_recipe_ingredients(recipe, using='default'):
+    """
+    Brings the RecipeIngredient rows and Recipe.ingredient_count in line with
+    recipe.ingredients, touching only rows that actually changed.
+    """
+    ingredient_ids = set(resolve_ingredients(canonical_ingredient_names(recipe.ingredients), using=using).values())
+    existing = set(
+        RecipeIngredient.objects.using(using).filter(recipe=recipe).values_list('ingredient_id', flat=True)
+    )
+    stale = existing - ingredient_ids
+    if stale:
+        RecipeIngredient.objects.using(using).filter(recipe=recipe, ingredient_id__in=stale).delete()
+    missing = ingredient_ids - existing
+    if missing:
+        RecipeIngredient.objects.using(using).bulk_create(
+            [RecipeIngredient(recipe=recipe, ingredient_id=ingredient_id) for ingredient_id in missing],
+            ignore_conflicts=True,
+        )
+    if recipe.ingredient_count != len(ingredient_ids):
+        recipe.ingredient_count = len(ingredient_ids)
+        Recipe.objects.using(using).filter(pk=recipe.pk).update(ingredient_count=recipe.ingredient_count)
+
+
+def index_new_recipes(recipes, using='default', batch_size=1000):
+    """
+    Bulk counterpart of sync_recipe_ingredients for freshly bulk_create()d
+    recipes (which fire no signals): one Ingredient insert + lookup for the
+    whole batch, one RecipeIngredient insert and one ingredient_count update.
+    """
+    names_by_recipe = [(recipe, canonical_ingredient_names(recipe.ingredients)) for recipe in recipes]
+    ids = resolve_ingredients(list({name for _, names in names_by_recipe for name in names}), using=using)
+    RecipeIngredient.objects.using(using).bulk_create(
+        [RecipeIngredient(recipe=recipe, ingredient_id=ids[name]) for recipe, names in names_by_recipe for name in names],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+    for recipe, names in names_by_recipe:
+        recipe.ingredient_count = len(names)
+    Recipe.objects.using(using).bulk_update(recipes, ['ingredient_count'], batch_size=batch_size)
+
+
+@receiver(post_save, sender=Recipe)
+def post_save_recipe_ingredient_index(sender, instance, created, raw=False, using='default', update_fields=None, **kwargs):
+    """
+    Keeps the ingredient index current when a recipe's ingredients are saved.
+    """
+    if raw:
+        return
+    if update_fields is not None and not INGREDIENT_SOURCE_FIELDS.intersection(update_fields):
+        return
+    sync_recipe_ingredients(instance, using=using)
+
+
+def pantry_queryset(queryset, pantry, max_missing=None):
+    """
+    Restricts `queryset` to recipes using at least one pantry ingredient and
+    ranks them by fewest missing ingredients, then most matched.
+
+    Answered from the (ingredient, recipe) index in one grouped query:
+    matched_ingredients counts the index rows hit by the pantry and
+    missing_ingredients is Recipe.ingredient_count minus that.
+    """
+    names = list(dict.fromkeys(filter(None, (canonical_ingredient_name(name) for name in pantry))))
+    queryset = (
+        queryset
+        .filter(recipe_ingredients__ingredient__name__in=names)
+        .annotate(matched_ingredients=Count('recipe_ingredients', distinct=True))
+        .annotate(missing_ingredients=F('ingredient_count') - F('matched_ingredients'))
+    )
+    if max_missing is not None:
+        queryset = queryset.filter(missing_ingredients__lte=max_missing)
+    return queryset.order_by('missing_ingredients', '-matched_ingredients', '-created_at', '-id')
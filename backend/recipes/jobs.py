@@ -0,0 +1,211 @@
+import logging
+import os
+import socket
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# name -> (function, max_attempts), filled by @task
+TASKS = {}
+
+JOB_QUEUE_MODES = ('immediate', 'thread', 'database')
+
+_executor = None
+_executor_lock = threading.Lock()
+# Keys submitted to the thread pool and not started yet (coalesces duplicates)
+_pending_keys = set()
+
+
+def task(name, max_attempts=None):
+    """
+    Registers a function as a background task under `name`. Tasks take the
+    enqueued payload as keyword arguments and must be safe to run more than
+    once: jobs are retried after errors and worker crashes.
+    """
+    def register(func):
+        TASKS[name] = (func, max_attempts)
+        return func
+    return register
+
+
+def job_queue_mode():
+    mode = getattr(settings, 'JOB_QUEUE_MODE', 'thread')
+    if mode not in JOB_QUEUE_MODES:
+        raise ImproperlyConfigured(f'JOB_QUEUE_MODE must be one of {", ".join(JOB_QUEUE_MODES)}, not {mode!r}')
+    return mode
+
+
+def enqueue(name, payload=None, key=None, using='default'):
+    """
+    Runs task `name` with `payload` (JSON-serializable keyword arguments)
+    outside the current write, according to settings.JOB_QUEUE_MODE:
+
+    - 'immediate': runs it right away (tests, scripts);
+    - 'thread': runs it on an in-process thread pool (JOB_THREADS) once the
+      current transaction commits. Not durable across restarts;
+    - 'database': stores a Job row in the current transaction, so it is
+      queued iff the write commits, for `manage.py run_jobs` to execute
+      with retries.
+
+    `key` is an idempotency key: while a job with that key is waiting to
+    run, enqueueing it again is a no-op (e.g. one search refresh per recipe
+    however many signals asked for it).
+    """
+    if name not in TASKS:
+        raise KeyError(f'Unknown task {name!r}')
+    payload = payload or {}
+    mode = job_queue_mode()
+    if mode == 'immediate':
+        TASKS[name][0](**payload)
+    elif mode == 'thread':
+        _enqueue_thread(name, payload, key, using)
+    else:
+        max_attempts = TASKS[name][1] or getattr(settings, 'JOB_MAX_ATTEMPTS', 5)
+        Job.objects.using(using).bulk_create(
+            [Job(name=name, payload=payload, key=key, max_attempts=max_attempts)],
+            ignore_conflicts=True, # an identical queued job (same key) already exists
+        )
+
+
+def _enqueue_thread(name, payload, key, using):
+    pending_key = (using, key) if key else None
+
+    def submit():
+        global _executor
+        # Keys are only taken once the write commits: a rolled-back enqueue
+        # never runs, so it must not hold its key either
+        with _executor_lock:
+            if pending_key in _pending_keys:
+                return
+            if pending_key:
+                _pending_keys.add(pending_key)
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'JOB_THREADS', 2), thread_name_prefix='jobs',
+                )
+        _executor.submit(_run_in_thread, name, payload, pending_key)
+
+    submit.pending_key = pending_key
+    # The same key queued earlier in this transaction submits once. Rolled-back
+    # callbacks are dropped from run_on_commit along with their key.
+    if pending_key and any(getattr(func, 'pending_key', None) == pending_key for _, func, _ in connections[using].run_on_commit):
+        return
+    transaction.on_commit(submit, using=using)
+
+
+def _run_in_thread(name, payload, pending_key):
+    with _executor_lock:
+        _pending_keys.discard(pending_key)
+    try:
+        TASKS[name][0](**payload)
+    except Exception:
+        logger.exception('Background task %s failed', name)
+    finally:
+        # Pool threads keep no connection open between jobs
+        connection.close()
+
+
+def retry_delay(attempts):
+    """
+    Exponential backoff before retry number `attempts`: 2s, 4s, 8s ... up to 10 minutes.
+    """
+    return timedelta(seconds=min(2 ** attempts, 600))
+
+
+def requeue_stale(lease, using='default'):
+    """
+    Puts jobs back in the queue whose worker took them more than `lease`
+    ago and never finished (it crashed or was killed).
+    """
+    cutoff = timezone.now() - lease
+    stale = Job.objects.using(using).filter(status=Job.RUNNING, locked_at__lt=cutoff)
+    requeued = 0
+    for job in stale:
+        requeued += _requeue(job, timezone.now(), 'Lease expired', using)
+    return requeued
+
+
+def claim_next(worker, using='default'):
+    """
+    Takes the next due job. The status compare-and-set makes concurrent
+    workers safe on any backend; on PostgreSQL SKIP LOCKED keeps them from
+    queueing up behind one another's candidate row.
+    """
+    while True:
+        queryset = Job.objects.using(using).filter(status=Job.QUEUED, run_after__lte=timezone.now())
+        if connections[using].features.has_select_for_update_skip_locked:
+            with transaction.atomic(using=using):
+                job = queryset.select_for_update(skip_locked=True).first()
+                if job is None:
+                    return None
+                claimed = _claim(job, worker, using)
+        else:
+            job = queryset.first()
+            if job is None:
+                return None
+            claimed = _claim(job, worker, using)
+        if claimed:
+            job.refresh_from_db(using=using)
+            return job
+
+
+def _claim(job, worker, using):
+    return Job.objects.using(using).filter(pk=job.pk, status=Job.QUEUED).update(
+        status=Job.RUNNING, locked_by=worker, locked_at=timezone.now(), attempts=F('attempts') + 1,
+    )
+
+
+def _requeue(job, run_after, error, using):
+    """
+    Queues `job` again, unless an identical job (same key) was queued while
+    it ran, in which case that one covers it.
+    """
+    try:
+        with transaction.atomic(using=using):
+            return Job.objects.using(using).filter(pk=job.pk, status=Job.RUNNING).update(
+                status=Job.QUEUED, run_after=run_after, locked_by='', locked_at=None, last_error=error,
+            )
+    except IntegrityError:
+        Job.objects.using(using).filter(pk=job.pk).delete()
+        return 0
+
+
+def run_job(job, using='default'):
+    """
+    Executes a claimed job. Successful jobs are deleted; failed ones are
+    retried with backoff until max_attempts, then kept as 'failed'.
+    Returns True on success.
+    """
+    try:
+        func = TASKS[job.name][0]
+    except KeyError:
+        func = None
+    try:
+        if func is None:
+            raise LookupError(f'Unknown task {job.name!r}')
+        func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Job %s (%s) failed, attempt %s/%s', job.pk, job.name, job.attempts, job.max_attempts, exc_info=True)
+        if func is not None and job.attempts < job.max_attempts:
+            _requeue(job, timezone.now() + retry_delay(job.attempts), error, using)
+        else:
+            Job.objects.using(using).filter(pk=job.pk).update(
+                status=Job.FAILED, last_error=error, locked_at=None, finished_at=timezone.now(),
+            )
+        return False
+    Job.objects.using(using).filter(pk=job.pk).delete()
+    return True
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
@@ -0,0 +1,208 @@
+import json
+import random
+import time
+import uuid
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from recipes.models import Recipe, Tag
+from users.models import CustomUser
+from .bench_asgi import percentiles
+from .generate_bench_data import DISHES, INGREDIENTS, TITLE_STYLES
+
+RECIPES_URL = '/api/recipes/recipes/'
+
+SCENARIOS = ('feed-cursor', 'feed-offset', 'search', 'filter', 'detail', 'create', 'update')
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs scripted API scenarios against the current database (e.g. one filled by '
+        'generate_bench_data) through the full middleware/view stack, and reports '
+        'p50/p95/p99 latency and queries per request for each: feed paging (keyset '
+        'and page numbers), search, filtering, detail, create and update. Recipes '
+        'created by the run are deleted afterwards. The response cache is off and '
+        'background jobs run inline unless --with-cache / --job-mode say otherwise.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario.')
+        parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+        parser.add_argument('--random-seed', type=int, default=42)
+        parser.add_argument('--with-cache', action='store_true', help='Keep the response cache enabled.')
+        parser.add_argument('--job-mode', default='immediate', help='JOB_QUEUE_MODE for the run (default: immediate, so write timings include side effects).')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON.')
+
+    def handle(self, *args, **options):
+        if not Recipe.objects.exists():
+            raise CommandError('No recipes to benchmark; run generate_bench_data first.')
+        self.random = random.Random(options['random_seed'])
+        self.client = APIClient()
+        self.created = []
+
+        test_settings = {
+            # The test client sends Host: testserver
+            'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'],
+            'JOB_QUEUE_MODE': options['job_mode'],
+        }
+        if not options['with_cache']:
+            test_settings['RESPONSE_CACHE_TIMEOUT'] = 0
+
+        results = {}
+        try:
+            with override_settings(**test_settings):
+                self.user = self.bench_user()
+                for name in options['scenarios']:
+                    scenario = getattr(self, f"scenario_{name.replace('-', '_')}")
+                    results[name] = self.summarize(scenario(options['requests']))
+        finally:
+            # Recipe.delete() keeps counts and caches consistent (no bulk delete)
+            for recipe in Recipe.objects.filter(pk__in=self.created):
+                recipe.delete()
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'recipes': Recipe.objects.count(),
+                'vendor': connection.vendor,
+                'scenarios': results,
+            }, indent=2))
+            return
+        self.stdout.write(f'{Recipe.objects.count()} recipes on {connection.vendor}')
+        self.stdout.write(
+            f"{'scenario':<12} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'max q':>6}"
+        )
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:<12} {row['requests']:>8} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+                f"{row['p99_ms']:>8.2f} {row['mean_queries']:>8.1f} {row['max_queries']:>6}"
+            )
+
+    def bench_user(self):
+        user, _ = CustomUser.objects.get_or_create(email='bench-api-writer@example.com')
+        return user
+
+    def summarize(self, samples):
+        timings = [ms for ms, _ in samples]
+        queries = [count for _, count in samples]
+        p = percentiles(timings)
+        return {
+            'requests': len(samples),
+            'p50_ms': round(p[50], 3),
+            'p95_ms': round(p[95], 3),
+            'p99_ms': round(p[99], 3),
+            'mean_queries': round(sum(queries) / len(queries), 2),
+            'max_queries': max(queries),
+        }
+
+    def request(self, method, url, data=None, expect=200, user=None):
+        """
+        Sends one request; returns (response, milliseconds, query count).
+        """
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            if method == 'get':
+                response = self.client.get(url, data)
+            else:
+                response = getattr(self.client, method)(url, data, format='json')
+            elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code != expect:
+            raise CommandError(f'{method.upper()} {url} returned {response.status_code}: {response.content[:300]!r}')
+        return response, elapsed, len(ctx.captured_queries)
+
+    def get(self, url, params=None):
+        response, elapsed, queries = self.request('get', url, params)
+        return response, (elapsed, queries)
+
+    def sample_slugs(self, count):
+        """
+        Random recipe slugs: seeks to random UUIDs on the primary key index,
+        which stays cheap on large tables (unlike ORDER BY RANDOM()/OFFSET).
+        """
+        slugs = []
+        recipes = Recipe.objects.order_by('pk').values_list('slug', flat=True)
+        while len(slugs) < count:
+            pivot = uuid.UUID(int=self.random.getrandbits(128))
+            slug = recipes.filter(pk__gte=pivot).first() or recipes.first()
+            slugs.append(slug)
+        return slugs
+
+    def scenario_feed_cursor(self, total):
+        # Follows `next` links from the newest recipes, restarting every 20 pages
+        samples, url, params, depth = [], RECIPES_URL, {'cursor': ''}, 0
+        while len(samples) < total:
+            response, sample = self.get(url, params)
+            samples.append(sample)
+            url, params, depth = response.json()['next'], None, depth + 1
+            if url is None or depth == 20:
+                url, params, depth = RECIPES_URL, {'cursor': ''}, 0
+        return samples
+
+    def scenario_feed_offset(self, total):
+        # Page numbers skewed towards the first pages, as users browse
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        last_page = max(1, min(Recipe.objects.count() // page_size, 1000))
+        return [
+            self.get(RECIPES_URL, {'page': min(last_page, int(self.random.paretovariate(1.2)))})[1]
+            for _ in range(total)
+        ]
+
+    def scenario_search(self, total):
+        terms = [name for name, _ in INGREDIENTS] + [dish.lower() for dish in DISHES] + [style.lower() for style in TITLE_STYLES]
+        return [self.get(RECIPES_URL, {'search': self.random.choice(terms)})[1] for _ in range(total)]
+
+    def scenario_filter(self, total):
+        tags = list(Tag.objects.values_list('slug', flat=True)) or [None]
+        samples = []
+        for _ in range(total):
+            params = {'difficulty': self.random.choice(['Easy', 'Medium', 'Hard'])}
+            tag = self.random.choice(tags)
+            if tag and self.random.random() < 0.7:
+                params['tags__slug'] = tag
+            if self.random.random() < 0.3:
+                params['ordering'] = 'title'
+            samples.append(self.get(RECIPES_URL, params)[1])
+        return samples
+
+    def scenario_detail(self, total):
+        return [self.get(f'{RECIPES_URL}{slug}/')[1] for slug in self.sample_slugs(total)]
+
+    def recipe_payload(self):
+        rng = self.random
+        picks = rng.sample(INGREDIENTS, rng.randint(4, 10))
+        return {
+            'title': f'{rng.choice(TITLE_STYLES)} {picks[0][0].title()} {rng.choice(DISHES)}',
+            'description': 'Benchmark recipe.',
+            'ingredients': [{'item': name, 'quantity': f'1 {units[0]}'.strip()} for name, units in picks],
+            'instructions': ['Prepare the ingredients.', 'Cook until done.', 'Serve.'],
+            'prep_time_minutes': 10,
+            'cook_time_minutes': 20,
+            'servings': 4,
+            'difficulty': rng.choice(['Easy', 'Medium', 'Hard']),
+            'tag_names': rng.sample(['Dinner', 'Quick', 'Vegetarian', 'Comfort Food', 'Bench Tag'], 2),
+            'equipment_names': rng.sample(['Oven', 'Skillet', 'Wok', 'Bench Gadget'], 2),
+        }
+
+    def scenario_create(self, total):
+        samples = []
+        for _ in range(total):
+            response, elapsed, queries = self.request('post', RECIPES_URL, self.recipe_payload(), expect=201, user=self.user)
+            self.created.append(response.json()['id'])
+            samples.append((elapsed, queries))
+        return samples
+
+    def scenario_update(self, total):
+        if not self.created:
+            self.scenario_create(min(total, 20))
+        slugs = list(Recipe.objects.filter(pk__in=self.created).values_list('slug', flat=True))
+        samples = []
+        for i in range(total):
+            changes = {'description': f'Updated {i}', 'servings': self.random.randint(1, 8)}
+            if i % 4 == 0:
+                changes['tag_names'] = self.random.sample(['Dinner', 'Quick', 'Vegetarian', 'Brunch'], 2)
+            _, elapsed, queries = self.request('patch', f'{RECIPES_URL}{slugs[i % len(slugs)]}/', changes, user=self.user)
+            samples.append((elapsed, queries))
+        return samples
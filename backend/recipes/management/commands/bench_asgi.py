@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from recipes.models import Recipe
+from .bench_pagination import Command as PaginationBench
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return {p: timings[min(len(timings) - 1, int(len(timings) * p / 100))] for p in (50, 95, 99)}
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-tests the recipe list under concurrency, in process: the sync DRF '
+        'endpoint through the WSGI handler on a thread pool, and the same endpoint '
+        'and its async mirror (/api/recipes/async/recipes/) through the ASGI handler '
+        'on one event loop. Reports requests/sec and p50/p95/p99 latency. The '
+        'response cache is off unless --with-cache is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Insert this many synthetic recipes first.')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per scenario.')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50], help='Concurrent clients.')
+        parser.add_argument('--query', default='', help='Query string sent with every request, e.g. "difficulty=Easy".')
+        parser.add_argument('--with-cache', action='store_true', help='Keep the response cache enabled.')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            PaginationBench(stdout=self.stdout, stderr=self.stderr).seed(options['seed'])
+        if not Recipe.objects.exists():
+            raise CommandError('No recipes to list; pass --seed N.')
+
+        path = '/api/recipes/recipes/'
+        async_path = '/api/recipes/async/recipes/'
+        query = options['query']
+        scenarios = [
+            ('wsgi  sync view', self.run_wsgi, path),
+            ('asgi  sync view', self.run_asgi, path),
+            ('asgi async view', self.run_asgi, async_path),
+        ]
+        # The test clients send Host: testserver
+        test_settings = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver']}
+        if not options['with_cache']:
+            test_settings['RESPONSE_CACHE_TIMEOUT'] = 0
+        self.stdout.write(f"{'scenario':<16} {'conc':>5} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        with override_settings(**test_settings):
+            for concurrency in options['concurrency']:
+                for label, run, url in scenarios:
+                    elapsed, timings = run(f'{url}?{query}' if query else url, options['requests'], concurrency)
+                    p = percentiles(timings)
+                    self.stdout.write(
+                        f'{label:<16} {concurrency:>5} {len(timings) / elapsed:>9.1f} '
+                        f'{p[50]:>8.2f} {p[95]:>8.2f} {p[99]:>8.2f}'
+                    )
+
+    def check_status(self, response, url):
+        if response.status_code != 200:
+            raise CommandError(f'GET {url} returned {response.status_code}')
+
+    def run_wsgi(self, url, total, concurrency):
+        clients = {}
+
+        def request(_):
+            # Client instances aren't thread-safe; keep one per worker thread
+            client = clients.setdefault(threading.get_ident(), Client())
+            start = time.perf_counter()
+            response = client.get(url)
+            elapsed = (time.perf_counter() - start) * 1000
+            self.check_status(response, url)
+            return elapsed
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            timings = list(pool.map(request, range(total)))
+        return time.perf_counter() - start, timings
+
+    def run_asgi(self, url, total, concurrency):
+        async def main():
+            client = AsyncClient()
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def request():
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.get(url)
+                    elapsed = (time.perf_counter() - start) * 1000
+                self.check_status(response, url)
+                return elapsed
+
+            start = time.perf_counter()
+            timings = await asyncio.gather(*[request() for _ in range(total)])
+            return time.perf_counter() - start, timings
+
+        return asyncio.run(main())
+
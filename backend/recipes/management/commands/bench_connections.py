@@ -0,0 +1,103 @@
+import copy
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import load_backend
+from .bench_asgi import percentiles
+
+# name -> changes to the database settings
+MODES = {
+    'per-request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': False},
+    'persistent+checks': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True},
+    'pool': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'pool': True},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures the per-request cost of each connection mode (DB_CONN_MAX_AGE, '
+        'DB_CONN_HEALTH_CHECKS, DB_POOL) against the configured database: every '
+        'simulated request goes through Django\'s request_started/request_finished '
+        'connection handling and runs --sql. Uses its own connection, so the '
+        'database settings of this process are left alone. The pool mode needs '
+        'PostgreSQL with psycopg 3 and psycopg-pool; there "connects" counts pool checkouts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Simulated requests per mode.')
+        parser.add_argument('--sql', default='SELECT 1', help='Statement each request runs.')
+        parser.add_argument('--queries', type=int, default=3, help='Statements per request.')
+        parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        base = connections.settings[options['database']]
+        self.stdout.write(f"{base['ENGINE']} {base['HOST'] or 'local'}/{base['NAME']}")
+        self.stdout.write(f"{'mode':<18} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'connects':>9} {'saved ms':>9}")
+        baseline = None
+        for mode in options['modes']:
+            try:
+                wrapper = self.connection(base, MODES[mode], options['database'])
+            except CommandError as error:
+                self.stdout.write(self.style.WARNING(f'{mode:<18} skipped: {error}'))
+                continue
+            try:
+                timings, connects = self.run(wrapper, options['requests'], options['sql'], options['queries'])
+            finally:
+                wrapper.close()
+                if getattr(wrapper, 'pool', None):
+                    wrapper.close_pool()
+            mean = sum(timings) / len(timings)
+            baseline = mean if baseline is None else baseline
+            p = percentiles(timings)
+            self.stdout.write(
+                f'{mode:<18} {mean:>8.3f} {p[50]:>8.3f} {p[95]:>8.3f} {p[99]:>8.3f} '
+                f'{connects:>9} {baseline - mean:>9.3f}'
+            )
+
+    def connection(self, base, changes, database):
+        settings_dict = copy.deepcopy(base)
+        settings_dict.update({key: value for key, value in changes.items() if key != 'pool'})
+        settings_dict['OPTIONS'] = {key: value for key, value in settings_dict['OPTIONS'].items() if key != 'pool'}
+        if changes.get('pool'):
+            if settings_dict['ENGINE'] != 'django.db.backends.postgresql':
+                raise CommandError('pooling needs PostgreSQL')
+            settings_dict['OPTIONS']['pool'] = base['OPTIONS'].get('pool') or True
+        backend = load_backend(settings_dict['ENGINE'])
+        # A private alias keeps its pool apart from the one of `database`
+        wrapper = backend.DatabaseWrapper(settings_dict, alias=f'{database}-bench')
+        if changes.get('pool'):
+            try:
+                wrapper.pool
+            except Exception as error: # ImproperlyConfigured without psycopg 3 / psycopg-pool
+                raise CommandError(error)
+        return wrapper
+
+    def run(self, wrapper, requests, sql, queries):
+        """
+        Replays what the handler does per request: close_old_connections() on
+        request_started, the view's queries, close_old_connections() on
+        request_finished. Returns per-request milliseconds and the number of
+        connections opened.
+        """
+        connects = 0
+        original = wrapper.connect
+
+        def counting_connect():
+            nonlocal connects
+            connects += 1
+            original()
+        wrapper.connect = counting_connect
+
+        timings = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            wrapper.close_if_unusable_or_obsolete()
+            for _ in range(queries):
+                with wrapper.cursor() as cursor:
+                    cursor.execute(sql)
+                    cursor.fetchall()
+            wrapper.close_if_unusable_or_obsolete()
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings, connects
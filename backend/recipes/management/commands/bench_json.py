@@ -0,0 +1,80 @@
+import time
+from io import BytesIO
+from statistics import median
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory, override_settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer, orjson
+from recipes.models import Recipe
+from recipes.querysets import optimize_for_serializer
+from recipes.serializers import RecipeSerializer
+from users.models import CustomUser
+from users.serializers import UserProfileSerializer
+from .bench_serializers import Command as SerializerBench
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the stdlib JSON renderer/parser against api.renderers.FastJSONRenderer / '
+        'api.parsers.FastJSONParser (orjson) on recipe list pages and user profiles, checking '
+        'that both render identical bytes. '
+        'Run against a scratch database: --seed inserts synthetic recipes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Insert this many synthetic recipes first.')
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000], help='Recipes per rendered page.')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per measurement (median is reported).')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError('orjson is not installed, so there is nothing to compare against')
+        if options['seed']:
+            SerializerBench(stdout=self.stdout, stderr=self.stderr).seed(options['seed'])
+        total = Recipe.objects.count()
+        if not total:
+            raise CommandError('No recipes to render; pass --seed N.')
+
+        request = Request(RequestFactory().get('/api/recipes/recipes/', HTTP_HOST='localhost'))
+        payloads = []
+        for size in options['sizes']:
+            if size > total:
+                self.stdout.write(self.style.WARNING(f'{size} recipes skipped (only {total} recipes)'))
+                continue
+            page = optimize_for_serializer(Recipe.objects.order_by('-created_at', '-id'), RecipeSerializer)[:size]
+            payloads.append((f'{size} recipes', {
+                'count': total, 'next': None, 'previous': None,
+                'results': RecipeSerializer(page, many=True, context={'request': request}).data,
+            }))
+        users = CustomUser.objects.all()[:100]
+        payloads.append((f'{len(users)} profiles', UserProfileSerializer(users, many=True, context={'request': request}).data))
+
+        self.stdout.write(f"{'payload':>14} {'KB':>7} {'render std':>11} {'render fast':>12} {'parse std':>10} {'parse fast':>11}")
+        for label, data in payloads:
+            stdlib_bytes = JSONRenderer().render(data)
+            with override_settings(JSON_BACKEND='orjson'):
+                fast_bytes = FastJSONRenderer().render(data)
+                if fast_bytes != stdlib_bytes:
+                    raise CommandError(f'{label}: orjson output differs from the stdlib renderer')
+                render_std = self.time(lambda: JSONRenderer().render(data), options['repeat'])
+                render_fast = self.time(lambda: FastJSONRenderer().render(data), options['repeat'])
+                parse_std = self.time(lambda: self.parse(JSONParser(), stdlib_bytes), options['repeat'])
+                parse_fast = self.time(lambda: self.parse(FastJSONParser(), stdlib_bytes), options['repeat'])
+            self.stdout.write(
+                f'{label:>14} {len(stdlib_bytes) / 1024:>7.1f} {render_std:>9.2f}ms {render_fast:>10.2f}ms '
+                f'{parse_std:>8.2f}ms {parse_fast:>9.2f}ms'
+            )
+
+    def parse(self, parser, body):
+        return parser.parse(BytesIO(body))
+
+    def time(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return median(timings)
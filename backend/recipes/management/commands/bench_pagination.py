@@ -0,0 +1,93 @@
+import time
+from statistics import median
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from recipes.counters import count_new_recipes
+from recipes.facets import count_new_recipe_facets
+from recipes.models import Recipe
+from recipes.pagination import KeysetPagination
+from recipes.views import RecipeViewSet
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks /api/recipes/recipes/ page-number (OFFSET + COUNT) pagination '
+        'against keyset (?cursor=) pagination at increasing depths. '
+        'Run against a scratch database: --seed inserts synthetic recipes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Insert this many synthetic recipes first.')
+        parser.add_argument('--pages', type=int, nargs='+', default=[1, 100, 1000, 10000], help='Page numbers to time.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed requests per measurement (median is reported).')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(options['seed'])
+
+        view = RecipeViewSet.as_view({'get': 'list'})
+        factory = RequestFactory()
+        page_size = RecipeViewSet.pagination_class.page_size
+        total = Recipe.objects.count()
+        if not total:
+            raise CommandError('No recipes to paginate; pass --seed N.')
+
+        self.stdout.write(f'{total} recipes, page size {page_size}')
+        self.stdout.write(f"{'page':>8} {'offset ms':>10} {'offset q':>9} {'keyset ms':>10} {'keyset q':>9}")
+        for page in options['pages']:
+            if (page - 1) * page_size >= total:
+                self.stdout.write(self.style.WARNING(f'{page:>8} skipped (only {total} recipes)'))
+                continue
+            offset_ms, offset_queries = self.time_request(view, factory, {'page': page}, options['repeat'])
+            cursor = self.cursor_for_page(page, page_size)
+            keyset_ms, keyset_queries = self.time_request(view, factory, {'cursor': cursor}, options['repeat'])
+            self.stdout.write(f'{page:>8} {offset_ms:>10.2f} {offset_queries:>9} {keyset_ms:>10.2f} {keyset_queries:>9}')
+
+    def time_request(self, view, factory, params, repeat):
+        timings = []
+        for _ in range(repeat):
+            request = factory.get('/api/recipes/recipes/', params, HTTP_HOST='localhost')
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                response = view(request)
+                response.render()
+                timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'GET {params} returned {response.status_code}')
+        query_count = len(ctx.captured_queries)
+        reset_queries()
+        return median(timings), query_count
+
+    def cursor_for_page(self, page, page_size):
+        """
+        Builds the keyset cursor a client would hold after walking to `page`,
+        by encoding the last row of the previous page (the walk itself is not timed).
+        """
+        if page == 1:
+            return ''
+        paginator = KeysetPagination()
+        paginator.ordering = paginator.get_ordering(Recipe.objects.order_by(*RecipeViewSet.ordering))
+        boundary = Recipe.objects.order_by(*paginator.ordering_key())[(page - 1) * page_size - 1]
+        return paginator.encode_token(boundary, reverse=False)
+
+    def seed(self, count):
+        author, _ = CustomUser.objects.get_or_create(email='bench@example.com')
+        batch_size = 1000
+        start = time.perf_counter()
+        for offset in range(0, count, batch_size):
+            recipes = Recipe.objects.bulk_create([
+                Recipe(
+                    author=author,
+                    title=f'Bench recipe {offset + i}',
+                    slug=f'bench-recipe-{offset + i}-{int(start)}',
+                    ingredients=[{'item': 'flour', 'quantity': '2 cups'}],
+                    instructions=['mix', 'bake'],
+                )
+                for i in range(min(batch_size, count - offset))
+            ])
+            count_new_recipes(recipes)
+            count_new_recipe_facets(recipes)
+        self.stdout.write(self.style.SUCCESS(f'Seeded {count} recipes in {time.perf_counter() - start:.1f}s'))
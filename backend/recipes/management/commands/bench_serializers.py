@@ -0,0 +1,111 @@
+import json
+import time
+from statistics import median
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.request import Request
+from recipes.counters import count_new_recipes
+from recipes.facets import count_new_recipe_facets
+from recipes.models import Recipe, Tag, Equipment
+from recipes.querysets import optimize_for_serializer
+from recipes.readers import values_reader
+from recipes.resolvers import resolve_named_list
+from recipes.serializers import RecipeSerializer, RecipeListSerializer, field_selection
+from users.models import CustomUser
+
+SERIALIZERS = {
+    'list': RecipeListSerializer,
+    'full': RecipeSerializer,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks RecipeSerializer / RecipeListSerializer (model instances + DRF fields) '
+        'against the .values() read path (recipes.readers) for increasing page sizes, '
+        'checking that both produce identical output. '
+        'Run against a scratch database: --seed inserts synthetic recipes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Insert this many synthetic recipes first.')
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000], help='Page sizes to time.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per measurement (median is reported).')
+        parser.add_argument('--serializer', choices=sorted(SERIALIZERS), nargs='+', default=sorted(SERIALIZERS))
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(options['seed'])
+        total = Recipe.objects.count()
+        if not total:
+            raise CommandError('No recipes to serialize; pass --seed N.')
+
+        request = Request(RequestFactory().get('/api/recipes/recipes/', HTTP_HOST='localhost'))
+        self.stdout.write(f'{total} recipes')
+        self.stdout.write(f"{'serializer':>10} {'items':>6} {'drf ms':>9} {'values ms':>10} {'speedup':>8}")
+        for name in options['serializer']:
+            serializer_class = SERIALIZERS[name]
+            selection = field_selection(serializer_class, request.query_params)
+            reader = values_reader(serializer_class, selection)
+            if reader is None:
+                raise CommandError(f'{serializer_class.__name__} has fields the values path cannot produce')
+            queryset = Recipe.objects.order_by('-created_at', '-id')
+            for size in options['sizes']:
+                if size > total:
+                    self.stdout.write(self.style.WARNING(f'{name:>10} {size:>6} skipped (only {total} recipes)'))
+                    continue
+
+                def drf():
+                    page = list(optimize_for_serializer(queryset, serializer_class, selection)[:size])
+                    context = {'request': request, 'field_selection': selection}
+                    return serializer_class(page, many=True, context=context).data
+
+                def values():
+                    return reader.render(reader.values(queryset)[:size], request)
+
+                if json.dumps(drf()) != json.dumps(values()):
+                    raise CommandError(f'{name}: output of the values path differs for {size} items')
+                drf_ms = self.time(drf, options['repeat'])
+                values_ms = self.time(values, options['repeat'])
+                self.stdout.write(f'{name:>10} {size:>6} {drf_ms:>9.2f} {values_ms:>10.2f} {drf_ms / values_ms:>7.1f}x')
+
+    def time(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return median(timings)
+
+    def seed(self, count):
+        author, _ = CustomUser.objects.get_or_create(email='bench@example.com')
+        tags = resolve_named_list(Tag, ['Vegan', 'Quick & Easy', 'Dinner', 'Baking'])
+        equipment = resolve_named_list(Equipment, ['Wok', 'Oven', 'Whisk (Balloon)'])
+        batch_size = 1000
+        start = time.perf_counter()
+        for offset in range(0, count, batch_size):
+            recipes = Recipe.objects.bulk_create([
+                Recipe(
+                    author=author,
+                    title=f'Serializer bench {offset + i}',
+                    slug=f'serializer-bench-{offset + i}-{int(start)}',
+                    description='A synthetic recipe used for serializer benchmarks.',
+                    ingredients=[{'item': f'ingredient {n}', 'quantity': f'{n} cups'} for n in range(8)],
+                    instructions=[f'Step {n}: stir and wait.' for n in range(6)],
+                    prep_time_minutes=10,
+                    cook_time_minutes=25,
+                    servings=4,
+                )
+                for i in range(min(batch_size, count - offset))
+            ])
+            Recipe.tags.through.objects.bulk_create([
+                Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag.pk)
+                for n, recipe in enumerate(recipes) for tag in tags[n % 2:n % 2 + 3]
+            ])
+            Recipe.equipment.through.objects.bulk_create([
+                Recipe.equipment.through(recipe_id=recipe.pk, equipment_id=item.pk)
+                for recipe in recipes for item in equipment[:2]
+            ])
+            count_new_recipes(recipes)
+            count_new_recipe_facets(recipes)
+        self.stdout.write(self.style.SUCCESS(f'Seeded {count} recipes in {time.perf_counter() - start:.1f}s'))
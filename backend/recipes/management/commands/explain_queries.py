@@ -0,0 +1,108 @@
+import re
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.settings import api_settings
+from api.instrumentation import sql_shape
+from recipes.models import Recipe
+from users.models import CustomUser
+
+# PostgreSQL: "Seq Scan on recipes_recipe"; SQLite: "SCAN recipes_recipe" (but
+# not "SCAN recipes_recipe USING INDEX ...", which walks an index)
+_pg_seq_scan = re.compile(r'Seq Scan on (\w+)')
+_sqlite_scan = re.compile(r'^SCAN (\w+)$')
+
+
+class Command(BaseCommand):
+    help = (
+        'Requests the read endpoints (recipe feeds with each filter and ordering, '
+        'keyset pages, search, title prefix, detail, tags, equipment and users), runs '
+        'EXPLAIN on every distinct SELECT they issue and reports the sequential '
+        'scans. Small tables are scanned whatever the indexes, so run it against a '
+        'realistically sized database (see generate_bench_data).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not only the ones with sequential scans.')
+        parser.add_argument('--ignore', nargs='+', default=['django_content_type', 'recipes_tag', 'recipes_equipment'],
+                            help='Tables whose sequential scans are expected (small lookup tables).')
+        parser.add_argument('--fail-on-seq-scan', action='store_true', help='Exit with an error when a sequential scan is found.')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            raise CommandError(f'EXPLAIN parsing is implemented for PostgreSQL and SQLite, not {connection.vendor}.')
+        recipe = Recipe.objects.order_by('-created_at').select_related('author').first()
+        if recipe is None:
+            raise CommandError('No recipes; run generate_bench_data first.')
+
+        findings = {}
+        # The test client sends Host: testserver; the response cache would hide queries
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], RESPONSE_CACHE_TIMEOUT=0):
+            for label, url in self.endpoints(recipe):
+                for sql in self.capture(url):
+                    plan = self.explain(sql)
+                    scans = sorted(set(self.seq_scans(plan)) - set(options['ignore']))
+                    findings.setdefault(sql_shape(sql), (label, sql, plan, scans))
+
+        flagged = 0
+        for label, sql, plan, scans in findings.values():
+            if not scans and not options['verbose_plans']:
+                continue
+            flagged += bool(scans)
+            style = self.style.WARNING if scans else self.style.SUCCESS
+            self.stdout.write(style(f"[{label}] {'sequential scan on ' + ', '.join(scans) if scans else 'indexed'}"))
+            self.stdout.write(f'  {sql[:300]}')
+            for line in plan:
+                self.stdout.write(f'    {line}')
+
+        summary = f'{len(findings)} distinct queries explained, {flagged} with sequential scans'
+        if flagged and options['fail_on_seq_scan']:
+            raise CommandError(summary)
+        self.stdout.write((self.style.WARNING if flagged else self.style.SUCCESS)(summary))
+
+    def endpoints(self, recipe):
+        base = '/api/recipes/recipes/'
+        tag = recipe.tags.values_list('slug', flat=True).first()
+        user = CustomUser.objects.filter(is_active=True, is_public=True).values_list('pk', flat=True).first()
+        endpoints = [
+            ('feed', base),
+            ('feed keyset', f'{base}?cursor='),
+            ('by author', f'{base}?author_id={recipe.author_id}'),
+            ('by difficulty', f'{base}?difficulty={recipe.difficulty}'),
+            ('by title', f'{base}?ordering=title&cursor='),
+            ('title prefix', f'{base}?title__istartswith={recipe.title[:4]}'),
+            ('search', f'{base}?search={recipe.title.split()[-1]}'),
+            ('detail', f'{base}{recipe.slug}/'),
+            ('tags', '/api/recipes/tags/'),
+            ('equipment', '/api/recipes/equipment/'),
+        ]
+        if Recipe.objects.filter(created_at__lt=recipe.created_at).count() >= 4 * api_settings.PAGE_SIZE:
+            endpoints.append(('feed page 5', f'{base}?page=5'))
+        if tag:
+            endpoints += [('by tag', f'{base}?tags__slug={tag}'), ('by tags', f'{base}?tags=all:{tag}')]
+        if user:
+            endpoints += [('users', '/api/users/'), ('user', f'/api/users/{user}/')]
+        return endpoints
+
+    def capture(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = Client().get(url)
+        if response.status_code != 200:
+            raise CommandError(f'GET {url} returned {response.status_code}')
+        return [query['sql'] for query in ctx.captured_queries if query['sql'].lstrip().upper().startswith('SELECT')]
+
+    def explain(self, sql):
+        prefix = 'EXPLAIN' if connection.vendor == 'postgresql' else 'EXPLAIN QUERY PLAN'
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}')
+            rows = cursor.fetchall()
+        # PostgreSQL: one text line per row; SQLite: (id, parent, notused, detail)
+        return [row[0] if connection.vendor == 'postgresql' else row[-1] for row in rows]
+
+    def seq_scans(self, plan):
+        for line in plan:
+            match = _pg_seq_scan.search(line) if connection.vendor == 'postgresql' else _sqlite_scan.match(line.strip())
+            if match:
+                yield match.group(1)
@@ -0,0 +1,48 @@
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from recipes.export import EXPORT_CHUNK_SIZE, EXPORT_ENCODERS, iter_export_rows
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Streams recipes to NDJSON or CSV (re-importable with import_recipes) with a '
+        'server-side cursor, so memory use does not grow with the table.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Output file, or "-" for stdout.')
+        parser.add_argument('--format', choices=sorted(EXPORT_ENCODERS), default='ndjson', dest='export_format')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help='Recipes fetched per round trip.')
+        parser.add_argument('--author', help='Only export recipes by the user with this email.')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+        queryset = Recipe.objects.order_by('id')
+        if options['author']:
+            queryset = queryset.filter(author__email=options['author'])
+
+        encode = EXPORT_ENCODERS[options['export_format']]
+        start = time.perf_counter()
+        exported = 0
+
+        def counted(rows):
+            nonlocal exported
+            for row in rows:
+                exported += 1
+                yield row
+
+        chunks = encode(counted(iter_export_rows(queryset, chunk_size=options['chunk_size'])))
+        if options['output'] == '-':
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+        else:
+            with open(options['output'], 'wb') as handle:
+                for chunk in chunks:
+                    handle.write(chunk)
+            self.stdout.write(self.style.SUCCESS(
+                f'Exported {exported} recipes to {options["output"]} in {time.perf_counter() - start:.1f}s'
+            ))
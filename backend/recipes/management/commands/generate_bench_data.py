@@ -0,0 +1,199 @@
+import random
+import time
+from datetime import timedelta
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+from recipes.cache import bump_namespace
+from recipes.counters import count_new_recipes
+from recipes.facets import count_new_recipe_facets
+from recipes.ingredients import index_new_recipes
+from recipes.models import Recipe, Tag, Equipment
+from recipes.resolvers import resolve_named
+from recipes.search import refresh_search_documents
+from users.models import CustomUser
+from .load_equipment import EQUIPMENT
+from .load_tags import TAGS
+
+SCALES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+# (ingredient, units it is measured in)
+INGREDIENTS = [
+    ('flour', ['cups', 'g']), ('sugar', ['cups', 'tbsp', 'g']), ('brown sugar', ['cups', 'tbsp']),
+    ('butter', ['tbsp', 'g', 'cups']), ('eggs', ['']), ('milk', ['cups', 'ml']), ('heavy cream', ['cups', 'ml']),
+    ('olive oil', ['tbsp', 'tsp', 'ml']), ('vegetable oil', ['tbsp', 'cups']), ('salt', ['tsp', 'pinch']),
+    ('black pepper', ['tsp', 'pinch']), ('garlic', ['cloves']), ('onion', ['', 'cups']), ('red onion', ['']),
+    ('shallot', ['']), ('ginger', ['tbsp', 'inch']), ('chicken breast', ['g', 'lb', '']), ('chicken thighs', ['lb', '']),
+    ('ground beef', ['lb', 'g']), ('beef chuck', ['lb', 'kg']), ('pork shoulder', ['lb', 'kg']), ('bacon', ['slices', 'g']),
+    ('salmon fillet', ['', 'g']), ('shrimp', ['lb', 'g']), ('cod', ['g', '']), ('tofu', ['g', 'block']),
+    ('chickpeas', ['cans', 'cups']), ('black beans', ['cans', 'cups']), ('lentils', ['cups', 'g']),
+    ('rice', ['cups', 'g']), ('quinoa', ['cups']), ('pasta', ['g', 'oz']), ('spaghetti', ['g', 'oz']),
+    ('bread crumbs', ['cups']), ('tomatoes', ['', 'cups']), ('canned tomatoes', ['cans']), ('tomato paste', ['tbsp']),
+    ('potatoes', ['', 'lb']), ('sweet potatoes', ['']), ('carrots', ['', 'cups']), ('celery', ['stalks']),
+    ('bell pepper', ['']), ('jalapeño', ['']), ('zucchini', ['']), ('eggplant', ['']), ('mushrooms', ['cups', 'g']),
+    ('spinach', ['cups', 'g']), ('kale', ['cups', 'bunch']), ('broccoli', ['cups', 'heads']), ('cauliflower', ['heads', 'cups']),
+    ('cabbage', ['cups', 'heads']), ('corn', ['cups', 'ears']), ('peas', ['cups']), ('green beans', ['cups', 'g']),
+    ('avocado', ['']), ('lemon', ['', 'tbsp juice']), ('lime', ['', 'tbsp juice']), ('orange', ['']),
+    ('apples', ['', 'cups']), ('bananas', ['']), ('blueberries', ['cups']), ('strawberries', ['cups']),
+    ('parmesan', ['cups', 'g']), ('cheddar', ['cups', 'g']), ('mozzarella', ['cups', 'g']), ('feta', ['g', 'cups']),
+    ('greek yogurt', ['cups']), ('sour cream', ['cups', 'tbsp']), ('coconut milk', ['cans', 'ml']),
+    ('chicken stock', ['cups', 'ml']), ('vegetable stock', ['cups', 'ml']), ('soy sauce', ['tbsp']),
+    ('fish sauce', ['tbsp', 'tsp']), ('honey', ['tbsp', 'cups']), ('maple syrup', ['tbsp']), ('dijon mustard', ['tbsp', 'tsp']),
+    ('vinegar', ['tbsp']), ('balsamic vinegar', ['tbsp']), ('rice vinegar', ['tbsp']), ('sesame oil', ['tsp', 'tbsp']),
+    ('cumin', ['tsp']), ('paprika', ['tsp']), ('smoked paprika', ['tsp']), ('chili powder', ['tsp', 'tbsp']),
+    ('oregano', ['tsp']), ('thyme', ['tsp', 'sprigs']), ('rosemary', ['sprigs', 'tsp']), ('basil', ['cups', 'leaves']),
+    ('parsley', ['cups', 'tbsp']), ('cilantro', ['cups', 'tbsp']), ('cinnamon', ['tsp']), ('nutmeg', ['pinch', 'tsp']),
+    ('vanilla extract', ['tsp']), ('baking powder', ['tsp']), ('baking soda', ['tsp']), ('yeast', ['tsp', 'packet']),
+    ('cocoa powder', ['cups', 'tbsp']), ('chocolate chips', ['cups']), ('walnuts', ['cups']), ('almonds', ['cups', 'g']),
+    ('peanut butter', ['tbsp', 'cups']), ('oats', ['cups']), ('curry paste', ['tbsp']), ('garam masala', ['tsp']),
+    ('turmeric', ['tsp']), ('red pepper flakes', ['tsp', 'pinch']), ('white wine', ['cups', 'ml']), ('red wine', ['cups']),
+]
+QUANTITIES = ['1/4', '1/3', '1/2', '3/4', '1', '1 1/2', '2', '3', '4', '6', '200', '250', '400', '500']
+
+TITLE_STYLES = ['Easy', 'Creamy', 'Spicy', 'Roasted', 'Grilled', 'Crispy', 'Smoky', 'Lemony', 'Garlicky',
+                'Classic', 'Rustic', 'Weeknight', 'One-Pot', 'Sheet Pan', 'Slow Cooker', 'Honey-Glazed', 'Herbed']
+DISHES = ['Soup', 'Stew', 'Curry', 'Salad', 'Pasta', 'Bake', 'Stir-Fry', 'Tacos', 'Skillet', 'Casserole',
+          'Risotto', 'Bowl', 'Sandwich', 'Pie', 'Cake', 'Muffins', 'Bread', 'Frittata', 'Noodles', 'Chili']
+STEPS = [
+    'Preheat the oven to {temp}°F.',
+    'Chop the {a} and {b}.',
+    'Heat the {a} in a large pan over medium heat.',
+    'Add the {a} and cook for {minutes} minutes, stirring occasionally.',
+    'Whisk together the {a} and {b} in a bowl.',
+    'Stir in the {a} and season with {b}.',
+    'Simmer for {minutes} minutes until thickened.',
+    'Transfer to a baking dish and bake for {minutes} minutes.',
+    'Fold in the {a} gently.',
+    'Let rest for {minutes} minutes before serving.',
+    'Garnish with {a} and serve warm.',
+]
+DESCRIPTIONS = [
+    'A {style} {dish} built around {a} and {b}, ready in under {minutes} minutes.',
+    'Our go-to {dish}: {a}, {b} and plenty of flavor.',
+    'Comforting {dish} with {a}; great for meal prep.',
+    '',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates a reproducible synthetic dataset for benchmarking (see bench_api): '
+        'users, recipes with realistic ingredient/instruction JSON, the load_tags tags and '
+        'load_equipment equipment, plus the derived data (ingredient index, search '
+        'documents, recipe counts). Use a scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        size = parser.add_mutually_exclusive_group(required=True)
+        size.add_argument('--scale', choices=sorted(SCALES), help='Number of recipes: 10k, 100k or 1m.')
+        size.add_argument('--recipes', type=int, help='Exact number of recipes.')
+        parser.add_argument('--recipes-per-user', type=int, default=10, help='Average recipes per generated user.')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Recipes per transaction.')
+        parser.add_argument('--days', type=int, default=730, help='Spread created_at over this many past days.')
+        parser.add_argument('--random-seed', type=int, default=42, help='Seed for the data; same seed, same dataset.')
+        parser.add_argument('--label', help='Prefix keeping emails/slugs unique across runs (default: derived from the seed).')
+
+    def handle(self, *args, **options):
+        count = SCALES[options['scale']] if options['scale'] else options['recipes']
+        if count <= 0:
+            raise CommandError('Nothing to generate.')
+        self.seed = options['random_seed']
+        self.random = random.Random(self.seed)
+        self.label = options['label'] or f'b{options["random_seed"]}'
+        if CustomUser.objects.filter(email__startswith=f'bench-{self.label}-').exists():
+            raise CommandError(f'Data with label "{self.label}" exists already; pass another --label or --random-seed.')
+        start = time.perf_counter()
+
+        self.tags = sorted(resolve_named(Tag, TAGS).values(), key=lambda tag: tag.name)
+        self.equipment = sorted(resolve_named(Equipment, EQUIPMENT).values(), key=lambda item: item.name)
+        authors = self.create_users(max(1, count // options['recipes_per_user']))
+        self.now = timezone.now()
+        self.span = timedelta(days=options['days']).total_seconds()
+
+        for offset in range(0, count, options['batch_size']):
+            size = min(options['batch_size'], count - offset)
+            self.load_batch([self.build_recipe(offset + i, authors) for i in range(size)])
+            done = offset + size
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f'{done}/{count} recipes, {done / elapsed:.0f}/s')
+
+        for namespace in ('recipes', 'users', 'tags', 'equipment'):
+            bump_namespace(namespace)
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {len(authors)} users and {count} recipes in {time.perf_counter() - start:.1f}s '
+            f'(label "{self.label}")'
+        ))
+
+    def create_users(self, count):
+        password = make_password(None) # unusable; bench clients authenticate directly
+        users = [
+            CustomUser(
+                email=f'bench-{self.label}-{i}@example.com',
+                first_name=self.random.choice(['Ana', 'Ben', 'Chloe', 'Dev', 'Eli', 'Fatima', 'Gus', 'Hana']),
+                last_name=self.random.choice(['Lopez', 'Smith', 'Nguyen', 'Okafor', 'Rossi', 'Kim', 'Müller']),
+                password=password,
+            )
+            for i in range(count)
+        ]
+        CustomUser.objects.bulk_create(users, batch_size=2000)
+        return users
+
+    def build_recipe(self, index, authors):
+        """
+        Returns (recipe, created_at, tags, equipment) for recipe number
+        `index`. created_at is kept apart because bulk_create() overwrites the
+        auto_now(_add) fields on the instance. Each
+        recipe has its own seeded generator, so the dataset does not depend
+        on --batch-size.
+        """
+        rng = random.Random(f'{self.seed}:{index}')
+        picks = rng.sample(INGREDIENTS, rng.randint(4, 12))
+        names = [name for name, _ in picks]
+        style, dish = rng.choice(TITLE_STYLES), rng.choice(DISHES)
+        main = names[0].title()
+        title = f'{style} {main} {dish}'
+        fill = lambda template: template.format(
+            a=rng.choice(names), b=rng.choice(names), style=style.lower(), dish=dish.lower(),
+            minutes=rng.choice([5, 10, 15, 20, 30, 45]), temp=rng.choice([350, 375, 400, 425]),
+        )
+        created_at = self.now - timedelta(seconds=rng.random() * self.span)
+        recipe = Recipe(
+            author=rng.choice(authors),
+            title=title,
+            slug=f'{slugify(title)}-{self.label}-{index}',
+            description=fill(rng.choice(DESCRIPTIONS)) or None,
+            ingredients=[
+                {'item': name, 'quantity': f'{rng.choice(QUANTITIES)} {rng.choice(units)}'.strip()}
+                for name, units in picks
+            ],
+            instructions=[fill(step) for step in rng.sample(STEPS, rng.randint(3, 8))],
+            prep_time_minutes=rng.choice([5, 10, 15, 20, 30]),
+            cook_time_minutes=rng.choice([0, 10, 20, 30, 45, 60, 90, 180]),
+            servings=rng.choice([1, 2, 4, 4, 6, 8]),
+            difficulty=rng.choices(['Easy', 'Medium', 'Hard'], weights=[5, 4, 1])[0],
+        )
+        return recipe, created_at, rng.sample(self.tags, rng.randint(1, 5)), rng.sample(self.equipment, rng.randint(1, 4))
+
+    def load_batch(self, batch):
+        recipes = [recipe for recipe, _, _, _ in batch]
+        with transaction.atomic():
+            Recipe.objects.bulk_create(recipes)
+            # bulk_create stamps auto_now(_add) fields; put the spread-out dates back
+            for recipe, created_at, _, _ in batch:
+                recipe.created_at = recipe.updated_at = created_at
+            Recipe.objects.bulk_update(recipes, ['created_at', 'updated_at'])
+            Recipe.tags.through.objects.bulk_create([
+                Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag.pk)
+                for recipe, _, tags, _ in batch for tag in tags
+            ])
+            Recipe.equipment.through.objects.bulk_create([
+                Recipe.equipment.through(recipe_id=recipe.pk, equipment_id=item.pk)
+                for recipe, _, _, equipment in batch for item in equipment
+            ])
+            # bulk_create skips signals, so maintain the derived data explicitly
+            index_new_recipes(recipes)
+            count_new_recipes(recipes)
+            count_new_recipe_facets(recipes)
+            refresh_search_documents([recipe.pk for recipe in recipes])
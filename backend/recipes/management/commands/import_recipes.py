@@ -0,0 +1,228 @@
+import ast
+import csv
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipes.cache import bump_namespace
+from recipes.counters import count_new_recipes
+from recipes.facets import count_new_recipe_facets
+from recipes.ingredients import index_new_recipes
+from recipes.models import Recipe, Tag, Equipment
+from recipes.resolvers import clean_name, resolve_named
+from recipes.search import refresh_search_documents
+from recipes.slugs import bulk_create_with_slugs
+from users.models import CustomUser
+
+# CSV column aliases; the first header present wins. The defaults cover the
+# recipes_data.csv export previously loaded by python/clean_data.py.
+COLUMNS = {
+    'title': ('title', 'recipe_name', 'name'),
+    'description': ('description', 'summary'),
+    'ingredients': ('ingredients',),
+    'quantities': ('ingredients_quantity', 'quantities'),
+    'instructions': ('instructions', 'directions', 'steps'),
+    'servings': ('servings',),
+    'prep_time': ('prep_time_minutes', 'prep_time'),
+    'cook_time': ('cook_time_minutes', 'cook_time', 'total_time'),
+    'difficulty': ('difficulty',),
+    'tags': ('tags', 'categories', 'category'),
+    'equipment': ('equipment',),
+}
+
+_duration = re.compile(r'(\d+)\s*(d|h|m)', re.IGNORECASE)
+
+
+def parse_list(value, separator):
+    """
+    Parses a list cell: JSON/Python list literals, or text split on `separator`
+    (falling back to newlines).
+    """
+    value = (value or '').strip()
+    if not value:
+        return []
+    if value[0] == '[':
+        for loader in (json.loads, ast.literal_eval):
+            try:
+                parsed = loader(value)
+            except (ValueError, SyntaxError):
+                continue
+            return [str(item).strip() for item in parsed if str(item).strip()]
+    parts = value.split(separator) if separator in value else value.splitlines()
+    return [part.strip() for part in parts if part.strip()]
+
+
+def parse_minutes(value):
+    """
+    Parses '45', '45 mins', '1 hrs 20 mins' or '1d 2h' into minutes.
+    """
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        return max(int(float(value)), 0)
+    except ValueError:
+        pass
+    factors = {'d': 1440, 'h': 60, 'm': 1}
+    matches = _duration.findall(value)
+    if not matches:
+        return None
+    return sum(int(amount) * factors[unit.lower()] for amount, unit in matches)
+
+
+def parse_positive_int(value):
+    try:
+        number = int(float(value))
+    except (TypeError, ValueError):
+        return None
+    return number if number >= 0 else None
+
+
+class Command(BaseCommand):
+    help = (
+        'Streams a recipes CSV into Recipe/Tag/Equipment in chunks using bulk inserts. '
+        'Progress is checkpointed after every committed chunk so an interrupted import can be resumed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help='Path to the recipes CSV file.')
+        parser.add_argument('--author', required=True, help='Email of the existing user the recipes are attributed to.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per chunk/transaction.')
+        parser.add_argument('--separator', default='^', help='Separator for list cells that are not JSON/Python lists.')
+        parser.add_argument('--checkpoint', help='Checkpoint file (default: <csv_path>.checkpoint).')
+        parser.add_argument('--restart', action='store_true', help='Ignore any existing checkpoint.')
+        parser.add_argument('--limit', type=int, help='Stop after this many rows (for trial runs).')
+
+    def handle(self, *args, **options):
+        csv_path = Path(options['csv_path'])
+        if not csv_path.exists():
+            raise CommandError(f'CSV file not found: {csv_path}')
+        try:
+            self.author = CustomUser.objects.get(email=options['author'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f'No user with email "{options["author"]}"')
+
+        self.separator = options['separator']
+        checkpoint = Path(options['checkpoint'] or f'{csv_path}.checkpoint')
+        skip = 0 if options['restart'] or not checkpoint.exists() else int(checkpoint.read_text().strip() or 0)
+        if skip:
+            self.stdout.write(self.style.WARNING(f'Resuming after row {skip} (checkpoint {checkpoint})'))
+
+        csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+        processed, imported = skip, 0
+        start = time.perf_counter()
+        with csv_path.open(newline='', encoding='utf-8') as handle:
+            reader = csv.DictReader(handle)
+            self.columns = self.resolve_columns(reader.fieldnames or [])
+            chunk = []
+            for row_number, row in enumerate(reader, start=1):
+                if row_number <= skip:
+                    continue
+                if options['limit'] and row_number > skip + options['limit']:
+                    break
+                chunk.append(row)
+                if len(chunk) >= options['batch_size']:
+                    imported += self.load_chunk(chunk)
+                    processed += len(chunk)
+                    checkpoint.write_text(str(processed))
+                    self.report(processed, imported, start)
+                    chunk = []
+            if chunk:
+                imported += self.load_chunk(chunk)
+                processed += len(chunk)
+                checkpoint.write_text(str(processed))
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'\nFinished: {imported} recipes imported from {processed - skip} rows in {elapsed:.1f}s '
+            f'({(processed - skip) / elapsed if elapsed else 0:.0f} rows/sec).'
+        ))
+
+    def resolve_columns(self, fieldnames):
+        present = {name.strip().lower(): name for name in fieldnames}
+        columns = {}
+        for key, aliases in COLUMNS.items():
+            columns[key] = next((present[alias] for alias in aliases if alias in present), None)
+        if not columns['title']:
+            raise CommandError(f'CSV has no title column (expected one of {COLUMNS["title"]})')
+        return columns
+
+    def cell(self, row, key):
+        column = self.columns[key]
+        return row.get(column) if column else None
+
+    def report(self, processed, imported, start):
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'{processed} rows processed, {imported} imported, {imported / elapsed if elapsed else 0:.0f} rows/sec')
+
+    def build_recipe(self, row):
+        title = (self.cell(row, 'title') or '').strip()[:255]
+        if not title:
+            return None
+        items = parse_list(self.cell(row, 'ingredients'), self.separator)
+        quantities = parse_list(self.cell(row, 'quantities'), self.separator)
+        difficulty = (self.cell(row, 'difficulty') or '').strip().capitalize()
+        return Recipe(
+            author=self.author,
+            title=title,
+            description=(self.cell(row, 'description') or '').strip() or None,
+            ingredients=[
+                {'item': item, 'quantity': quantities[i] if i < len(quantities) else ''}
+                for i, item in enumerate(items)
+            ],
+            instructions=parse_list(self.cell(row, 'instructions'), self.separator),
+            servings=parse_positive_int(self.cell(row, 'servings')),
+            prep_time_minutes=parse_minutes(self.cell(row, 'prep_time')),
+            cook_time_minutes=parse_minutes(self.cell(row, 'cook_time')),
+            difficulty=difficulty if difficulty in dict(Recipe.difficulty_choices) else 'Medium',
+        )
+
+    def link_pairs(self, model, names_by_recipe):
+        """
+        Resolves (getting or creating) every name in the chunk with one
+        resolve_named() call and returns distinct (recipe_id, instance) pairs.
+        """
+        resolved = resolve_named(model, [name for names in names_by_recipe.values() for name in names])
+        pairs = {}
+        for recipe_id, names in names_by_recipe.items():
+            for name in names:
+                instance = resolved.get(clean_name(model, name).lower())
+                if instance is not None:
+                    pairs[(recipe_id, instance.pk)] = (recipe_id, instance)
+        return list(pairs.values())
+
+    def load_chunk(self, rows):
+        pairs = [(row, self.build_recipe(row)) for row in rows]
+        pairs = [(row, recipe) for row, recipe in pairs if recipe is not None]
+        if not pairs:
+            return 0
+        recipes = [recipe for _, recipe in pairs]
+
+        with transaction.atomic():
+            # Slugs are allocated with one query per chunk, re-allocated if a
+            # concurrent writer takes one of them before the insert
+            bulk_create_with_slugs(Recipe, recipes, [recipe.title for recipe in recipes])
+            # Tags/equipment for the whole chunk are resolved in one batch each
+            tag_names = {recipe.pk: parse_list(self.cell(row, 'tags'), ',') for row, recipe in pairs}
+            equipment_names = {recipe.pk: parse_list(self.cell(row, 'equipment'), ',') for row, recipe in pairs}
+            tag_links = [
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag.pk)
+                for recipe_id, tag in self.link_pairs(Tag, tag_names)
+            ]
+            equipment_links = [
+                Recipe.equipment.through(recipe_id=recipe_id, equipment_id=item.pk)
+                for recipe_id, item in self.link_pairs(Equipment, equipment_names)
+            ]
+            Recipe.tags.through.objects.bulk_create(tag_links, ignore_conflicts=True)
+            Recipe.equipment.through.objects.bulk_create(equipment_links, ignore_conflicts=True)
+
+            # bulk_create skips signals, so maintain the derived data explicitly
+            index_new_recipes(recipes)
+            count_new_recipes(recipes)
+            count_new_recipe_facets(recipes)
+            refresh_search_documents([recipe.pk for recipe in recipes])
+        bump_namespace('recipes')
+        return len(recipes)
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from recipes.facets import facet_counts, recount_facet_counts, stored_facet_counts
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconciles the FacetCount table (recipes per tag, difficulty and time bucket) '
+        'with the recipes. Only drifted counts are rewritten.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drifted counts without fixing them.')
+        parser.add_argument('--database', default='default', help='Database alias to reconcile.')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if options['dry_run']:
+            stored = stored_facet_counts(using=using)
+            actual = facet_counts(Recipe.objects.using(using))
+            drifted = sorted(key for key in stored.keys() | actual.keys() if stored[key] != actual[key])
+            for facet, value in drifted:
+                self.stdout.write(f'{facet}={value}: stored {stored[facet, value]}, actual {actual[facet, value]}')
+            self.stdout.write(f'{len(drifted)} facet counts drifted')
+            return
+        fixed = recount_facet_counts(using=using)
+        self.stdout.write(self.style.SUCCESS(f'Recounted facets: {fixed} facet counts fixed'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from recipes.counters import actual_recipe_count, recount_recipe_counts
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconciles CustomUser.recipe_count with the real number of recipes per author. '
+        'Only users whose count has drifted are rewritten, in a single UPDATE.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drifted users without fixing them.')
+        parser.add_argument('--database', default='default', help='Database alias to reconcile.')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if options['dry_run']:
+            drifted = (
+                CustomUser.objects.using(using)
+                .annotate(actual=actual_recipe_count())
+                .exclude(recipe_count=F('actual'))
+                .values_list('email', 'recipe_count', 'actual')
+            )
+            total = 0
+            for email, stored, actual in drifted:
+                self.stdout.write(f'{email}: stored {stored}, actual {actual}')
+                total += 1
+            self.stdout.write(f'{total} users drifted')
+            return
+        fixed = recount_recipe_counts(using=using)
+        self.stdout.write(self.style.SUCCESS(f'Recounted recipes: {fixed} users fixed'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from recipes.images import IMAGE_FIELDS, generate_variants, variants_field
+
+
+class Command(BaseCommand):
+    help = (
+        'Renders the image variants (recipes.images) of recipe images and profile pictures '
+        'that have none yet, or were uploaded before the pipeline existed. Runs inline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-render variants that are already up to date.')
+
+    def handle(self, *args, **options):
+        for model, field_name in IMAGE_FIELDS:
+            rendered = skipped = 0
+            rows = (
+                model._default_manager.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                .values_list('pk', field_name, variants_field(field_name))
+            )
+            for pk, name, variants in rows.iterator():
+                if not options['force'] and (variants or {}).get('source') == name:
+                    skipped += 1
+                    continue
+                if generate_variants(model, pk, field_name) is not None:
+                    rendered += 1
+            self.stdout.write(self.style.SUCCESS(
+                f'{model.__name__}.{field_name}: {rendered} rendered, {skipped} up to date'
+            ))
@@ -0,0 +1,46 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from recipes.jobs import claim_next, requeue_stale, run_job, worker_name
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs background jobs queued with JOB_QUEUE_MODE=database (recipes.jobs). '
+        'Failed jobs are retried with exponential backoff; jobs held by a worker that '
+        'died are requeued once their lease expires. Run as many workers as needed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due instead of polling.')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds between polls of an empty queue.')
+        parser.add_argument('--lease', type=int, default=300, help='Seconds after which a running job counts as abandoned.')
+        parser.add_argument('--max-jobs', type=int, default=0, help='Exit after this many jobs (0: no limit).')
+        parser.add_argument('--database', default='default', help='Database alias holding the queue.')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        lease = timedelta(seconds=options['lease'])
+        worker = worker_name()
+        done = failed = 0
+        next_sweep = 0
+        self.stdout.write(f'Worker {worker} started')
+        try:
+            while not options['max_jobs'] or done + failed < options['max_jobs']:
+                if time.monotonic() >= next_sweep:
+                    requeue_stale(lease, using=using)
+                    next_sweep = time.monotonic() + 30
+                job = claim_next(worker, using=using)
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+                if run_job(job, using=using):
+                    done += 1
+                else:
+                    failed += 1
+                    self.stderr.write(f'Job {job.pk} ({job.name}) failed on attempt {job.attempts}/{job.max_attempts}')
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'{done} jobs done, {failed} failed'))
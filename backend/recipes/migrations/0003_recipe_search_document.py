@@ -0,0 +1,83 @@
+# Generated by Django 6.1.2 on 2026-10-18 10:08
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+
+# Frozen copies of the recipes.search / recipes.ingredients helpers as of this
+# migration, so later changes to the app code don't change what it does.
+SEARCH_CONFIG = 'english'
+
+
+def ingredient_names(ingredients):
+    names = []
+    for ingredient in ingredients or []:
+        if isinstance(ingredient, dict):
+            ingredient = ingredient.get('item')
+        if isinstance(ingredient, str) and ingredient.strip():
+            names.append(ingredient.strip())
+    return names
+
+
+def build_search_keywords(recipe):
+    words = [tag.name for tag in recipe.tags.all()]
+    words.extend(ingredient_names(recipe.ingredients))
+    words.extend(item.name for item in recipe.equipment.all())
+    return ' '.join(words)
+
+
+def search_vector_expression():
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('search_keywords', weight='B', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def create_search_index(apps, schema_editor):
+    # GIN indexes are PostgreSQL-only; other backends use the icontains fallback
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS recipes_recipe_search_vector_gin '
+        'ON recipes_recipe USING gin (search_vector)'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS recipes_recipe_search_vector_gin')
+
+
+def backfill_search_documents(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    db_alias = schema_editor.connection.alias
+    recipes = list(Recipe.objects.using(db_alias).prefetch_related('tags', 'equipment'))
+    for recipe in recipes:
+        recipe.search_keywords = build_search_keywords(recipe)
+    Recipe.objects.using(db_alias).bulk_update(recipes, ['search_keywords'], batch_size=500)
+    if schema_editor.connection.vendor == 'postgresql':
+        Recipe.objects.using(db_alias).update(search_vector=search_vector_expression())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_keywords',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
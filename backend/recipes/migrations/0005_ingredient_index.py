@@ -0,0 +1,91 @@
+# Generated by Django 6.1.2 on 2026-10-18 10:11
+
+import django.db.models.deletion
+import re
+import uuid
+from django.db import migrations, models
+
+# Frozen copies of the recipes.ingredients helpers as of this migration, so
+# later changes to the app code don't change what it does.
+_whitespace = re.compile(r'\s+')
+
+
+def ingredient_names(ingredients):
+    names = []
+    for ingredient in ingredients or []:
+        if isinstance(ingredient, dict):
+            ingredient = ingredient.get('item')
+        if isinstance(ingredient, str) and ingredient.strip():
+            names.append(ingredient.strip())
+    return names
+
+
+def canonical_ingredient_names(ingredients):
+    names = (_whitespace.sub(' ', name.strip().strip('.,;:').lower())[:255] for name in ingredient_names(ingredients))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def backfill_ingredient_index(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    db_alias = schema_editor.connection.alias
+
+    names_by_recipe = {
+        recipe_id: canonical_ingredient_names(ingredients)
+        for recipe_id, ingredients in Recipe.objects.using(db_alias).values_list('id', 'ingredients').iterator()
+    }
+    all_names = {name for names in names_by_recipe.values() for name in names}
+    Ingredient.objects.using(db_alias).bulk_create(
+        [Ingredient(name=name) for name in all_names], batch_size=1000, ignore_conflicts=True
+    )
+    ids = dict(Ingredient.objects.using(db_alias).values_list('name', 'id'))
+    RecipeIngredient.objects.using(db_alias).bulk_create(
+        [
+            RecipeIngredient(recipe_id=recipe_id, ingredient_id=ids[name])
+            for recipe_id, names in names_by_recipe.items()
+            for name in names
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    for recipe_id, names in names_by_recipe.items():
+        Recipe.objects.using(db_alias).filter(pk=recipe_id).update(ingredient_count=len(names))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ingredient',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='RecipeIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_ingredients', to='recipes.ingredient')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_ingredients', to='recipes.recipe')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('ingredient', 'recipe'), name='recipe_ingredient_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_ingredient_index, migrations.RunPython.noop),
+    ]
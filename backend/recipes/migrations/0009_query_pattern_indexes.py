@@ -0,0 +1,63 @@
+# Generated by Django 6.1.2 on 2026-10-18 11:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+def create_title_trigram_index(apps, schema_editor):
+    # Trigram GIN indexes are PostgreSQL-only. UPPER() matches what Django
+    # generates for title__istartswith / title__icontains.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS recipes_recipe_title_trgm '
+        'ON recipes_recipe USING gin (UPPER(title) gin_trgm_ops)'
+    )
+
+
+def drop_title_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS recipes_recipe_title_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # The composite index leads with author_id, so it takes over from the FK index
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', 'created_at', 'id'], name='recipe_author_created_idx'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='author',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='recipes', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['difficulty', 'created_at', 'id'], name='recipe_difficulty_created_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='job',
+            name='job_status_run_after_idx',
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(condition=models.Q(('status', 'queued')), fields=['run_after', 'id'], name='job_queued_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(condition=models.Q(('status', 'running')), fields=['locked_at'], name='job_running_locked_idx'),
+        ),
+        # No-op on other databases
+        TrigramExtension(),
+        migrations.RunPython(create_title_trigram_index, drop_title_trigram_index),
+    ]
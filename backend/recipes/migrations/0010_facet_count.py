@@ -0,0 +1,69 @@
+# Generated by Django 6.1.2 on 2026-10-18 11:26
+
+import uuid
+from collections import Counter
+from django.db import migrations, models
+from django.db.models import Case, CharField, Count, F, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import LessThan
+
+# Frozen copies of the recipes.facets helpers as of this migration, so later
+# changes to the app code don't change what it does.
+TIME_BUCKETS = [('under-15', 15), ('15-30', 30), ('30-60', 60), ('60-plus', None)]
+
+
+def tag_value(tag_id):
+    return str(uuid.UUID(str(tag_id)))
+
+
+def time_bucket_expression():
+    total = Coalesce(F('prep_time_minutes'), Value(0)) + Coalesce(F('cook_time_minutes'), Value(0))
+    return Case(
+        When(prep_time_minutes__isnull=True, cook_time_minutes__isnull=True, then=Value(None)),
+        *[When(LessThan(total, limit), then=Value(bucket)) for bucket, limit in TIME_BUCKETS if limit is not None],
+        default=Value(TIME_BUCKETS[-1][0]),
+        output_field=CharField(),
+    )
+
+
+def backfill_facet_counts(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    FacetCount = apps.get_model('recipes', 'FacetCount')
+    db_alias = schema_editor.connection.alias
+
+    counts = Counter()
+    rows = Recipe.objects.using(db_alias).order_by().values('difficulty', bucket=time_bucket_expression()).annotate(total=Count('pk'))
+    for row in rows:
+        counts['difficulty', row['difficulty']] += row['total']
+        if row['bucket'] is not None:
+            counts['time', row['bucket']] += row['total']
+    tags = Recipe.tags.through.objects.using(db_alias).order_by().values('tag_id').annotate(total=Count('pk'))
+    for row in tags:
+        counts['tag', tag_value(row['tag_id'])] += row['total']
+    FacetCount.objects.using(db_alias).bulk_create(
+        [FacetCount(facet=facet, value=value, count=count) for (facet, value), count in counts.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_query_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(choices=[('tag', 'Tag'), ('difficulty', 'Difficulty'), ('time', 'Total time')], max_length=20)),
+                ('value', models.CharField(max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('facet', 'value'), name='facet_count_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_facet_counts, migrations.RunPython.noop),
+    ]
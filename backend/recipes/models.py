@@ -1,11 +1,14 @@
 import uuid
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
 from django.conf import settings
-from django.utils.text import slugify
+from django.utils import timezone
 from django.db.models.signals import pre_save
 from django.dispatch import receiver
+from .slugs import UniqueSlugMixin, unique_slug
+from .tracking import TrackedFieldsMixin
 
-class Tag(models.Model):
+class Tag(UniqueSlugMixin, TrackedFieldsMixin, models.Model):
     """
     Represents a tag that can be applied to recipes.
     This now encompasses what were previously 'categories' and 'tags'.
@@ -27,27 +30,24 @@ class Tag(models.Model):
         return self.name
 
 @receiver(pre_save, sender=Tag)
-def pre_save_tag_slug(sender, instance, **kwargs):
+def pre_save_tag_slug(sender, instance, using='default', **kwargs):
     """
     Automatically generates a slug for the Tag model if it doesn't exist.
-    Ensures slug is unique.
+    Ensures slug is unique (one query, see recipes.slugs.unique_slug).
     """
     if not instance.slug:
-        base_slug = slugify(instance.name)
-        slug = base_slug
-        counter = 1
-        while Tag.objects.filter(slug=slug).exists():
-            slug = f"{base_slug}-{counter}"
-            counter += 1
-        instance.slug = slug
-
-class Recipe(models.Model):
+        instance.slug = unique_slug(Tag, instance.name, using=using)
+
+class Recipe(UniqueSlugMixin, TrackedFieldsMixin, models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='recipes')
+    # Indexed by recipe_author_created_idx (author first), so no separate FK index
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='recipes', db_index=False)
     title = models.CharField(max_length=255)
     slug = models.SlugField(max_length=255, unique=True, blank=True)
     description = models.TextField(blank=True, null=True)
     main_image = models.ImageField(upload_to='recipe_images/', blank=True, null=True)
+    # Resized/re-encoded copies of main_image, rendered by recipes.images
+    main_image_variants = models.JSONField(default=dict, blank=True, editable=False)
     ingredients = models.JSONField(default=list) # [{'item': 'flour', 'quantity': '2 cups'}]
     instructions = models.JSONField(default=list) # ['step 1', 'step 2']
     prep_time_minutes = models.PositiveIntegerField(blank=True, null=True)
@@ -69,29 +69,51 @@ class Recipe(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Number of distinct canonical ingredients; maintained with the RecipeIngredient index
+    ingredient_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Denormalized search document, maintained by recipes.search signals.
+    # search_keywords holds tag, equipment and ingredient names so searching
+    # never has to join through the M2M tables or scan the ingredients JSON.
+    search_keywords = models.TextField(blank=True, default='', editable=False)
+    # Weighted tsvector (title A, keywords B, description C); GIN-indexed on PostgreSQL
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
+
+    # The slug is re-derived from the title by pre_save_recipe_slug
+    tracked_derived_fields = {'slug': ['title']}
+
     class Meta:
         ordering = ['-created_at']
+        # Composite (sort key, id) indexes backing keyset pagination over ordering_fields
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='recipe_created_id_idx'),
+            models.Index(fields=['title', 'id'], name='recipe_title_id_idx'),
+            models.Index(fields=['difficulty', 'id'], name='recipe_difficulty_id_idx'),
+            # MAX(updated_at) validator for ETags (recipes.conditional)
+            models.Index(fields=['updated_at'], name='recipe_updated_at_idx'),
+            # ?author_id= / ?difficulty= feeds in the default -created_at order, read
+            # straight off the index. Title prefix search uses a PostgreSQL trigram
+            # index created in migration 0009.
+            models.Index(fields=['author', 'created_at', 'id'], name='recipe_author_created_idx'),
+            models.Index(fields=['difficulty', 'created_at', 'id'], name='recipe_difficulty_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
 @receiver(pre_save, sender=Recipe)
-def pre_save_recipe_slug(sender, instance, **kwargs):
+def pre_save_recipe_slug(sender, instance, using='default', **kwargs):
     """
     Automatically generates a slug for the Recipe model if it doesn't exist or title changes.
-    Ensures slug is unique.
+    Ensures slug is unique (one query, see recipes.slugs.unique_slug).
+    Title changes are detected from the values the instance was loaded with,
+    so no extra SELECT is needed.
     """
-    if not instance.slug or (instance.pk and sender.objects.get(pk=instance.pk).title != instance.title):
-        base_slug = slugify(instance.title)
-        slug = base_slug
-        counter = 1
-        while Recipe.objects.filter(slug=slug).exists():
-            slug = f"{base_slug}-{counter}"
-            counter += 1
-        instance.slug = slug
+    if not instance.slug or (not instance._state.adding and instance.has_changed('title')):
+        instance.slug = unique_slug(Recipe, instance.title, using=using, exclude_pk=instance.pk)
 
 
-class Equipment(models.Model):
+class Equipment(UniqueSlugMixin, TrackedFieldsMixin, models.Model):
     """
     Represents a piece of equipment used in recipes.
     """
@@ -111,16 +133,114 @@ class Equipment(models.Model):
         return self.name
 
 @receiver(pre_save, sender=Equipment)
-def pre_save_equipment_slug(sender, instance, **kwargs):
+def pre_save_equipment_slug(sender, instance, using='default', **kwargs):
     """
     Automatically generates a slug for the Equipment model if it doesn't exist.
-    Ensures slug is unique.
+    Ensures slug is unique (one query, see recipes.slugs.unique_slug).
     """
     if not instance.slug:
-        base_slug = slugify(instance.name)
-        slug = base_slug
-        counter = 1
-        while Equipment.objects.filter(slug=slug).exists():
-            slug = f"{base_slug}-{counter}"
-            counter += 1
-        instance.slug = slug
\ No newline at end of file
+        instance.slug = unique_slug(Equipment, instance.name, using=using)
+
+
+class Ingredient(models.Model):
+    """
+    A canonical ingredient name (lower-cased, whitespace-collapsed), built from
+    the free-form Recipe.ingredients JSON. Together with RecipeIngredient this
+    forms an inverted index from ingredient to recipes.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=255, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class RecipeIngredient(models.Model):
+    """
+    Join row linking a recipe to one canonical ingredient.
+    Rows are derived from Recipe.ingredients by recipes.ingredients and never edited directly.
+    """
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='recipe_ingredients')
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, related_name='recipe_ingredients')
+
+    class Meta:
+        constraints = [
+            # (ingredient, recipe) order so the unique index doubles as the inverted index
+            models.UniqueConstraint(fields=['ingredient', 'recipe'], name='recipe_ingredient_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.ingredient_id}'
+
+
+class FacetCount(models.Model):
+    """
+    Number of recipes per tag, difficulty and total-time bucket, maintained
+    incrementally by recipes.facets so the unfiltered facets are one small read.
+    """
+    TAG, DIFFICULTY, TIME = 'tag', 'difficulty', 'time'
+    facet_choices = [
+        (TAG, 'Tag'),
+        (DIFFICULTY, 'Difficulty'),
+        (TIME, 'Total time'),
+    ]
+
+    facet = models.CharField(max_length=20, choices=facet_choices)
+    value = models.CharField(max_length=100) # Tag id, difficulty or time bucket
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['facet', 'value'], name='facet_count_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.facet}={self.value}: {self.count}'
+
+
+class Job(models.Model):
+    """
+    A background task queued by recipes.jobs.enqueue() in 'database' mode and
+    executed by `manage.py run_jobs`. Finished jobs are deleted; jobs that
+    exhausted their attempts stay behind as 'failed' with the last traceback.
+    """
+    QUEUED, RUNNING, FAILED = 'queued', 'running', 'failed'
+    status_choices = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    # Idempotency key: at most one queued job per key
+    key = models.CharField(max_length=255, blank=True, null=True)
+    status = models.CharField(max_length=10, choices=status_choices, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=255, blank=True, default='')
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['run_after', 'id']
+        # Partial indexes: only the rows the worker looks for, not the failed backlog
+        indexes = [
+            # The worker's "next due job" lookup (claim_next)
+            models.Index(fields=['run_after', 'id'], condition=models.Q(status='queued'), name='job_queued_due_idx'),
+            # Expired leases (requeue_stale)
+            models.Index(fields=['locked_at'], condition=models.Q(status='running'), name='job_running_locked_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['key'], condition=models.Q(status='queued'), name='job_queued_key_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
@@ -0,0 +1,228 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination: each page is fetched with
+    `WHERE (sort_key, id) > (last_sort_key, last_id) ORDER BY sort_key, id LIMIT n`
+    instead of `OFFSET`, and no `COUNT(*)` is issued, so page 10,000 costs the
+    same as page 1 when the ordering is backed by a composite index.
+
+    The ordering is whatever the queryset already carries (i.e. the result of
+    OrderingFilter / the view's default `ordering`), with the primary key
+    appended as a unique tiebreaker. The opaque cursor encodes the sort values
+    of the boundary row plus the ordering it was generated for; a cursor from a
+    different ordering is rejected.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        paginate_queryset() for async views, fetching the page with the async ORM.
+        """
+        return self.set_page([row async for row in self.page_queryset(queryset, request)])
+
+    def page_queryset(self, queryset, request):
+        """
+        Returns the (lazy) queryset for the requested page plus one extra
+        row, which tells whether there is more in the direction of travel.
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(queryset)
+        self.cursor = self.decode_cursor(request, queryset.model)
+
+        self.reverse = bool(self.cursor and self.cursor['reverse'])
+        ordering = [(name, not desc) for name, desc in self.ordering] if self.reverse else self.ordering
+        queryset = queryset.order_by(*[f"{'-' if desc else ''}{name}" for name, desc in ordering])
+        if self.cursor:
+            queryset = queryset.filter(self.keyset_filter(ordering, self.cursor['values']))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        # Moving forwards there is a previous page iff we came from a cursor;
+        # moving backwards there is a next page by construction.
+        self.has_next = has_more if not self.reverse else True
+        self.has_previous = bool(self.cursor) if not self.reverse else has_more
+        self.page = rows
+        return rows
+
+    def get_ordering(self, queryset):
+        """
+        Returns the queryset's ordering as [(field_name, descending), ...]
+        with the primary key appended so every position is unique.
+        """
+        order_by = queryset.query.order_by or queryset.model._meta.ordering
+        ordering = []
+        for item in order_by:
+            if not isinstance(item, str):
+                # Expressions can't be encoded into a cursor; ignore them
+                continue
+            name = item.lstrip('-')
+            ordering.append(('pk' if name == 'id' else name, item.startswith('-')))
+        if not any(name == 'pk' for name, _ in ordering):
+            desc = ordering[-1][1] if ordering else False
+            ordering.append(('pk', desc))
+        return ordering
+
+    def keyset_filter(self, ordering, values):
+        """
+        Builds `(a, b, c) > (x, y, z)` (respecting per-column direction) as
+        `a >= x AND (a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z))`.
+        The leading range predicate lets the database seek straight into the index.
+        """
+        first_name, first_desc = ordering[0]
+        condition = Q(**{f"{first_name}__{'lte' if first_desc else 'gte'}": values[0]})
+        disjunction = Q()
+        for i, (name, desc) in enumerate(ordering):
+            equal = {prev_name: values[j] for j, (prev_name, _) in enumerate(ordering[:i])}
+            disjunction |= Q(**equal, **{f"{name}__{'lt' if desc else 'gt'}": values[i]})
+        return condition & disjunction
+
+    def field_value(self, row, name):
+        if isinstance(row, dict):
+            # .values() rows (recipes.readers)
+            return row[name]
+        return row.pk if name == 'pk' else getattr(row, name)
+
+    def to_json(self, value):
+        if isinstance(value, (int, float)) or value is None:
+            return value
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return str(value)
+
+    def to_python(self, model, name, value):
+        """
+        Converts a JSON cursor value back into the model field's Python type.
+        Annotations (e.g. search_rank) are passed through as-is.
+        """
+        try:
+            field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return value
+        return field.to_python(value)
+
+    def ordering_key(self):
+        return [f"{'-' if desc else ''}{name}" for name, desc in self.ordering]
+
+    def encode_token(self, row, reverse):
+        payload = {
+            'o': self.ordering_key(),
+            'v': [self.to_json(self.field_value(row, name)) for name, _ in self.ordering],
+            'r': reverse,
+        }
+        return urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+    def encode_cursor(self, row, reverse):
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_token(row, reverse))
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(urlsafe_b64decode(token.encode()))
+            if payload['o'] != self.ordering_key() or len(payload['v']) != len(self.ordering):
+                raise ValueError('cursor ordering mismatch')
+            values = [self.to_python(model, name, value) for (name, _), value in zip(self.ordering, payload['v'])]
+            return {'values': values, 'reverse': bool(payload.get('r'))}
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class RecipePagination(PageNumberPagination):
+    """
+    Page-number pagination by default (keeps `count` and `?page=` for the
+    existing frontend), switching to KeysetPagination when the client opts in
+    by sending `?cursor=` (an empty value requests the first page).
+    """
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return await self.keyset.apaginate_queryset(queryset, request, view)
+        return await apaginate_page_number(self, queryset, request)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+async def apaginate_page_number(paginator, queryset, request):
+    """
+    PageNumberPagination.paginate_queryset() for async views: the COUNT and
+    the page itself are fetched with the async ORM, then the regular
+    (sync, query-free) link building works on the filled-in page.
+    """
+    page_size = paginator.get_page_size(request)
+    if not page_size:
+        return None
+    django_paginator = paginator.django_paginator_class(queryset, page_size)
+    django_paginator.count = await queryset.acount() # pre-fills the cached_property
+    page_number = paginator.get_page_number(request, django_paginator)
+    try:
+        paginator.page = django_paginator.page(page_number)
+    except InvalidPage as exc:
+        raise NotFound(paginator.invalid_page_message.format(page_number=page_number, message=str(exc)))
+    paginator.page.object_list = [row async for row in paginator.page.object_list]
+    paginator.request = request
+    return list(paginator.page)
@@ -0,0 +1,114 @@
+from functools import lru_cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def _concrete_field_names(model, serializer):
+    """
+    Returns the concrete model columns a nested serializer actually reads,
+    always including the primary key so the rows can be matched up again.
+    """
+    names = {model._meta.pk.attname}
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*' or '.' in field.source:
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            continue
+        if model_field.concrete and not model_field.many_to_many:
+            names.add(model_field.attname)
+    return tuple(sorted(names))
+
+
+def _collect_relations(serializer, model, prefix=''):
+    """
+    Walks the readable fields of `serializer` and returns the relation paths
+    that need select_related(), the (path, model, only-fields) triples
+    that need prefetch_related() and the columns (as only() names) the
+    serializer reads from `model` and its select_related() rows.
+    """
+    select, prefetch = [], []
+    columns = {f'{prefix}{model._meta.pk.name}'}
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*' or '.' in field.source:
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            continue
+        path = f'{prefix}{field.source}'
+        if not model_field.is_relation:
+            if model_field.concrete:
+                columns.add(path)
+            continue
+        related_model = model_field.related_model
+
+        if isinstance(field, serializers.ListSerializer):
+            # Nested many serializer (e.g. tags = TagSerializer(many=True))
+            prefetch.append((path, related_model, _concrete_field_names(related_model, field.child)))
+        elif isinstance(field, serializers.ManyRelatedField):
+            # PrimaryKeyRelatedField(many=True) and friends only need the ids
+            prefetch.append((path, related_model, (related_model._meta.pk.attname,)))
+        elif model_field.many_to_one or model_field.one_to_one:
+            select.append(path)
+            columns.add(path)
+            if isinstance(field, serializers.BaseSerializer):
+                nested_select, nested_prefetch, nested_columns = _collect_relations(field, related_model, prefix=f'{path}__')
+                select.extend(nested_select)
+                prefetch.extend(nested_prefetch)
+                columns.update(nested_columns)
+    return select, prefetch, columns
+
+
+@lru_cache(maxsize=256)
+def _query_plan(serializer_class, selection=None):
+    """
+    Computes (and caches) the relation plan for a serializer class and
+    field selection (see recipes.serializers.field_selection). Serializer
+    fields are declared at class level, so the plan never changes.
+    """
+    serializer = serializer_class(context={'field_selection': selection})
+    select, prefetch, columns = _collect_relations(serializer, serializer_class.Meta.model)
+    # Columns read by SerializerMethodFields and the like
+    columns.update(getattr(serializer_class.Meta, 'extra_columns', ()))
+    return tuple(select), tuple(prefetch), frozenset(columns)
+
+
+def only_serialized_columns(queryset, serializer_class, selection=None):
+    """
+    Restricts `queryset` with only() to the columns `serializer_class` renders
+    for `selection`, plus the ordering columns (keyset pagination reads them
+    back), so unrendered JSON/text columns are never fetched. Apply it after
+    filtering and ordering, and only on read paths: saving a partially
+    loaded instance writes just its loaded columns.
+    """
+    columns = set(_query_plan(serializer_class, selection)[2])
+    for expression in queryset.query.order_by:
+        if isinstance(expression, str):
+            try:
+                field = queryset.model._meta.get_field(expression.lstrip('-'))
+            except FieldDoesNotExist:
+                continue
+            if field.concrete:
+                columns.add(field.name)
+    return queryset.only(*columns)
+
+
+def optimize_for_serializer(queryset, serializer_class, selection=None):
+    """
+    Applies select_related()/prefetch_related() to `queryset` based on the
+    nested fields declared on `serializer_class` (narrowed to `selection`),
+    so rendering a page costs a constant number of queries instead of one
+    per related object.
+    """
+    select, prefetch, _ = _query_plan(serializer_class, selection)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*[
+            Prefetch(path, queryset=related_model._default_manager.only(*only_fields))
+            for path, related_model, only_fields in prefetch
+        ])
+    return queryset
@@ -0,0 +1,211 @@
+from functools import lru_cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import serializers
+from rest_framework.response import Response
+from api.instrumentation import measure_serialization
+from .images import ImageVariantsField
+
+
+class UnsupportedField(Exception):
+    """
+    A readable serializer field that can't be produced from .values() rows.
+    """
+
+
+def _compile(serializer, model, prefix=''):
+    """
+    Turns the readable fields of `serializer` into build steps over
+    `.values()` lookups (prefixed for select_related-style joins).
+    """
+    steps = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        source = field.source
+        if source == '*' or '.' in source:
+            raise UnsupportedField(name)
+        try:
+            model_field = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            raise UnsupportedField(name)
+
+        if isinstance(field, serializers.ListSerializer):
+            if prefix or not isinstance(model_field, models.ManyToManyField):
+                raise UnsupportedField(name)
+            steps.append(('many', name, _many_plan(model_field, field.child)))
+        elif isinstance(field, serializers.BaseSerializer):
+            if not (model_field.many_to_one or model_field.one_to_one):
+                raise UnsupportedField(name)
+            related_model = model_field.related_model
+            nested_prefix = f'{prefix}{source}__'
+            steps.append(('nested', name, f'{nested_prefix}{related_model._meta.pk.name}', _compile(field, related_model, nested_prefix)))
+        elif model_field.is_relation or isinstance(field, (serializers.RelatedField, serializers.ManyRelatedField, serializers.SerializerMethodField, serializers.HiddenField)):
+            raise UnsupportedField(name)
+        else:
+            storage = getattr(model_field, 'storage', None) if isinstance(field, serializers.FileField) else None
+            steps.append(('value', name, f'{prefix}{model_field.name}', (field, storage)))
+    return steps
+
+
+def _many_plan(model_field, child):
+    """
+    Reads a nested many=True serializer from the M2M through table joined to
+    the target, in the target's default ordering (as a prefetch would).
+    """
+    through = model_field.remote_field.through
+    source_column = model_field.m2m_column_name()
+    target = model_field.m2m_reverse_field_name()
+    related_model = model_field.related_model
+    child_steps = _compile(child, related_model, f'{target}__')
+    ordering = [
+        f"{'-' if name.startswith('-') else ''}{target}__{name.lstrip('-')}"
+        for name in related_model._meta.ordering
+    ] or [through._meta.pk.name]
+    return through, source_column, child_steps, ordering
+
+
+def _lookups(steps):
+    for kind, _, *rest in steps:
+        if kind == 'value':
+            yield rest[0]
+        elif kind == 'nested':
+            yield rest[0]
+            yield from _lookups(rest[1])
+
+
+def _build(steps, row, many, request):
+    data = {}
+    for kind, name, *rest in steps:
+        if kind == 'value':
+            data[name] = _value(*rest[1], row[rest[0]], request)
+        elif kind == 'nested':
+            data[name] = None if row[rest[0]] is None else _build(rest[1], row, many, request)
+        else:
+            data[name] = many[name].get(row['pk'], [])
+    return data
+
+
+def _value(field, storage, value, request):
+    """
+    Mirrors DRF's Serializer.to_representation for one value: None stays
+    None and files (and image variants) become absolute URLs without a
+    FieldFile in between.
+    """
+    if value is None:
+        return None
+    if isinstance(field, ImageVariantsField):
+        return field.represent(value, request)
+    if storage is not None:
+        if not value:
+            return None
+        if not getattr(field, 'use_url', True):
+            return value
+        url = storage.url(value)
+        return request.build_absolute_uri(url) if request is not None else url
+    return field.to_representation(value)
+
+
+class ValuesReader:
+    """
+    Read-only fast path for a (field-selected) ModelSerializer: the output is
+    built from `.values()` rows plus one through-table query per nested
+    many=True field, straight into plain dicts, with no model instances and
+    no per-object serializer machinery. Scalar values still go through the
+    DRF fields' to_representation, so output matches the serializer.
+    """
+
+    def __init__(self, serializer):
+        self.model = serializer.Meta.model
+        self.steps = _compile(serializer, self.model)
+        self.columns = tuple(dict.fromkeys(['pk', *_lookups(self.steps)]))
+
+    def values(self, queryset, *extra):
+        """
+        `queryset` as a .values() queryset with every column the output
+        needs plus `extra` ones (e.g. ordering keys read by the paginator).
+        """
+        return queryset.prefetch_related(None).values(*dict.fromkeys([*self.columns, *extra]))
+
+    def render(self, rows, request=None):
+        rows = list(rows)
+        many = {
+            name: _group(plan, related, request)
+            for name, plan, related in self._related_querysets(rows)
+        }
+        with measure_serialization():
+            return [_build(self.steps, row, many, request) for row in rows]
+
+    async def arender(self, rows, request=None):
+        """
+        render() for async views: `rows` are .values() rows that were already
+        fetched, and the through-table queries use the async ORM.
+        """
+        many = {}
+        for name, plan, related in self._related_querysets(rows):
+            many[name] = _group(plan, [row async for row in related], request)
+        with measure_serialization():
+            return [_build(self.steps, row, many, request) for row in rows]
+
+    def _related_querysets(self, rows):
+        """
+        Yields (name, plan, queryset) for every nested many=True field: the
+        through-table rows of `rows`' recipes joined to the target.
+        """
+        ids = [row['pk'] for row in rows]
+        for kind, name, *rest in self.steps:
+            if kind == 'many':
+                through, source_column, child_steps, ordering = plan = rest[0]
+                source = through._meta.get_field(source_column).name
+                related = (
+                    through._default_manager.filter(**{f'{source}__in': ids})
+                    .order_by(*ordering)
+                    .values(source_column, *dict.fromkeys(_lookups(child_steps)))
+                )
+                yield name, plan, related if ids else related.none()
+
+
+def _group(plan, related_rows, request):
+    """
+    Builds {source_id: [child representation, ...]} from through-table rows.
+    """
+    _, source_column, child_steps, _ = plan
+    grouped = {}
+    for row in related_rows:
+        grouped.setdefault(row[source_column], []).append(_build(child_steps, row, {}, request))
+    return grouped
+
+
+@lru_cache(maxsize=256)
+def values_reader(serializer_class, selection=None):
+    """
+    Returns the (cached) ValuesReader for a serializer class and field
+    selection, or None when some readable field needs the regular path
+    (method fields, plain related fields, dotted sources ...).
+    """
+    try:
+        return ValuesReader(serializer_class(context={'field_selection': selection}))
+    except UnsupportedField:
+        return None
+
+
+class ValuesListMixin:
+    """
+    Serves `list` through values_reader() when the list serializer allows it
+    and falls back to the regular list otherwise. Filtering, ordering and
+    pagination are unchanged; the paginator just pages over dict rows.
+    """
+
+    def list(self, request, *args, **kwargs):
+        get_selection = getattr(self, 'get_field_selection', None)
+        reader = values_reader(self.get_serializer_class(), get_selection() if get_selection else None)
+        if reader is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        ordering = [name.lstrip('-') for name in queryset.query.order_by if isinstance(name, str)]
+        rows = reader.values(queryset, *ordering)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(reader.render(page, request))
+        return Response(reader.render(rows, request))
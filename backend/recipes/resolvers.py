@@ -0,0 +1,76 @@
+import re
+from django.db.models.functions import Lower
+from .cache import MODEL_NAMESPACES, bump_namespace_on_commit
+from .slugs import allocate_slugs
+
+_whitespace = re.compile(r'\s+')
+
+
+def normalize_name(name):
+    """
+    Collapses internal whitespace and strips the ends of a user-supplied name.
+    """
+    return _whitespace.sub(' ', name or '').strip()
+
+
+def clean_name(model, name):
+    """
+    Normalizes `name` and truncates it to the model's name max_length.
+    """
+    return normalize_name(name)[:model._meta.get_field('name').max_length]
+
+
+def resolve_named(model, names, using='default'):
+    """
+    Batched get-or-create for name-keyed models (Tag, Equipment).
+
+    Returns {lower-cased clean_name: instance} for every non-blank name,
+    matching existing rows case-insensitively ("Wok" and " wok " are one
+    name). Costs at most four queries however many names are passed: one
+    lookup, one slug allocation and one bulk insert for the missing names,
+    and one re-fetch. Rows that lose an insert race are picked
+    up by the re-fetch; anything still missing falls back to get_or_create().
+    """
+    wanted = {}
+    for name in names:
+        name = clean_name(model, name)
+        if name:
+            wanted.setdefault(name.lower(), name)
+    if not wanted:
+        return {}
+
+    manager = model._default_manager.using(using)
+    resolved = {}
+
+    def fetch(keys):
+        rows = manager.annotate(name_key=Lower('name')).filter(name_key__in=keys)
+        for instance in rows:
+            # Prefer the exact-case row if several differ only in case
+            if instance.name_key not in resolved or instance.name == wanted[instance.name_key]:
+                resolved[instance.name_key] = instance
+
+    fetch(list(wanted))
+    missing = [key for key in wanted if key not in resolved]
+    if missing:
+        slugs = allocate_slugs(model, [wanted[key] for key in missing], using=using)
+        manager.bulk_create(
+            [model(name=wanted[key], slug=slug) for key, slug in zip(missing, slugs)],
+            ignore_conflicts=True,
+        )
+        # bulk_create sends no post_save, so invalidate cached listings here
+        if model in MODEL_NAMESPACES:
+            bump_namespace_on_commit(MODEL_NAMESPACES[model], using=using)
+        fetch(missing)
+        for key in missing:
+            if key not in resolved:
+                resolved[key] = manager.get_or_create(name=wanted[key])[0]
+    return resolved
+
+
+def resolve_named_list(model, names, using='default'):
+    """
+    resolve_named() as a de-duplicated list in the order the names were given.
+    """
+    resolved = resolve_named(model, names, using=using)
+    keys = dict.fromkeys(clean_name(model, name).lower() for name in names)
+    return [resolved[key] for key in keys if key in resolved]
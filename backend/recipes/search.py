@@ -0,0 +1,192 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import Case, F, FloatField, IntegerField, Q, Value, When
+from django.db.models.functions import Cast
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+from rest_framework import filters
+from rest_framework.settings import api_settings
+from .cache import bump_namespace_on_commit
+from .ingredients import ingredient_names
+from .jobs import enqueue, task
+from .models import Recipe, Tag, Equipment
+
+SEARCH_CONFIG = 'english'
+
+# Columns that feed the search document; saving anything else skips the refresh
+SEARCH_SOURCE_FIELDS = {'title', 'description', 'ingredients'}
+
+
+def uses_full_text_search(using='default'):
+    """
+    Returns True when the database supports tsvector search (PostgreSQL).
+    Other backends (SQLite test runs) fall back to icontains on the
+    denormalized columns.
+    """
+    return connections[using].vendor == 'postgresql'
+
+
+def build_search_keywords(recipe):
+    """
+    Builds the keyword segment of a recipe's search document: tag names,
+    ingredient names and equipment names. Expects tags/equipment to be
+    prefetched when called in bulk.
+    """
+    words = [tag.name for tag in recipe.tags.all()]
+    words.extend(ingredient_names(recipe.ingredients))
+    words.extend(item.name for item in recipe.equipment.all())
+    return ' '.join(words)
+
+
+def search_vector_expression():
+    """
+    The weighted tsvector computed from a recipe's own columns:
+    title > tags/ingredients/equipment > description.
+    """
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('search_keywords', weight='B', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def search_rank_expression(query):
+    """
+    SearchRank of `query` against the search document, as double precision.
+    ts_rank() returns a float4 while the keyset cursor (recipes.pagination)
+    carries the rank through JSON as a double; comparing that back against
+    the float4 could repeat or skip the boundary row, so both sides use the
+    double.
+    """
+    return Cast(SearchRank(F('search_vector'), query), FloatField())
+
+
+@task('recipes.refresh_search_documents')
+def refresh_search_documents(recipe_ids, using='default'):
+    """
+    Recomputes search_keywords (and search_vector on PostgreSQL) for the given
+    recipes with one SELECT, two prefetches and at most two UPDATEs.
+    Uses queryset update()/bulk_update() so no save signals are re-fired;
+    the 'recipes' cache namespace is bumped here instead when rows changed,
+    since the write's own bump happened before this job ran.
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    recipes = list(
+        Recipe.objects.using(using)
+        .filter(pk__in=recipe_ids)
+        .only('id', 'ingredients', 'search_keywords')
+        .prefetch_related('tags', 'equipment')
+    )
+    changed = []
+    for recipe in recipes:
+        keywords = build_search_keywords(recipe)
+        if keywords != recipe.search_keywords:
+            recipe.search_keywords = keywords
+            changed.append(recipe)
+    updated = 0
+    if changed:
+        updated += Recipe.objects.using(using).bulk_update(changed, ['search_keywords'])
+    if uses_full_text_search(using):
+        updated += Recipe.objects.using(using).filter(pk__in=recipe_ids).update(search_vector=search_vector_expression())
+    if updated:
+        bump_namespace_on_commit('recipes', using=using)
+
+
+def schedule_search_refresh(recipe_ids, using='default'):
+    """
+    Refreshes the search documents of `recipe_ids` as a background job once
+    the write commits. Single-recipe refreshes are keyed by recipe, so the
+    post_save and m2m signals fired by one write queue a single job.
+    """
+    recipe_ids = [str(pk) for pk in recipe_ids]
+    if not recipe_ids:
+        return
+    key = f'search:{recipe_ids[0]}' if len(recipe_ids) == 1 else None
+    enqueue('recipes.refresh_search_documents', {'recipe_ids': recipe_ids, 'using': using}, key=key, using=using)
+
+
+@receiver(post_save, sender=Recipe)
+def post_save_recipe_search_document(sender, instance, created, raw=False, using='default', update_fields=None, **kwargs):
+    """
+    Schedules a search document refresh when a searchable column changes.
+    """
+    if raw:
+        return
+    if update_fields is not None and not SEARCH_SOURCE_FIELDS.intersection(update_fields):
+        return
+    schedule_search_refresh([instance.pk], using=using)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.equipment.through)
+def m2m_changed_recipe_search_document(sender, instance, action, reverse, pk_set, using='default', **kwargs):
+    """
+    Schedules a search document refresh when tags or equipment are
+    (un)assigned, from either side of the relation.
+    """
+    if action == 'pre_clear' and reverse:
+        # pk_set is not provided for clear(); remember the affected recipes now
+        instance._search_refresh_ids = list(instance.recipes.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        recipe_ids = [instance.pk]
+    elif action == 'post_clear':
+        recipe_ids = getattr(instance, '_search_refresh_ids', [])
+    else:
+        recipe_ids = pk_set or []
+    schedule_search_refresh(recipe_ids, using=using)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Equipment)
+def post_save_keyword_source(sender, instance, created, raw=False, using='default', **kwargs):
+    """
+    A renamed tag or piece of equipment changes the keywords of every recipe using it.
+    """
+    if raw or created or not instance.has_changed('name'):
+        return
+    schedule_search_refresh(instance.recipes.values_list('pk', flat=True), using=using)
+
+
+class RecipeSearchFilter(filters.SearchFilter):
+    """
+    Search backend for recipes that queries the denormalized search document
+    instead of ILIKE-scanning joined tag/equipment/ingredient rows.
+
+    On PostgreSQL the ?search= terms are matched against the GIN-indexed
+    search_vector and results are ranked by SearchRank (unless the client asked
+    for an explicit ?ordering=). Other databases use a join-free icontains
+    fallback over the same denormalized columns, ranked by where the terms hit.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        if uses_full_text_search(queryset.db):
+            query = SearchQuery(' '.join(terms), search_type='websearch', config=SEARCH_CONFIG)
+            queryset = queryset.filter(search_vector=query).annotate(search_rank=search_rank_expression(query))
+        else:
+            rank = Value(0)
+            for term in terms:
+                queryset = queryset.filter(
+                    Q(title__icontains=term)
+                    | Q(search_keywords__icontains=term)
+                    | Q(description__icontains=term)
+                )
+                rank = rank + Case(
+                    When(title__icontains=term, then=Value(3)),
+                    When(search_keywords__icontains=term, then=Value(2)),
+                    default=Value(1),
+                    output_field=IntegerField(),
+                )
+            queryset = queryset.annotate(search_rank=rank)
+
+        if api_settings.ORDERING_PARAM not in request.query_params:
+            queryset = queryset.order_by('-search_rank', *(queryset.query.order_by or Recipe._meta.ordering))
+        return queryset
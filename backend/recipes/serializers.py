@@ -1,24 +1,85 @@
 from rest_framework import serializers
+from api.instrumentation import MeasuredSerializerMixin
 from .models import Recipe, Tag, Equipment
-from users.serializers import UserProfileSerializer # Assuming this path is correct
-from django.utils.text import slugify # Import slugify
-
-class TagSerializer(serializers.ModelSerializer):
+from .images import ImageVariantsField
+from .resolvers import resolve_named_list
+from users.serializers import UserProfileSerializer, UserSummarySerializer
+
+
+def _field_list(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def field_selection(serializer_class, query_params):
+    """
+    Parses `?fields=` and `?expand=` for `serializer_class` into a hashable
+    (fields, expand) pair of frozensets, restricted to the fields the
+    serializer declares. `fields` is None when every field is rendered.
+    """
+    meta = serializer_class.Meta
+    expandable = getattr(meta, 'expandable_fields', {})
+    known = set(meta.fields) | set(expandable)
+    expand = frozenset(name for name in _field_list(query_params.get('expand')) if name in known)
+    requested = [name for name in _field_list(query_params.get('fields')) if name in known]
+    if requested:
+        fields = set(requested)
+    elif getattr(meta, 'default_fields', None) is not None:
+        fields = set(meta.default_fields)
+    else:
+        return None, expand
+    return frozenset(fields | expand), expand
+
+
+class SparseFieldsetMixin:
+    """
+    Lets clients shape the representation: `?fields=id,title,tags` renders
+    only those fields and `?expand=ingredients,author` adds fields left out
+    of `Meta.default_fields` or swaps a compact nested field for the full
+    serializer given in `Meta.expandable_fields`. Write-only fields are
+    never dropped.
+
+    The selection comes from context['field_selection'] (views pass the
+    same one used to plan the queryset) or else the request's query params.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if 'field_selection' in self.context:
+            selection = self.context['field_selection']
+        else:
+            request = self.context.get('request')
+            selection = field_selection(type(self), request.query_params if request else {})
+        if selection is None:
+            return fields
+        only, expand = selection
+        for name, (serializer_class, kwargs) in getattr(self.Meta, 'expandable_fields', {}).items():
+            if name in expand:
+                fields[name] = serializer_class(**kwargs)
+        if only is not None:
+            for name in [name for name, field in fields.items() if not field.write_only and name not in only]:
+                del fields[name]
+        return fields
+
+
+class TagSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ['id', 'name', 'slug']
         read_only_fields = ['slug'] # Slug is auto-generated
 
-class EquipmentSerializer(serializers.ModelSerializer):
+class EquipmentSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Equipment
         fields = ['id', 'name', 'slug']
         read_only_fields = ['slug'] # Slug is auto-generated
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(MeasuredSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     # Use UserProfileSerializer for author detail (read-only)
     author = UserProfileSerializer(read_only=True)
 
+    # Resized WebP/JPEG copies of main_image (see recipes.images)
+    main_image_variants = ImageVariantsField()
+
     # Use TagSerializer for displaying tag details (read-only)
     tags = TagSerializer(many=True, read_only=True)
     # Use PrimaryKeyRelatedField for receiving tag IDs (write-only)
@@ -26,13 +87,21 @@ class RecipeSerializer(serializers.ModelSerializer):
         queryset=Tag.objects.all(), many=True, write_only=True, source='tags', required=False
     )
 
+    # Tag names (write-only), resolved/created in one batch like equipment_names
+    tag_names = serializers.ListField(
+        child=serializers.CharField(max_length=100, allow_blank=True),
+        write_only=True,
+        required=False,
+        allow_empty=True
+    )
+
     # Equipment serialization for displaying details (read-only)
     equipment = EquipmentSerializer(many=True, read_only=True)
 
     # NEW: Field to receive equipment names as a list of strings (write-only)
     # This field will be handled in create/update methods
     equipment_names = serializers.ListField(
-        child=serializers.CharField(max_length=255),
+        child=serializers.CharField(max_length=255, allow_blank=True),
         write_only=True,
         required=False,
         allow_empty=True
@@ -41,49 +110,39 @@ class RecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = [
-            'id', 'author', 'title', 'slug', 'description', 'main_image',
+            'id', 'author', 'title', 'slug', 'description', 'main_image', 'main_image_variants',
             'ingredients', 'instructions', 'prep_time_minutes',
             'cook_time_minutes', 'servings', 'difficulty',
-            'tags', 'tag_ids',
+            'tags', 'tag_ids', 'tag_names',
             'equipment', 'equipment_names', # Include the new write-only field
             'created_at', 'updated_at'
         ]
         read_only_fields = ['slug', 'author', 'created_at', 'updated_at']
 
     def _get_or_create_equipment(self, equipment_names_data):
-        """Helper to get or create Equipment instances from names."""
-        equipment_instances = []
-        for name in equipment_names_data:
-            name = name.strip()
-            if not name:
-                continue # Skip empty names
-
-            # Ensure slug uniqueness
-            base_slug = slugify(name)
-            slug = base_slug
-            counter = 1
-            while Equipment.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-
-            # Get or create the Equipment instance
-            equipment_instance, created = Equipment.objects.get_or_create(
-                name=name,
-                defaults={'slug': slug} # Only set slug if creating
-            )
-            equipment_instances.append(equipment_instance)
-        return equipment_instances
+        """Helper to get or create Equipment instances from names (batched)."""
+        return resolve_named_list(Equipment, equipment_names_data)
+
+    def _resolve_tags(self, tag_ids_data, tag_names_data):
+        """Combines tags given by id with tags given (or created) by name."""
+        if tag_names_data is None:
+            return tag_ids_data
+        tags = list(tag_ids_data or [])
+        known = {tag.pk for tag in tags}
+        tags.extend(tag for tag in resolve_named_list(Tag, tag_names_data) if tag.pk not in known)
+        return tags
 
     def create(self, validated_data):
         # Pop M2M fields with their write_only names
         tag_ids_data = validated_data.pop('tags', [])
+        tag_names_data = validated_data.pop('tag_names', None)
         equipment_names_data = validated_data.pop('equipment_names', []) # Pop the new field
 
         # Create the recipe instance
         recipe = Recipe.objects.create(**validated_data)
 
         # Set Many-to-Many relationships for tags
-        recipe.tags.set(tag_ids_data)
+        recipe.tags.set(self._resolve_tags(tag_ids_data, tag_names_data))
 
         # NEW: Handle equipment names - get or create Equipment instances
         equipment_instances = self._get_or_create_equipment(equipment_names_data)
@@ -94,15 +153,16 @@ class RecipeSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         # Pop M2M fields with their write_only names if present
         tag_ids_data = validated_data.pop('tags', None)
+        tag_names_data = validated_data.pop('tag_names', None)
         equipment_names_data = validated_data.pop('equipment_names', None) # Pop the new field
 
         # Update basic fields
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
-        # Update Many-to-Many relationships for tags if provided
-        if tag_ids_data is not None:
-            instance.tags.set(tag_ids_data)
+        # Update Many-to-Many relationships for tags if provided (by id and/or name)
+        if tag_ids_data is not None or tag_names_data is not None:
+            instance.tags.set(self._resolve_tags(tag_ids_data, tag_names_data))
 
         # NEW: Handle equipment names if provided in the payload
         if equipment_names_data is not None:
@@ -111,3 +171,40 @@ class RecipeSerializer(serializers.ModelSerializer):
 
         instance.save()
         return instance
+
+class RecipeListSerializer(RecipeSerializer):
+    """
+    Card representation used by the recipe list: no ingredients,
+    instructions or equipment and a compact author, unless asked for with
+    `?expand=` (e.g. `?expand=ingredients,author`) or `?fields=`.
+    """
+    author = UserSummarySerializer(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        default_fields = [
+            'id', 'author', 'title', 'slug', 'description', 'main_image', 'main_image_variants',
+            'prep_time_minutes', 'cook_time_minutes', 'servings', 'difficulty',
+            'tags', 'created_at',
+        ]
+        expandable_fields = {'author': (UserProfileSerializer, {'read_only': True})}
+
+
+class PantryRecipeSerializer(RecipeSerializer):
+    """
+    RecipeSerializer plus the pantry match annotations computed by
+    recipes.ingredients.pantry_queryset.
+    """
+    matched_ingredients = serializers.IntegerField(read_only=True)
+    missing_ingredients = serializers.IntegerField(read_only=True)
+    coverage = serializers.SerializerMethodField()
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ['matched_ingredients', 'missing_ingredients', 'coverage']
+        extra_columns = ['ingredient_count'] # read by get_coverage
+
+    def get_coverage(self, obj):
+        """Fraction of the recipe's ingredients covered by the pantry."""
+        if not obj.ingredient_count:
+            return 0.0
+        return round(obj.matched_ingredients / obj.ingredient_count, 3)
+
@@ -0,0 +1,144 @@
+import re
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, IntegerField, Max, Q, When
+from django.db.models.functions import Cast, Substr
+from django.utils.text import slugify
+
+# Room left at the end of max_length for a '-<n>' suffix
+SUFFIX_RESERVE = 8
+
+# Longest numeric suffix treated as ours: 9 digits always fit a 32-bit
+# integer, so longer digit runs ('pie-99999999999') can't overflow the cast
+SUFFIX_MAX_DIGITS = 9
+
+# How often a save is retried with a fresh slug after a unique violation
+SLUG_SAVE_ATTEMPTS = 3
+
+
+def slug_base(model, value, field_name='slug'):
+    """
+    Slugifies `value`, truncated so a numeric suffix still fits the field.
+    Falls back to the model name for values with no sluggable characters.
+    """
+    max_length = model._meta.get_field(field_name).max_length
+    return slugify(value)[:max_length - SUFFIX_RESERVE].strip('-') or model._meta.model_name
+
+
+def _variants_filter(bases, field_name):
+    """
+    Matches `base` itself and `base-<digits>` for every base. The LIKE prefix
+    keeps the lookup on the slug index; the regex rejects e.g. 'base-extra'
+    and suffixes longer than SUFFIX_MAX_DIGITS.
+    """
+    condition = Q()
+    for base in bases:
+        condition |= Q(**{field_name: base})
+        condition |= Q(**{f'{field_name}__startswith': f'{base}-', f'{field_name}__regex': rf'^{re.escape(base)}-[0-9]{{1,{SUFFIX_MAX_DIGITS}}}$'})
+    return condition
+
+
+def unique_slug(model, value, using='default', field_name='slug', exclude_pk=None):
+    """
+    Returns a slug for `value` that is free in `model`, in a single query:
+    the base slug if nobody holds it, otherwise base-(highest suffix + 1).
+    `exclude_pk` lets an instance keep its own slug when re-slugging.
+    """
+    base = slug_base(model, value, field_name)
+    queryset = model._default_manager.using(using).filter(_variants_filter([base], field_name))
+    if exclude_pk is not None:
+        queryset = queryset.exclude(pk=exclude_pk)
+    # CASE (not FILTER) so the cast is never evaluated for the bare base row
+    suffix = Case(
+        When(~Q(**{field_name: base}), then=Cast(Substr(field_name, len(base) + 2), IntegerField())),
+        output_field=IntegerField(),
+    )
+    result = queryset.aggregate(
+        base_taken=Count('pk', filter=Q(**{field_name: base})),
+        max_suffix=Max(suffix),
+    )
+    if not result['base_taken']:
+        return base
+    return f"{base}-{(result['max_suffix'] or 0) + 1}"
+
+
+def allocate_slugs(model, values, using='default', field_name='slug'):
+    """
+    Bulk variant of unique_slug for loaders that insert many rows at once:
+    returns one unique slug per value (in order), also unique among
+    themselves, using one query for the whole batch.
+    """
+    bases = [slug_base(model, value, field_name) for value in values]
+    if not bases:
+        return []
+    taken = set(
+        model._default_manager.using(using)
+        .filter(_variants_filter(set(bases), field_name))
+        .values_list(field_name, flat=True)
+    )
+    next_suffix = {}
+    slugs = []
+    for base in bases:
+        if base not in taken:
+            slug = base
+        else:
+            if base not in next_suffix:
+                prefix = f'{base}-'
+                suffixes = [
+                    int(slug[len(prefix):]) for slug in taken
+                    if slug.startswith(prefix) and slug[len(prefix):].isdigit() and len(slug) - len(prefix) <= SUFFIX_MAX_DIGITS
+                ]
+                next_suffix[base] = max(suffixes, default=0) + 1
+            slug = f'{base}-{next_suffix[base]}'
+            while slug in taken:
+                next_suffix[base] += 1
+                slug = f'{base}-{next_suffix[base]}'
+            next_suffix[base] += 1
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def bulk_create_with_slugs(model, instances, values, using='default', field_name='slug'):
+    """
+    bulk_create()s `instances` with slugs allocated for `values` (see
+    allocate_slugs). Call it inside the loader's transaction: the insert runs
+    in a savepoint, and if a concurrent writer claimed one of the slugs in
+    the meantime it is rolled back and retried with freshly allocated slugs
+    instead of failing the whole batch.
+    """
+    manager = model._default_manager.using(using)
+    for attempt in range(SLUG_SAVE_ATTEMPTS):
+        slugs = allocate_slugs(model, values, using=using, field_name=field_name)
+        for instance, slug in zip(instances, slugs):
+            setattr(instance, field_name, slug)
+        try:
+            with transaction.atomic(using=using):
+                return manager.bulk_create(instances)
+        except IntegrityError:
+            if attempt == SLUG_SAVE_ATTEMPTS - 1 or not manager.filter(**{f'{field_name}__in': slugs}).exists():
+                raise
+
+
+def slug_is_taken(instance, field_name='slug', using='default'):
+    slug = getattr(instance, field_name)
+    return type(instance)._default_manager.using(using).filter(**{field_name: slug}).exclude(pk=instance.pk).exists()
+
+
+class UniqueSlugMixin:
+    """
+    Retries save() when a concurrent writer grabbed the same slug between
+    allocation and INSERT/UPDATE: the slug is cleared so the model's pre_save
+    receiver allocates a fresh one, and the save is repeated in a savepoint.
+    """
+    slug_field_name = 'slug'
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or self._state.db or 'default'
+        for attempt in range(SLUG_SAVE_ATTEMPTS):
+            try:
+                with transaction.atomic(using=using):
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if attempt == SLUG_SAVE_ATTEMPTS - 1 or not slug_is_taken(self, self.slug_field_name, using):
+                    raise
+                setattr(self, self.slug_field_name, '')
@@ -1,3 +1,1386 @@
-from django.test import TestCase
+import copy
+import tempfile
+import csv
+import json
+import re
+import threading
+from io import BytesIO, StringIO
+from pathlib import Path
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connection, connections, transaction
+from django.db.utils import load_backend
+from django.contrib.postgres.search import SearchQuery
+from django.db.models import F, FloatField, Max, Min
+from django.db.models.functions import Cast
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from PIL import Image
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from users.models import CustomUser
+from .models import Recipe, Tag, Equipment, Ingredient, Job, RecipeIngredient, FacetCount
+from . import jobs
+from .cache import namespace_versions
+from .export import iter_export_rows
+from .facets import facet_counts, stored_facet_counts, tag_value
+from .jobs import enqueue, requeue_stale, task
+from .readers import values_reader
+from .resolvers import resolve_named_list
+from .search import search_rank_expression
+from .serializers import RecipeSerializer, RecipeListSerializer, field_selection
+from .slugs import allocate_slugs, unique_slug
 
-# Create your tests here.
+
+class RecipeTestMixin:
+    """
+    Shared fixtures for recipe API tests.
+    """
+    list_url = '/api/recipes/recipes/'
+
+    def setUp(self):
+        cache.clear() # Cached responses would otherwise outlive each test's rolled-back data
+        # TestCase never commits, so run background jobs (search refresh ...) inline
+        self.enterContext(override_settings(JOB_QUEUE_MODE='immediate'))
+        # Response caching is off by default on locmem; a test runs in one process
+        self.enterContext(override_settings(RESPONSE_CACHE_TIMEOUT=300))
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email='cook@example.com', password='pass12345')
+
+    def make_recipes(self, count, author=None, **extra):
+        tags = [Tag.objects.get_or_create(name=name)[0] for name in ('Vegan', 'Quick & Easy')]
+        equipment = [Equipment.objects.get_or_create(name=name)[0] for name in ('Wok', 'Whisk (Balloon)')]
+        recipes = []
+        # TestCase never commits: run the on-commit work (cache invalidation) here
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(count):
+                recipe = Recipe.objects.create(
+                    author=author or self.user,
+                    title=f'Recipe {Recipe.objects.count()}',
+                    ingredients=[{'item': 'flour', 'quantity': '2 cups'}],
+                    instructions=['mix', 'bake'],
+                    **extra
+                )
+                recipe.tags.set(tags)
+                recipe.equipment.set(equipment)
+                recipes.append(recipe)
+        return recipes
+
+
+class RecipeQueryCountTests(RecipeTestMixin, TestCase):
+    """
+    The recipe endpoints must cost a constant number of queries per page,
+    no matter how many recipes (and related rows) are rendered.
+    """
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_list_query_count_is_constant(self):
+        self.make_recipes(1)
+        small_page = self.count_queries(self.list_url)
+        self.make_recipes(14)
+        full_page = self.count_queries(self.list_url)
+        self.assertEqual(small_page, full_page)
+        # ETag validator + COUNT(*) + recipes joined to author + tags
+        # prefetch (the compact list card has no equipment)
+        self.assertEqual(full_page, 4)
+
+    def test_retrieve_query_count_is_constant(self):
+        recipe = self.make_recipes(1)[0]
+        self.assertEqual(self.count_queries(f'{self.list_url}{recipe.slug}/'), 4)
+
+
+class RecipeSearchTests(RecipeTestMixin, TestCase):
+    """
+    ?search= goes through the denormalized search document.
+    """
+
+    def search(self, term, **params):
+        response = self.client.get(self.list_url, {'search': term, **params})
+        self.assertEqual(response.status_code, 200)
+        return [item['title'] for item in response.data['results']]
+
+    def test_search_document_tracks_tags_equipment_and_ingredients(self):
+        recipe = self.make_recipes(1)[0]
+        recipe.refresh_from_db()
+        self.assertIn('Vegan', recipe.search_keywords)
+        self.assertIn('flour', recipe.search_keywords)
+        self.assertIn('Wok', recipe.search_keywords)
+
+        recipe.tags.clear()
+        recipe.refresh_from_db()
+        self.assertNotIn('Vegan', recipe.search_keywords)
+
+    def test_tag_rename_refreshes_recipes(self):
+        recipe = self.make_recipes(1)[0]
+        tag = Tag.objects.get(name='Vegan')
+        tag.name = 'Plant Based'
+        tag.save()
+        recipe.refresh_from_db()
+        self.assertIn('Plant Based', recipe.search_keywords)
+
+    def test_tag_save_without_rename_refreshes_nothing(self):
+        self.make_recipes(1)
+        tag = Tag.objects.get(name='Vegan')
+        tag.slug = 'plant'
+        with mock.patch('recipes.search.schedule_search_refresh') as schedule:
+            tag.save()
+        schedule.assert_not_called()
+
+    def test_search_ranks_title_matches_first(self):
+        Recipe.objects.create(author=self.user, title='Weeknight Dinner', description='Uses garlic generously')
+        Recipe.objects.create(author=self.user, title='Garlic Bread', ingredients=[{'item': 'bread', 'quantity': '1'}])
+        Recipe.objects.create(author=self.user, title='Plain Rice')
+        self.assertEqual(self.search('garlic'), ['Garlic Bread', 'Weeknight Dinner'])
+
+    def test_search_matches_tags_without_duplicates(self):
+        self.make_recipes(2)
+        self.assertEqual(len(self.search('vegan')), 2)
+
+    def test_explicit_ordering_is_respected(self):
+        Recipe.objects.create(author=self.user, title='B garlic soup')
+        Recipe.objects.create(author=self.user, title='A garlic salad')
+        self.assertEqual(self.search('garlic', ordering='title'), ['A garlic salad', 'B garlic soup'])
+
+
+class RecipeKeysetPaginationTests(RecipeTestMixin, TestCase):
+    """
+    ?cursor= switches the recipe feed to keyset pagination.
+    """
+
+    def walk(self, url):
+        titles, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            titles.extend(item['title'] for item in response.data['results'])
+            url = response.data['next']
+            pages += 1
+        return titles, pages
+
+    def test_walks_every_recipe_once_in_order(self):
+        self.make_recipes(25)
+        expected = list(Recipe.objects.order_by('-created_at', '-id').values_list('title', flat=True))
+        titles, pages = self.walk(f'{self.list_url}?cursor=')
+        self.assertEqual(titles, expected)
+        self.assertEqual(pages, 3)
+
+    def test_honors_ordering_param(self):
+        self.make_recipes(12)
+        expected = list(Recipe.objects.order_by('title', 'id').values_list('title', flat=True))
+        titles, _ = self.walk(f'{self.list_url}?cursor=&ordering=title')
+        self.assertEqual(titles, expected)
+
+    def test_previous_link_returns_prior_page(self):
+        self.make_recipes(15)
+        first = self.client.get(f'{self.list_url}?cursor=').data
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual(back['results'], first['results'])
+        self.assertIsNone(back['previous'])
+
+    def test_no_count_query(self):
+        self.make_recipes(3)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(f'{self.list_url}?cursor=')
+        self.assertFalse(any('COUNT(' in query['sql'] for query in ctx.captured_queries))
+
+    def test_walks_search_results_by_rank(self):
+        for i in range(12):
+            Recipe.objects.create(author=self.user, title=f'Garlic {i}' if i % 2 else f'Stew {i}', description='garlic')
+        titles, _ = self.walk(f'{self.list_url}?cursor=&search=garlic')
+        self.assertEqual(len(titles), len(set(titles)), 12)
+        self.assertEqual([title.startswith('Garlic') for title in titles], [True] * 6 + [False] * 6)
+        # On PostgreSQL the rank is compared as the double the cursor carries, not float4
+        rank = search_rank_expression(SearchQuery('garlic'))
+        self.assertIsInstance(rank, Cast)
+        self.assertIsInstance(rank.output_field, FloatField)
+
+    def test_invalid_or_mismatched_cursor_is_rejected(self):
+        self.make_recipes(12)
+        self.assertEqual(self.client.get(f'{self.list_url}?cursor=garbage').status_code, 404)
+        next_url = self.client.get(f'{self.list_url}?cursor=').data['next']
+        self.assertEqual(self.client.get(f'{next_url}&ordering=title').status_code, 404)
+
+
+class PantryTests(RecipeTestMixin, TestCase):
+    """
+    The ingredient index and the /pantry/ "what can I make" endpoint.
+    """
+    pantry_url = '/api/recipes/recipes/pantry/'
+
+    def make_recipe(self, title, *items):
+        return Recipe.objects.create(
+            author=self.user, title=title,
+            ingredients=[{'item': item, 'quantity': '1'} for item in items],
+        )
+
+    def test_index_follows_ingredients_json(self):
+        recipe = self.make_recipe('Pancakes', 'Flour', ' flour ', 'Eggs', 'Milk')
+        self.assertEqual(recipe.ingredient_count, 3)
+        self.assertEqual(
+            set(RecipeIngredient.objects.filter(recipe=recipe).values_list('ingredient__name', flat=True)),
+            {'flour', 'eggs', 'milk'},
+        )
+        recipe.ingredients = [{'item': 'Flour', 'quantity': '1'}, {'item': 'Water', 'quantity': '1'}]
+        recipe.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.ingredient_count, 2)
+        self.assertEqual(
+            set(RecipeIngredient.objects.filter(recipe=recipe).values_list('ingredient__name', flat=True)),
+            {'flour', 'water'},
+        )
+        self.assertEqual(Ingredient.objects.filter(name='flour').count(), 1)
+
+    def test_ranks_by_missing_ingredients(self):
+        self.make_recipe('Pancakes', 'flour', 'eggs', 'milk')
+        self.make_recipe('Omelette', 'eggs', 'butter')
+        self.make_recipe('Toast', 'bread', 'butter')
+        self.make_recipe('Salad', 'lettuce')
+        response = self.client.get(self.pantry_url, {'have': 'Eggs,milk, flour'})
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual([r['title'] for r in results], ['Pancakes', 'Omelette'])
+        self.assertEqual((results[0]['missing_ingredients'], results[0]['coverage']), (0, 1.0))
+        self.assertEqual((results[1]['matched_ingredients'], results[1]['missing_ingredients']), (1, 1))
+
+    def test_max_missing(self):
+        self.make_recipe('Pancakes', 'flour', 'eggs', 'milk')
+        self.make_recipe('Omelette', 'eggs', 'butter')
+        response = self.client.get(self.pantry_url, {'have': 'eggs,flour,milk', 'max_missing': 0})
+        self.assertEqual([r['title'] for r in response.data['results']], ['Pancakes'])
+
+    def test_requires_pantry(self):
+        self.assertEqual(self.client.get(self.pantry_url).status_code, 400)
+
+
+class ImportRecipesCommandTests(RecipeTestMixin, TestCase):
+    """
+    manage.py import_recipes
+    """
+    csv_text = (
+        'recipe_name,total_time,ingredients_quantity,ingredients,servings,instructions,tags\n'
+        'Chocolate Cake,1 hrs 20 mins,2 cups^3,Flour^Eggs,8,Mix.^Bake.,"Dessert,Baking"\n'
+        'Chocolate Cake,45 mins,1,cocoa,4,"[\'Stir\', \'Serve\']",Dessert\n'
+        ',5,,,,,\n'
+    )
+
+    def run_import(self, *args):
+        directory = tempfile.mkdtemp()
+        path = Path(directory) / 'recipes.csv'
+        path.write_text(self.csv_text)
+        call_command('import_recipes', str(path), '--author', self.user.email, *args, stdout=StringIO())
+        return path
+
+    def test_imports_rows_with_unique_slugs_and_derived_data(self):
+        Recipe.objects.create(author=self.user, title='Chocolate Cake')
+        self.run_import('--batch-size', '1')
+        imported = Recipe.objects.exclude(cook_time_minutes=None).order_by('slug')
+        self.assertEqual([r.slug for r in imported], ['chocolate-cake-1', 'chocolate-cake-2'])
+        cake = imported[0]
+        self.assertEqual(cake.cook_time_minutes, 80)
+        self.assertEqual(cake.ingredients, [{'item': 'Flour', 'quantity': '2 cups'}, {'item': 'Eggs', 'quantity': '3'}])
+        self.assertEqual(cake.instructions, ['Mix.', 'Bake.'])
+        self.assertEqual(set(cake.tags.values_list('name', flat=True)), {'Dessert', 'Baking'})
+        self.assertEqual(cake.ingredient_count, 2)
+        self.assertIn('Dessert', cake.search_keywords)
+        self.assertEqual(imported[1].instructions, ['Stir', 'Serve'])
+
+    def test_reallocates_slugs_taken_by_a_concurrent_writer(self):
+        def allocate_then_race(model, values, **kwargs):
+            slugs = allocate_slugs(model, values, **kwargs)
+            if not Recipe.objects.exists():
+                # Another writer commits the first slug before the chunk's insert
+                Recipe.objects.create(author=self.user, title='Rival', slug=slugs[0])
+            return slugs
+
+        with mock.patch('recipes.slugs.allocate_slugs', side_effect=allocate_then_race):
+            self.run_import()
+        self.assertEqual(
+            sorted(Recipe.objects.values_list('slug', flat=True)),
+            ['chocolate-cake', 'chocolate-cake-1', 'chocolate-cake-2'],
+        )
+
+    def test_resumes_from_checkpoint(self):
+        path = self.run_import()
+        self.assertEqual(Path(f'{path}.checkpoint').read_text(), '3')
+        call_command('import_recipes', str(path), '--author', self.user.email, stdout=StringIO())
+        self.assertEqual(Recipe.objects.count(), 2)
+
+
+class SlugAllocationTests(RecipeTestMixin, TestCase):
+    """
+    recipes.slugs: one query per allocation, however many collisions exist.
+    """
+
+    def test_unique_slug_uses_next_suffix_in_one_query(self):
+        for i, slug in enumerate(('chocolate-cake', 'chocolate-cake-1', 'chocolate-cake-7', 'chocolate-cake-extra')):
+            Tag.objects.create(name=f'Tag {i}', slug=slug)
+        with self.assertNumQueries(1):
+            self.assertEqual(unique_slug(Tag, 'Chocolate Cake'), 'chocolate-cake-8')
+        self.assertEqual(unique_slug(Tag, 'Vanilla Cake'), 'vanilla-cake')
+
+    def test_ignores_suffixes_too_long_to_be_ours(self):
+        # Casting '99999999999' to an integer overflows on PostgreSQL
+        for i, slug in enumerate(('pie', 'pie-2', 'pie-99999999999')):
+            Tag.objects.create(name=f'Tag {i}', slug=slug)
+        self.assertEqual(unique_slug(Tag, 'Pie'), 'pie-3')
+        self.assertEqual(allocate_slugs(Tag, ['Pie']), ['pie-3'])
+
+    def test_resave_keeps_own_slug(self):
+        recipe = Recipe.objects.create(author=self.user, title='Chocolate Cake')
+        recipe.title = 'Chocolate cake'
+        recipe.save()
+        self.assertEqual(recipe.slug, 'chocolate-cake')
+
+    def test_allocate_slugs_is_unique_within_batch(self):
+        Tag.objects.create(name='Quick')
+        Tag.objects.create(name='Quick 2')
+        with self.assertNumQueries(1):
+            slugs = allocate_slugs(Tag, ['Quick', 'Quick', 'Quick 2', 'Slow'])
+        self.assertEqual(slugs, ['quick-3', 'quick-4', 'quick-2-1', 'slow'])
+
+    def test_save_retries_on_slug_conflict(self):
+        Tag.objects.create(name='Vegan', slug='plant')
+        tag = Tag(name='Plant', slug='plant')
+        tag.save()
+        self.assertEqual(tag.slug, 'plant-1')
+
+
+class RecipeChangeTrackingTests(RecipeTestMixin, TestCase):
+    """
+    Recipe remembers its loaded values: saves write only changed columns and
+    the slug receiver no longer re-reads the row.
+    """
+
+    def test_changed_fields(self):
+        recipe = Recipe.objects.get(pk=self.make_recipes(1)[0].pk)
+        self.assertEqual(recipe.changed_fields(), set())
+        recipe.ingredients.append({'item': 'salt', 'quantity': 'pinch'})
+        recipe.difficulty = 'Hard'
+        self.assertEqual(recipe.changed_fields(), {'ingredients', 'difficulty'})
+        self.assertEqual(recipe.initial_value('difficulty'), 'Medium')
+        recipe.save()
+        self.assertEqual(recipe.changed_fields(), set())
+
+    def test_update_writes_only_changed_columns(self):
+        recipe = Recipe.objects.get(pk=self.make_recipes(1)[0].pk)
+        recipe.difficulty = 'Hard'
+        with CaptureQueriesContext(connection) as ctx:
+            recipe.save()
+        # (the facet counts follow the difficulty in their own table)
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "recipes_recipe"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"difficulty"', updates[0])
+        self.assertIn('"updated_at"', updates[0])
+        self.assertNotIn('"title"', updates[0])
+        # No re-read of the row and no search/ingredient refresh for this change
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('SELECT')])
+
+    def test_loading_a_deferred_field_keeps_pending_edits(self):
+        recipe = Recipe.objects.only('id', 'title', 'slug').get(pk=self.make_recipes(1)[0].pk)
+        recipe.title = 'Pie'
+        recipe.description # loaded through refresh_from_db(fields=['description'])
+        self.assertEqual(recipe.changed_fields(), {'title'})
+        recipe.save()
+        self.assertEqual(Recipe.objects.get(pk=recipe.pk).title, 'Pie')
+
+    def test_partial_refresh_keeps_other_pending_edits(self):
+        recipe = Recipe.objects.get(pk=self.make_recipes(1)[0].pk)
+        recipe.description = 'new'
+        recipe.refresh_from_db(fields=['title'])
+        self.assertEqual(recipe.changed_fields(), {'description'})
+        recipe.save()
+        self.assertEqual(Recipe.objects.get(pk=recipe.pk).description, 'new')
+
+    def test_title_change_regenerates_slug_through_api(self):
+        recipe = self.make_recipes(1)[0]
+        self.client.force_authenticate(self.user)
+        response = self.client.patch(f'{self.list_url}{recipe.slug}/', {'title': 'Brand New'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['slug'], 'brand-new')
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.slug, 'brand-new')
+
+    def test_new_recipe_keeps_explicit_slug(self):
+        recipe = Recipe.objects.create(author=self.user, title='Soup', slug='my-soup')
+        self.assertEqual(recipe.slug, 'my-soup')
+
+
+class NameResolverTests(RecipeTestMixin, TestCase):
+    """
+    Batched get-or-create of Tag/Equipment by name.
+    """
+
+    def test_resolves_and_creates_in_constant_queries(self):
+        Equipment.objects.create(name='Wok')
+        names = ['wok', ' Stand   Mixer ', 'WOK', ''] + [f'Pan {i}' for i in range(20)]
+        with self.assertNumQueries(4):
+            equipment = resolve_named_list(Equipment, names)
+        self.assertEqual([e.name for e in equipment[:2]], ['Wok', 'Stand Mixer'])
+        self.assertEqual(len(equipment), 22)
+        self.assertTrue(all(e.slug for e in equipment))
+        self.assertEqual(Equipment.objects.filter(name__iexact='wok').count(), 1)
+
+    def test_recipe_accepts_tag_and_equipment_names(self):
+        existing = Tag.objects.create(name='Vegan')
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.list_url, {
+            'title': 'Stir Fry',
+            'ingredients': [{'item': 'tofu', 'quantity': '1 block'}],
+            'instructions': ['fry'],
+            'tag_ids': [str(existing.pk)],
+            'tag_names': ['vegan', 'Quick & Easy'],
+            'equipment_names': ['Wok', 'wok '],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(sorted(t['name'] for t in response.data['tags']), ['Quick & Easy', 'Vegan'])
+        self.assertEqual([e['name'] for e in response.data['equipment']], ['Wok'])
+
+
+class ResponseCacheTests(RecipeTestMixin, TestCase):
+    """
+    Cached list/retrieve responses and their invalidation.
+    """
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_second_read_is_served_from_cache(self):
+        self.make_recipes(3)
+        self.assertEqual(self.get(self.list_url)['X-Cache'], 'MISS')
+        # The ETag validator is cached next to the body (recipes.conditional)
+        with self.assertNumQueries(0):
+            response = self.get(self.list_url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_cached_conditional_get_needs_no_queries(self):
+        self.make_recipes(3)
+        params = {'search': 'Recipe', 'tags': 'any:vegan'}
+        etag = self.get(self.list_url, **params)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.list_url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        get_async = async_to_sync(AsyncClient().get)
+        etag = get_async('/api/recipes/async/recipes/', params)['ETag']
+        with self.assertNumQueries(0):
+            response = get_async('/api/recipes/async/recipes/', params, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_query_params_are_normalized(self):
+        self.make_recipes(2)
+        self.get(self.list_url, difficulty='Medium', ordering='title')
+        response = self.client.get(f'{self.list_url}?ordering=title&difficulty=Medium')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_recipe_write_invalidates(self):
+        recipe = self.make_recipes(1)[0]
+        self.get(self.list_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.title = 'Renamed'
+            recipe.save()
+        response = self.get(self.list_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['title'], 'Renamed')
+
+    def test_invalidation_waits_for_commit(self):
+        recipe = self.make_recipes(1)[0]
+        versions = namespace_versions(['recipes'])
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.title = 'Renamed'
+            recipe.save()
+            recipe.tags.clear()
+            # A reader before the commit still sees the old rows: keep the version
+            self.assertEqual(namespace_versions(['recipes']), versions)
+        self.assertNotEqual(namespace_versions(['recipes']), versions)
+
+    def test_tag_and_m2m_changes_invalidate_recipes(self):
+        recipe = self.make_recipes(1)[0]
+        self.get(self.list_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.filter(name='Vegan').get().delete()
+        self.assertEqual(self.get(self.list_url)['X-Cache'], 'MISS')
+        self.get(self.list_url, expand='equipment')
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.equipment.clear()
+        response = self.get(self.list_url, expand='equipment')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['equipment'], [])
+
+    def test_auth_scope_is_part_of_the_key(self):
+        self.make_recipes(1)
+        self.get(self.list_url)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.get(self.list_url)['X-Cache'], 'MISS')
+
+
+class ConditionalGetTests(RecipeTestMixin, TestCase):
+    """
+    ETag validators and 304 responses.
+    """
+
+    def detail_url(self, recipe):
+        return f'{self.list_url}{recipe.slug}/'
+
+    def test_list_not_modified(self):
+        self.make_recipes(3)
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=0)
+    def test_validator_is_queried_without_response_cache(self):
+        self.make_recipes(1)
+        etag = self.client.get(self.list_url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_depends_on_query_params(self):
+        self.make_recipes(2)
+        etag = self.client.get(self.list_url)['ETag']
+        response = self.client.get(self.list_url, {'ordering': 'title'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_edit_and_delete_change_the_list_etag(self):
+        first, second = self.make_recipes(2)
+        etag = self.client.get(self.list_url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            first.title = 'Renamed'
+            first.save()
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_detail_etag(self):
+        recipe = self.make_recipes(1)[0]
+        response = self.client.get(self.detail_url(recipe))
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.detail_url(recipe), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Unrelated tag changes still alter the embedded data
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.tags.clear()
+        self.assertEqual(self.client.get(self.detail_url(recipe), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_if_modified_since_alone_is_not_trusted(self):
+        recipe = self.make_recipes(1)[0]
+        response = self.client.get(self.detail_url(recipe))
+        # updated_at doesn't move when tags are reassigned, so no Last-Modified
+        self.assertNotIn('Last-Modified', response)
+        since = http_date(timezone.now().timestamp() + 60)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.tags.set([Tag.objects.create(name='Autumn')])
+        response = self.client.get(self.detail_url(recipe), HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([tag['name'] for tag in response.data['tags']], ['Autumn'])
+
+    def test_missing_detail_is_404(self):
+        recipe = self.make_recipes(1)[0]
+        url = self.detail_url(recipe)
+        recipe.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"anything"').status_code, 404)
+
+
+class RecipeCountTests(RecipeTestMixin, TestCase):
+    """
+    CustomUser.recipe_count is kept in step with the user's recipes.
+    """
+
+    def count(self, user):
+        user.refresh_from_db(fields=['recipe_count'])
+        return user.recipe_count
+
+    def test_create_delete_and_reassign(self):
+        other = CustomUser.objects.create_user(email='other@example.com')
+        first, second = self.make_recipes(2)
+        self.assertEqual(self.count(self.user), 2)
+        first.author = other
+        first.save()
+        self.assertEqual((self.count(self.user), self.count(other)), (1, 1))
+        Recipe.objects.filter(pk=second.pk).delete()
+        first.delete()
+        self.assertEqual((self.count(self.user), self.count(other)), (0, 0))
+
+    def test_stale_user_save_keeps_the_count(self):
+        stale = CustomUser.objects.get(pk=self.user.pk)
+        self.make_recipes(3)
+        stale.bio = 'Updated'
+        stale.save()
+        self.assertEqual(self.count(self.user), 3)
+        self.assertEqual(CustomUser.objects.get(pk=self.user.pk).bio, 'Updated')
+
+    def test_import_counts_bulk_created_recipes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'recipes.csv'
+            path.write_text('title,ingredients\nSoup,"[\'water\']"\nStew,"[\'beef\']"\n')
+            call_command('import_recipes', str(path), author=self.user.email, stdout=StringIO())
+        self.assertEqual(self.count(self.user), 2)
+
+    def test_recount_fixes_drift_in_one_update(self):
+        self.make_recipes(2)
+        other = CustomUser.objects.create_user(email='other@example.com')
+        CustomUser.objects.filter(pk=self.user.pk).update(recipe_count=7)
+        CustomUser.objects.filter(pk=other.pk).update(recipe_count=1)
+        with self.assertNumQueries(1):
+            call_command('recount_recipes', stdout=StringIO())
+        self.assertEqual((self.count(self.user), self.count(other)), (2, 0))
+        out = StringIO()
+        call_command('recount_recipes', dry_run=True, stdout=out)
+        self.assertIn('0 users drifted', out.getvalue())
+
+
+@override_settings(JOB_QUEUE_MODE='immediate')
+class ConcurrentRecipeCountTests(TransactionTestCase):
+    """
+    Concurrent creates from several connections must not lose increments.
+    Runs on the test database when it accepts several connections
+    (PostgreSQL), otherwise on a scratch file-backed SQLite database: the
+    in-memory test database can't be shared between connections. SQLite
+    serializes the writers, so there it checks that concurrent connections
+    create and count cleanly; lost read-modify-write updates can only show
+    up on PostgreSQL.
+    """
+    writers = 4
+    recipes_per_writer = 5
+
+    def setUp(self):
+        self.alias = DEFAULT_DB_ALIAS
+        if connection.features.test_db_allows_multiple_connections:
+            return
+        self.alias = 'concurrent'
+        tmp = self.enterContext(tempfile.TemporaryDirectory())
+        self.settings_dict = copy.deepcopy(connection.settings_dict)
+        self.settings_dict.update({
+            'NAME': str(Path(tmp) / 'concurrent.sqlite3'),
+            # Writers queue for the write lock instead of failing with "database is locked"
+            'OPTIONS': {'timeout': 30, 'transaction_mode': 'IMMEDIATE'},
+        })
+        self.connect()
+        self.addCleanup(self.disconnect)
+        call_command('migrate', database=self.alias, verbosity=0)
+
+    def connect(self):
+        # Dynamic connections are per thread and allowed by test isolation
+        if self.alias != DEFAULT_DB_ALIAS:
+            connections[self.alias] = load_backend(self.settings_dict['ENGINE']).DatabaseWrapper(self.settings_dict, self.alias)
+
+    def disconnect(self):
+        connections[self.alias].close()
+        del connections[self.alias]
+
+    def test_concurrent_creates(self):
+        user = CustomUser.objects.db_manager(self.alias).create_user(email='cook@example.com')
+        barrier = threading.Barrier(self.writers)
+        errors = []
+
+        def write(writer):
+            try:
+                self.connect()
+                barrier.wait()
+                for i in range(self.recipes_per_writer):
+                    Recipe.objects.using(self.alias).create(author_id=user.pk, title=f'Writer {writer} recipe {i}', ingredients=[], instructions=[])
+            except Exception as error: # surfaced below
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=write, args=(writer,)) for writer in range(self.writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        user.refresh_from_db(using=self.alias)
+        self.assertEqual(user.recipe_count, self.writers * self.recipes_per_writer)
+        self.assertEqual(user.recipe_count, Recipe.objects.using(self.alias).filter(author=user).count())
+
+
+class SparseFieldsetTests(RecipeTestMixin, TestCase):
+    """
+    Compact list cards, ?fields= and ?expand=.
+    """
+
+    def recipe_query(self, ctx):
+        return next(query['sql'] for query in ctx.captured_queries if 'FROM "recipes_recipe"' in query['sql'] and 'COUNT' not in query['sql'] and 'MAX' not in query['sql'])
+
+    def test_list_defaults_to_compact_cards(self):
+        self.make_recipes(2)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.list_url)
+        card = response.data['results'][0]
+        self.assertNotIn('ingredients', card)
+        self.assertNotIn('equipment', card)
+        self.assertEqual(set(card['author']), {'id', 'email', 'first_name', 'last_name', 'profile_picture', 'profile_picture_variants'})
+        self.assertEqual([tag['name'] for tag in card['tags']], ['Quick & Easy', 'Vegan'])
+        sql = self.recipe_query(ctx)
+        for column in ('ingredients', 'instructions', 'search_keywords', '"password"'):
+            self.assertNotIn(column, sql)
+
+    def test_fields_restricts_output_and_columns(self):
+        self.make_recipes(2)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.list_url, {'fields': 'id,title,bogus'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title'})
+        self.assertNotIn('description', self.recipe_query(ctx))
+        # No tags requested, so no tags prefetch: validator + COUNT + recipes
+        self.assertEqual(len(ctx.captured_queries), 3)
+
+    def test_expand_adds_heavy_fields_and_full_author(self):
+        self.make_recipes(1)
+        card = self.client.get(self.list_url, {'expand': 'ingredients,equipment,author'}).data['results'][0]
+        self.assertEqual(card['ingredients'], [{'item': 'flour', 'quantity': '2 cups'}])
+        self.assertEqual(len(card['equipment']), 2)
+        self.assertIn('bio', card['author'])
+
+    def test_detail_is_full_unless_narrowed(self):
+        recipe = self.make_recipes(1)[0]
+        url = f'{self.list_url}{recipe.slug}/'
+        self.assertIn('instructions', self.client.get(url).data)
+        self.assertEqual(set(self.client.get(url, {'fields': 'slug,difficulty'}).data), {'slug', 'difficulty'})
+
+    def test_pantry_coverage_with_narrow_fields(self):
+        self.make_recipes(1)
+        response = self.client.get(f'{self.list_url}pantry/', {'have': 'flour', 'fields': 'title,coverage'})
+        self.assertEqual(response.data['results'][0], {'title': 'Recipe 0', 'coverage': 1.0})
+
+
+class ValuesReaderTests(RecipeTestMixin, TestCase):
+    """
+    The .values() read path renders exactly what the serializers render.
+    """
+
+    def assert_parity(self, serializer_class, params=None):
+        request = Request(APIRequestFactory().get(self.list_url, params or {}))
+        selection = field_selection(serializer_class, request.query_params)
+        reader = values_reader(serializer_class, selection)
+        self.assertIsNotNone(reader)
+        queryset = Recipe.objects.order_by('-created_at', '-id')
+        expected = serializer_class(queryset, many=True, context={'request': request, 'field_selection': selection}).data
+        self.assertEqual(json.dumps(reader.render(reader.values(queryset), request)), json.dumps(expected))
+
+    def test_parity(self):
+        with self.assertLogs('recipes.images', 'WARNING'): # no such file to render variants from
+            recipes = self.make_recipes(3, description='Tasty', main_image='recipe_images/soup.jpg')
+        Recipe.objects.update(main_image_variants={'source': 'recipe_images/soup.jpg', 'card': {'webp': 'recipe_images/variants/card/ab.webp'}})
+        recipes[0].tags.clear()
+        self.assert_parity(RecipeSerializer)
+        self.assert_parity(RecipeListSerializer)
+        self.assert_parity(RecipeListSerializer, {'expand': 'author,equipment,instructions'})
+        self.assert_parity(RecipeListSerializer, {'fields': 'title,main_image'})
+
+    def test_list_builds_no_model_instances(self):
+        self.make_recipes(3)
+        with mock.patch.object(Recipe, 'from_db', side_effect=AssertionError('model instantiated')):
+            response = self.client.get(self.list_url, {'expand': 'equipment'})
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(len(response.data['results'][0]['equipment']), 2)
+        cursor_page = self.client.get(self.list_url, {'cursor': '', 'fields': 'title'})
+        self.assertEqual(cursor_page.status_code, 200)
+
+    def test_unsupported_serializers_fall_back(self):
+        from .serializers import PantryRecipeSerializer
+        self.assertIsNone(values_reader(PantryRecipeSerializer))
+
+    def test_bench_serializers_command(self):
+        out = StringIO()
+        call_command('bench_serializers', seed=12, sizes=[10], repeat=1, stdout=out)
+        self.assertIn('list', out.getvalue())
+
+
+class ExportTests(RecipeTestMixin, TestCase):
+    """
+    Streaming NDJSON/CSV export (endpoint and export_recipes command).
+    """
+    export_url = '/api/recipes/recipes/export/'
+
+    def body(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_endpoint(self):
+        self.make_recipes(3)
+        response = self.client.get(self.export_url)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in self.body(response).splitlines()]
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[0]['tags'], ['Quick & Easy', 'Vegan'])
+        self.assertEqual(lines[0]['equipment'], ['Whisk (Balloon)', 'Wok'])
+        self.assertEqual(lines[0]['author_email'], 'cook@example.com')
+        self.assertEqual(lines[0]['ingredients'], [{'item': 'flour', 'quantity': '2 cups'}])
+
+    def test_csv_respects_filters(self):
+        self.make_recipes(2)
+        self.make_recipes(1, difficulty='Hard')
+        response = self.client.get(self.export_url, {'format': 'csv', 'difficulty': 'Hard'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(StringIO(self.body(response))))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(json.loads(rows[0]['tags']), ['Quick & Easy', 'Vegan'])
+
+    def test_streams_in_chunks(self):
+        self.make_recipes(5)
+        with CaptureQueriesContext(connection) as ctx:
+            rows = list(iter_export_rows(Recipe.objects.order_by('id'), chunk_size=2))
+        self.assertEqual(len(rows), 5)
+        # One streamed SELECT plus a tags and an equipment lookup per chunk of 2
+        self.assertEqual(len(ctx.captured_queries), 1 + 2 * 3)
+
+    def test_csv_export_round_trips_through_import(self):
+        self.make_recipes(2, description='Rich')
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'recipes.csv'
+            call_command('export_recipes', str(path), export_format='csv', chunk_size=1, stdout=StringIO())
+            Recipe.objects.all().delete()
+            call_command('import_recipes', str(path), author=self.user.email, stdout=StringIO())
+        recipe = Recipe.objects.order_by('title').first()
+        self.assertEqual(recipe.description, 'Rich')
+        self.assertEqual(recipe.ingredients, [{'item': 'flour', 'quantity': '2 cups'}])
+        self.assertEqual(sorted(recipe.tags.values_list('name', flat=True)), ['Quick & Easy', 'Vegan'])
+
+
+class AsyncReadViewTests(RecipeTestMixin, TestCase):
+    """
+    The async (ASGI) mirrors return the same bodies as the sync endpoints.
+    """
+    async_url = '/api/recipes/async/recipes/'
+
+    def setUp(self):
+        super().setUp()
+        self.async_client = AsyncClient()
+
+    def body(self, response):
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        # Pagination links differ only in the path prefix
+        for key in ('next', 'previous'):
+            if isinstance(data, dict) and data.get(key):
+                data[key] = data[key].replace('/async/', '/')
+        return data
+
+    async def get_async(self, url, params=None, **headers):
+        return await self.async_client.get(url, params or {}, headers=headers)
+
+    def assert_parity(self, params=None):
+        expected = self.body(self.client.get(self.list_url, params or {}))
+        actual = self.body(async_to_sync(self.get_async)(self.async_url, params))
+        self.assertEqual(actual, expected)
+
+    def test_list_parity(self):
+        self.make_recipes(3, description='Tasty')
+        self.make_recipes(1, difficulty='Hard')
+        self.assert_parity()
+        self.assert_parity({'difficulty': 'Hard'})
+        self.assert_parity({'fields': 'title,tags', 'ordering': 'title'})
+        self.assert_parity({'expand': 'author,equipment'})
+
+    def test_keyset_pages(self):
+        self.make_recipes(12)
+        first = self.body(async_to_sync(self.get_async)(self.async_url, {'cursor': ''}))
+        self.assertEqual(len(first['results']), 10)
+        cursor = parse_qs(urlparse(first['next']).query)['cursor'][0]
+        second = self.body(async_to_sync(self.get_async)(self.async_url, {'cursor': cursor}))
+        self.assertEqual(len(second['results']), 2)
+        self.assert_parity({'cursor': cursor})
+
+    def test_detail_and_not_found(self):
+        recipe = self.make_recipes(1)[0]
+        url = f'{self.list_url}{recipe.slug}/'
+        response = async_to_sync(self.get_async)(f'{self.async_url}{recipe.slug}/')
+        self.assertEqual(self.body(response), self.body(self.client.get(url)))
+        self.assertNotIn('Last-Modified', response) # ETag only, like the sync view
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.tags.set([Tag.objects.create(name='Autumn')])
+        since = http_date(timezone.now().timestamp() + 60)
+        changed = async_to_sync(self.get_async)(f'{self.async_url}{recipe.slug}/', If_Modified_Since=since)
+        self.assertEqual(changed.status_code, 200)
+        missing = async_to_sync(self.get_async)(f'{self.async_url}nope/')
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(json.loads(missing.content), {'detail': 'Not found.'})
+        bad_page = async_to_sync(self.get_async)(self.async_url, {'page': 99})
+        self.assertEqual(bad_page.status_code, 404)
+
+    def test_conditional_and_cached(self):
+        self.make_recipes(2)
+        first = async_to_sync(self.get_async)(self.async_url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(async_to_sync(self.get_async)(self.async_url)['X-Cache'], 'HIT')
+        not_modified = async_to_sync(self.get_async)(self.async_url, If_None_Match=first['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_tags(self):
+        self.make_recipes(1)
+        expected = self.body(self.client.get('/api/recipes/tags/'))
+        self.assertEqual(self.body(async_to_sync(self.get_async)('/api/recipes/async/tags/')), expected)
+
+    @skipUnlessDBFeature('test_db_allows_multiple_connections') # the WSGI scenario runs in threads
+    def test_bench_asgi_command(self):
+        self.make_recipes(2)
+        out = StringIO()
+        call_command('bench_asgi', requests=4, concurrency=[2], stdout=out)
+        self.assertIn('asgi async view', out.getvalue())
+
+
+class ImageVariantTests(RecipeTestMixin, TestCase):
+    """
+    Uploaded images get resized WebP/JPEG variants under content-hash names.
+    """
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def upload(self, name='dish.png', size=(1200, 900), mode='RGBA'):
+        buffer = BytesIO()
+        Image.new(mode, size, (200, 80, 20, 255) if mode == 'RGBA' else (200, 80, 20)).save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def test_recipe_upload_renders_variants(self):
+        recipe = self.make_recipes(1)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.main_image = self.upload()
+            recipe.save()
+        recipe.refresh_from_db()
+        variants = recipe.main_image_variants
+        self.assertEqual(variants['source'], recipe.main_image.name)
+        self.assertEqual(set(variants) - {'source'}, {'thumbnail', 'card', 'full'})
+        with default_storage.open(variants['card']['webp']) as handle, Image.open(handle) as card:
+            self.assertEqual((card.format, card.size), ('WEBP', (640, 480)))
+        with default_storage.open(variants['thumbnail']['jpeg']) as handle, Image.open(handle) as thumbnail:
+            self.assertEqual((thumbnail.format, thumbnail.size), ('JPEG', (200, 200)))
+        # Never upscaled; content-hash names
+        with default_storage.open(variants['full']['jpeg']) as handle, Image.open(handle) as full:
+            self.assertEqual(full.size, (1200, 900))
+        self.assertRegex(variants['full']['webp'], r'^recipe_images/variants/full/[0-9a-f]{16}\.webp$')
+
+        data = self.client.get(f'{self.list_url}{recipe.slug}/').data
+        self.assertEqual(data['main_image_variants']['card']['webp'], f"http://testserver/media/{variants['card']['webp']}")
+        listed = self.client.get(self.list_url).data['results'][0]
+        self.assertEqual(listed['main_image_variants'], data['main_image_variants'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.main_image = None
+            recipe.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.main_image_variants, {})
+
+    def test_identical_images_share_files(self):
+        first, second = self.make_recipes(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            first.main_image = self.upload('a.png', mode='RGB')
+            first.save()
+            second.main_image = self.upload('a.png', mode='RGB')
+            second.save()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertNotEqual(first.main_image.name, second.main_image.name)
+        # Same pixels, same hash: the second render reuses the files
+        self.assertEqual(first.main_image_variants['card'], second.main_image_variants['card'])
+
+    def test_profile_picture_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile_picture = self.upload('me.png', size=(300, 500))
+            self.user.save()
+        self.user.refresh_from_db()
+        with default_storage.open(self.user.profile_picture_variants['card']['jpeg']) as handle, Image.open(handle) as card:
+            self.assertEqual(card.size, (256, 256))
+        self.make_recipes(1)
+        author = self.client.get(self.list_url).data['results'][0]['author']
+        self.assertIn('thumbnail', author['profile_picture_variants'])
+
+    def test_unreadable_image_is_skipped(self):
+        recipe = self.make_recipes(1)[0]
+        with self.assertLogs('recipes.images', 'WARNING'):
+            recipe.main_image = SimpleUploadedFile('broken.jpg', b'not an image')
+            recipe.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.main_image_variants, {})
+
+    def test_render_image_variants_command(self):
+        recipe = self.make_recipes(1)[0]
+        recipe.main_image = self.upload()
+        recipe.save()
+        Recipe.objects.update(main_image_variants={}) # as if uploaded before variants existed
+        out = StringIO()
+        call_command('render_image_variants', stdout=out)
+        self.assertIn('Recipe.main_image: 1 rendered, 0 up to date', out.getvalue())
+        recipe.refresh_from_db()
+        self.assertIn('full', recipe.main_image_variants)
+
+
+job_calls = []
+
+
+@task('tests.record')
+def record_call(value, fail_times=0):
+    job_calls.append(value)
+    if job_calls.count(value) <= fail_times:
+        raise RuntimeError(f'failing {value}')
+
+
+class JobQueueTests(RecipeTestMixin, TestCase):
+    """
+    Background jobs: durable queue with idempotency keys, retries and leases,
+    and the in-process thread mode.
+    """
+
+    def setUp(self):
+        super().setUp()
+        job_calls.clear()
+        self.enterContext(override_settings(JOB_QUEUE_MODE='database'))
+
+    def run_worker(self):
+        out = StringIO()
+        with mock.patch('recipes.jobs.logger'): # expected failures are asserted on the Job rows
+            call_command('run_jobs', once=True, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_write_queues_one_search_refresh(self):
+        recipe = self.make_recipes(1)[0]
+        Job.objects.all().delete()
+        recipe.title = 'Pumpkin soup'
+        recipe.save()
+        recipe.tags.set([Tag.objects.create(name='Autumn')])
+        recipe.equipment.clear()
+        # post_save and both m2m signals share the recipe's idempotency key
+        self.assertEqual(list(Job.objects.values_list('name', 'key')), [('recipes.refresh_search_documents', f'search:{recipe.pk}')])
+        self.assertNotIn('Autumn', Recipe.objects.get(pk=recipe.pk).search_keywords)
+        self.assertIn('1 jobs done', self.run_worker())
+        self.assertIn('Autumn', Recipe.objects.get(pk=recipe.pk).search_keywords)
+        self.assertFalse(Job.objects.exists())
+
+    def test_search_refresh_invalidates_cached_searches(self):
+        recipe = self.make_recipes(1)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.ingredients = [{'item': 'garlic', 'quantity': '2 cloves'}]
+            recipe.save()
+        response = self.client.get(self.list_url, {'search': 'garlic'})
+        self.assertEqual((response['X-Cache'], response.data['results']), ('MISS', []))
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_worker()
+        response = self.client.get(self.list_url, {'search': 'garlic'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual([r['slug'] for r in response.data['results']], [recipe.slug])
+
+    def test_retries_with_backoff_then_fails(self):
+        enqueue('tests.record', {'value': 'a', 'fail_times': 1})
+        self.run_worker()
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn('failing a', job.last_error)
+        self.assertGreater(job.run_after, timezone.now())
+        self.run_worker() # not due yet
+        self.assertEqual(job_calls, ['a'])
+        Job.objects.update(run_after=timezone.now())
+        self.run_worker()
+        self.assertEqual(job_calls, ['a', 'a'])
+        self.assertFalse(Job.objects.exists())
+
+        enqueue('tests.record', {'value': 'b', 'fail_times': 5})
+        Job.objects.update(max_attempts=1)
+        self.run_worker()
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+
+    def test_idempotency_key_only_dedupes_queued_jobs(self):
+        enqueue('tests.record', {'value': 'a'}, key='k')
+        enqueue('tests.record', {'value': 'a'}, key='k')
+        self.assertEqual(Job.objects.count(), 1)
+        Job.objects.update(status=Job.RUNNING, locked_at=timezone.now() - timedelta(hours=1))
+        # A job that is already running may have read stale data: queue another
+        enqueue('tests.record', {'value': 'a'}, key='k')
+        self.assertEqual(Job.objects.count(), 2)
+        # The abandoned one is superseded by the queued duplicate when its lease expires
+        self.assertEqual(requeue_stale(timedelta(minutes=5)), 0)
+        self.run_worker()
+        self.assertEqual(job_calls, ['a'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_stale_jobs_are_requeued(self):
+        enqueue('tests.record', {'value': 'a'})
+        Job.objects.update(status=Job.RUNNING, locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(timedelta(minutes=5)), 1)
+        self.run_worker()
+        self.assertEqual(job_calls, ['a'])
+
+    @override_settings(JOB_QUEUE_MODE='thread')
+    def test_thread_mode_runs_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            enqueue('tests.record', {'value': 'a'}, key='k')
+            enqueue('tests.record', {'value': 'a'}, key='k')
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(job_calls, [])
+        with mock.patch('recipes.jobs.connection'): # the pool thread must not close the test connection
+            callbacks[0]()
+            jobs._executor.shutdown(wait=True)
+            jobs._executor = None
+        self.assertEqual(job_calls, ['a'])
+
+    @override_settings(JOB_QUEUE_MODE='thread')
+    def test_thread_mode_rollback_releases_the_key(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            try:
+                with transaction.atomic():
+                    enqueue('tests.record', {'value': 'a'}, key='k')
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+            self.assertNotIn(('default', 'k'), jobs._pending_keys)
+            enqueue('tests.record', {'value': 'b'}, key='k')
+        self.assertEqual(len(callbacks), 1)
+        with mock.patch('recipes.jobs.connection'):
+            callbacks[0]()
+            jobs._executor.shutdown(wait=True)
+            jobs._executor = None
+        self.assertEqual(job_calls, ['b'])
+
+
+class BenchmarkSuiteTests(RecipeTestMixin, TestCase):
+    """
+    Smoke tests of the benchmark commands (generate_bench_data, bench_api,
+    bench_connections) on a tiny dataset.
+    """
+
+    def test_generated_data_is_complete_and_reproducible(self):
+        call_command('generate_bench_data', recipes=30, batch_size=12, stdout=StringIO())
+        recipes = Recipe.objects.filter(slug__contains='-b42-')
+        self.assertEqual(recipes.count(), 30)
+        recipe = recipes.get(slug__endswith='-b42-0')
+        self.assertTrue(recipe.tags.exists() and recipe.equipment.exists())
+        self.assertTrue(all(set(item) == {'item', 'quantity'} for item in recipe.ingredients))
+        # Derived data that signals would have maintained
+        self.assertEqual(recipe.ingredient_count, len(recipe.ingredients))
+        self.assertEqual(RecipeIngredient.objects.filter(recipe=recipe).count(), recipe.ingredient_count)
+        self.assertIn(recipe.ingredients[0]['item'], recipe.search_keywords)
+        self.assertEqual(recipe.author.recipe_count, recipe.author.recipes.count())
+        # Dates are spread over --days (730 by default), not stamped at insert time
+        span = recipes.aggregate(first=Min('created_at'), last=Max('created_at'))
+        self.assertGreater(span['last'] - span['first'], timedelta(days=30))
+        self.assertFalse(recipes.exclude(updated_at=F('created_at')).exists())
+
+        first = list(recipes.order_by('slug').values_list('title', 'ingredients'))
+        call_command('generate_bench_data', recipes=30, label='again', stdout=StringIO())
+        again = Recipe.objects.filter(slug__contains='-again-').order_by('slug').values_list('title', 'ingredients')
+        self.assertEqual(sorted(first), sorted(again))
+
+        with self.assertRaises(CommandError):
+            call_command('generate_bench_data', recipes=30, stdout=StringIO())
+
+    def test_bench_api_reports_every_scenario(self):
+        call_command('generate_bench_data', recipes=25, stdout=StringIO())
+        out = StringIO()
+        call_command('bench_api', requests=3, json=True, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['recipes'], 25) # created recipes are cleaned up
+        self.assertEqual(set(report['scenarios']), {'feed-cursor', 'feed-offset', 'search', 'filter', 'detail', 'create', 'update'})
+        for row in report['scenarios'].values():
+            self.assertEqual(row['requests'], 3)
+            self.assertGreater(row['mean_queries'], 0)
+
+    def test_bench_connections_reports_each_mode(self):
+        out = StringIO()
+        call_command('bench_connections', requests=5, stdout=out)
+        output = out.getvalue()
+        for mode in ('per-request', 'persistent', 'persistent+checks'):
+            self.assertRegex(output, rf'\n{re.escape(mode)} +\d')
+        if connection.vendor != 'postgresql':
+            self.assertIn('pool               skipped', output)
+
+
+class QueryPlanTests(RecipeTestMixin, TestCase):
+    """
+    The feed filters are served by the composite indexes (explain_queries).
+    """
+
+    def test_title_prefix_filter(self):
+        self.make_recipes(2)
+        Recipe.objects.create(author=self.user, title='Pumpkin soup', ingredients=[], instructions=['boil'])
+        response = self.client.get(self.list_url, {'title__istartswith': 'pump'})
+        self.assertEqual([row['title'] for row in response.json()['results']], ['Pumpkin soup'])
+
+    @skipUnlessDBFeature('supports_explaining_query_execution')
+    def test_explain_queries_reports_plans(self):
+        self.make_recipes(3)
+        out = StringIO()
+        call_command('explain_queries', verbose_plans=True, stdout=out)
+        output = out.getvalue()
+        self.assertRegex(output, r'distinct queries explained, \d+ with sequential scans')
+        if connection.vendor == 'sqlite':
+            self.assertIn('recipe_author_created_idx (author_id=?)', output)
+            self.assertIn('recipe_difficulty_created_idx (difficulty=?)', output)
+
+
+class FacetTests(RecipeTestMixin, TestCase):
+    """
+    FacetCount follows every write, and the facets endpoint reads it (or
+    counts the filtered recipes in one query).
+    """
+    facets_url = '/api/recipes/recipes/facets/'
+
+    def assertCountsMatch(self):
+        stored = stored_facet_counts()
+        self.assertEqual(stored, facet_counts(Recipe.objects.all()))
+        return stored
+
+    def test_counts_follow_writes(self):
+        first, second = self.make_recipes(2, prep_time_minutes=10, cook_time_minutes=15)
+        vegan = Tag.objects.get(name='Vegan')
+        stored = self.assertCountsMatch()
+        self.assertEqual(stored[FacetCount.TAG, tag_value(vegan.pk)], 2)
+        self.assertEqual(stored[FacetCount.TIME, '15-30'], 2)
+
+        first.difficulty = 'Hard'
+        first.cook_time_minutes = 90
+        first.save()
+        second.tags.remove(vegan)
+        stored = self.assertCountsMatch()
+        self.assertEqual((stored[FacetCount.DIFFICULTY, 'Hard'], stored[FacetCount.TIME, '60-plus']), (1, 1))
+
+        vegan.recipes.add(second)
+        vegan.recipes.clear()
+        first.tags.clear()
+        self.assertCountsMatch()
+        second.delete()
+        vegan.delete()
+        stored = self.assertCountsMatch()
+        self.assertEqual(sum(stored.values()), 2) # first: difficulty and time bucket
+
+    def test_removing_unassigned_tags_changes_nothing(self):
+        self.make_recipes(1)
+        stew = Recipe.objects.create(author=self.user, title='Stew', ingredients=[], instructions=['simmer'])
+        vegan, quick = Tag.objects.get(name='Vegan'), Tag.objects.get(name='Quick & Easy')
+        stew.tags.add(quick)
+        stew.tags.remove(vegan, quick)
+        vegan.recipes.remove(stew)
+        stored = self.assertCountsMatch()
+        self.assertEqual((stored[FacetCount.TAG, tag_value(vegan.pk)], stored[FacetCount.TAG, tag_value(quick.pk)]), (1, 1))
+
+    def test_unfiltered_facets_read_the_table(self):
+        self.make_recipes(2)
+        Recipe.objects.create(author=self.user, title='Stew', difficulty='Hard', ingredients=[], instructions=['simmer'], prep_time_minutes=5)
+        with self.assertNumQueries(2): # FacetCount, then the tags' slugs and names
+            response = self.client.get(self.facets_url)
+        data = response.json()
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(data['tags'], [
+            {'slug': 'quick-easy', 'name': 'Quick & Easy', 'count': 2},
+            {'slug': 'vegan', 'name': 'Vegan', 'count': 2},
+        ])
+        self.assertEqual(data['difficulty'], [{'value': 'Easy', 'count': 0}, {'value': 'Medium', 'count': 2}, {'value': 'Hard', 'count': 1}])
+        self.assertEqual(data['time'][0], {'value': 'under-15', 'count': 1})
+
+    def test_filtered_facets_count_the_matches(self):
+        self.make_recipes(2)
+        stew = Recipe.objects.create(author=self.user, title='Stew', difficulty='Hard', ingredients=[], instructions=['simmer'])
+        stew.tags.add(Tag.objects.get(name='Vegan'))
+        with self.assertNumQueries(2): # one aggregate, then the tags
+            response = self.client.get(self.facets_url, {'tags__slug': 'vegan', 'difficulty': 'Hard'})
+        data = response.json()
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['tags'], [{'slug': 'vegan', 'name': 'Vegan', 'count': 1}])
+        self.assertEqual(self.client.get(self.facets_url, {'search': 'stew'}).json()['count'], 1)
+        # Ordering and paging don't filter
+        self.assertEqual(self.client.get(self.facets_url, {'ordering': 'title'}).json()['count'], 3)
+
+    def test_bulk_import_and_recount(self):
+        Tag.objects.create(name='Soup')
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'recipes.csv'
+            path.write_text('title,ingredients,tags,difficulty\nSoup,"[\'water\']",Soup,Easy\nStew,"[\'beef\']",Soup,Hard\n')
+            call_command('import_recipes', str(path), author=self.user.email, stdout=StringIO())
+        stored = self.assertCountsMatch()
+        self.assertEqual(stored[FacetCount.TAG, tag_value(Tag.objects.get(name='Soup').pk)], 2)
+
+        FacetCount.objects.filter(facet=FacetCount.DIFFICULTY, value='Easy').update(count=9)
+        FacetCount.objects.filter(facet=FacetCount.DIFFICULTY, value='Hard').delete()
+        out = StringIO()
+        call_command('recount_facets', dry_run=True, stdout=out)
+        self.assertIn('2 facet counts drifted', out.getvalue())
+        call_command('recount_facets', stdout=StringIO())
+        self.assertCountsMatch()
+
+
+class RecipeRelationFilterTests(RecipeTestMixin, TestCase):
+    """
+    ?tags= / ?equipment= (all: or any:) and ?exclude= match through EXISTS
+    subqueries, so recipes are never repeated.
+    """
+
+    def setUp(self):
+        super().setUp()
+        vegan, quick, spicy = (Tag.objects.create(name=name) for name in ('Vegan', 'Quick', 'Spicy'))
+        wok = Equipment.objects.create(name='Wok')
+        self.curry, self.salad, self.stir_fry = (
+            Recipe.objects.create(author=self.user, title=title, ingredients=[], instructions=['cook'])
+            for title in ('Curry', 'Salad', 'Stir fry')
+        )
+        self.curry.tags.set([vegan, spicy])
+        self.salad.tags.set([vegan, quick])
+        self.stir_fry.tags.set([vegan, quick, spicy])
+        self.stir_fry.equipment.set([wok])
+
+    def titles(self, **params):
+        response = self.client.get(self.list_url, {'ordering': 'title', **params})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        titles = [row['title'] for row in data['results']]
+        self.assertEqual(data['count'], len(titles))
+        return titles
+
+    def test_all_any_and_exclude(self):
+        self.assertEqual(self.titles(tags='all:vegan,quick'), ['Salad', 'Stir fry'])
+        self.assertEqual(self.titles(tags='vegan,quick,spicy'), ['Stir fry'])
+        self.assertEqual(self.titles(tags='any:quick,spicy'), ['Curry', 'Salad', 'Stir fry'])
+        self.assertEqual(self.titles(tags='all:vegan,missing'), [])
+        self.assertEqual(self.titles(tags='any:vegan', exclude='quick'), ['Curry'])
+        self.assertEqual(self.titles(exclude='wok'), ['Curry', 'Salad'])
+        self.assertEqual(self.titles(equipment='any:wok', tags='all:spicy'), ['Stir fry'])
+
+    def test_filters_compile_to_exists(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.titles(tags='all:vegan,quick,spicy', exclude='wok')
+        listing = ctx.captured_queries[-1]['sql']
+        self.assertIn('EXISTS', listing)
+        self.assertNotIn('DISTINCT', listing)
+
+    def test_unknown_match_mode(self):
+        response = self.client.get(self.list_url, {'tags': 'some:vegan'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tags', response.json())
+
+    def test_facets_follow_the_filters(self):
+        data = self.client.get('/api/recipes/recipes/facets/', {'tags': 'all:vegan,spicy'}).json()
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(data['tags'][0], {'slug': 'spicy', 'name': 'Spicy', 'count': 2})
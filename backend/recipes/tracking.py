@@ -0,0 +1,94 @@
+from copy import deepcopy
+
+
+def _snapshot_value(value):
+    # JSONField values are mutable; copy them so in-place edits are detected
+    return deepcopy(value) if isinstance(value, (list, dict)) else value
+
+
+class TrackedFieldsMixin:
+    """
+    Remembers the concrete field values a model instance was loaded with, so
+    code can ask what changed without re-reading the row, and saves of
+    existing rows only `UPDATE ... SET` the changed columns (plus auto_now
+    fields such as updated_at).
+
+    `tracked_derived_fields` maps a field that a pre_save receiver derives to
+    the fields it is derived from (e.g. {'slug': ['title']}), so the derived
+    column is written whenever its source changes.
+    """
+    tracked_derived_fields = {}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_loaded_values()
+        return instance
+
+    def _snapshot_loaded_values(self, fields=None):
+        """
+        Records the current values as loaded: of every loaded field, or only
+        of `fields` (names or attnames) so other pending edits stay changed.
+        """
+        snapshot = {
+            field.attname: _snapshot_value(self.__dict__[field.attname])
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__ and (fields is None or field.name in fields or field.attname in fields)
+        }
+        if fields is None or getattr(self, '_loaded_values', None) is None:
+            self._loaded_values = snapshot
+        else:
+            self._loaded_values.update(snapshot)
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # Deferred fields are loaded through refresh_from_db(fields=[attname])
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._snapshot_loaded_values(None if fields is None else set(fields))
+
+    def changed_fields(self):
+        """
+        Returns the names of concrete fields whose value differs from the one
+        loaded from the database. Unsaved instances report every field.
+        Deferred fields count as changed once they have been assigned.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if self._state.adding or loaded is None:
+            return {field.name for field in self._meta.concrete_fields}
+        changed = set()
+        for field in self._meta.concrete_fields:
+            if field.attname not in self.__dict__:
+                continue # still deferred, so untouched
+            if field.attname not in loaded or loaded[field.attname] != self.__dict__[field.attname]:
+                changed.add(field.name)
+        return changed
+
+    def has_changed(self, field_name):
+        return field_name in self.changed_fields()
+
+    def initial_value(self, field_name):
+        """
+        Returns the value `field_name` was loaded with (None if not loaded).
+        """
+        field = self._meta.get_field(field_name)
+        return getattr(self, '_loaded_values', {}).get(field.attname)
+
+    def save(self, *args, **kwargs):
+        if (
+            not args
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+            and not self._state.adding
+            and getattr(self, '_loaded_values', None) is not None
+        ):
+            changed = self.changed_fields()
+            for derived, sources in self.tracked_derived_fields.items():
+                if changed.intersection(sources) or not getattr(self, derived):
+                    changed.add(derived)
+            changed.update(
+                field.name for field in self._meta.concrete_fields
+                if getattr(field, 'auto_now', False)
+            )
+            changed.discard(self._meta.pk.name)
+            kwargs['update_fields'] = changed
+        super().save(*args, **kwargs)
+        self._snapshot_loaded_values()
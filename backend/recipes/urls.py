@@ -2,6 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 # Removed CategoryViewSet import as it no longer exists
 from .views import TagViewSet, EquipmentViewSet, RecipeViewSet
+from . import async_views
 
 # Create a router and register our viewsets with it.
 router = DefaultRouter()
@@ -12,5 +13,10 @@ router.register(r'recipes', RecipeViewSet)
 
 # The API URLs are now determined automatically by the router.
 urlpatterns = [
+    # Async (ASGI) read-only mirrors of the list/detail endpoints
+    path('async/recipes/', async_views.recipe_list, name='async-recipe-list'),
+    path('async/recipes/<slug:slug>/', async_views.recipe_detail, name='async-recipe-detail'),
+    path('async/tags/', async_views.tag_list, name='async-tag-list'),
+    path('async/equipment/', async_views.equipment_list, name='async-equipment-list'),
     path('', include(router.urls)),
 ]
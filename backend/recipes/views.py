@@ -1,10 +1,27 @@
 from rest_framework import viewsets, permissions, filters
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Recipe, Tag, Equipment # Removed Category
-from .serializers import RecipeSerializer, TagSerializer, EquipmentSerializer
+from .serializers import (
+    RecipeSerializer, RecipeListSerializer, TagSerializer, EquipmentSerializer, PantryRecipeSerializer,
+    field_selection,
+)
+from .ingredients import pantry_queryset
 from .permissions import IsAuthorOrReadOnly
+from .cache import CachedResponseMixin
+from .conditional import ConditionalGetMixin
+from .facets import facet_counts, facet_summary, stored_facet_counts
+from .filters import RecipeRelationFilter
+from .export import EXPORT_ENCODERS, CSVExportRenderer, NDJSONExportRenderer, iter_export_rows
+from .pagination import RecipePagination
+from .querysets import only_serialized_columns, optimize_for_serializer
+from .readers import ValuesListMixin
+from .search import RecipeSearchFilter
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint that allows tags to be viewed.
     This now serves both original 'categories' and 'tags'.
@@ -13,8 +30,9 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = TagSerializer
     permission_classes = [permissions.AllowAny] # Tags are public
     lookup_field = 'slug' # Allow looking up by slug
+    cache_namespaces = ('tags',)
 
-class EquipmentViewSet(viewsets.ReadOnlyModelViewSet):
+class EquipmentViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint that allows equipment to be viewed.
     """
@@ -22,8 +40,9 @@ class EquipmentViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = EquipmentSerializer
     permission_classes = [permissions.AllowAny] # Equipment is public
     lookup_field = 'slug'
+    cache_namespaces = ('equipment',)
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin, CachedResponseMixin, ValuesListMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows recipes to be created, viewed, edited or deleted.
     """
@@ -31,12 +50,19 @@ class RecipeViewSet(viewsets.ModelViewSet):
     serializer_class = RecipeSerializer
     permission_classes = [IsAuthorOrReadOnly]
     lookup_field = 'slug'
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = RecipePagination # ?page= by default, keyset pages with ?cursor=
+    # Responses embed tags, equipment and the author profile, so writes to any of them invalidate
+    cache_namespaces = ('recipes', 'tags', 'equipment', 'users')
+    # RecipeSearchFilter (?search= over the denormalized search document) runs last
+    # so its relevance ordering can take precedence over the default ordering when
+    # no explicit ?ordering= is given.
+    # RecipeRelationFilter adds ?tags=all:/any:, ?equipment= and ?exclude=
+    filter_backends = [DjangoFilterBackend, RecipeRelationFilter, filters.OrderingFilter, RecipeSearchFilter]
     filterset_fields = {
         'tags__slug': ['exact'], # Filter by tag slug (now includes former categories)
         'difficulty': ['exact'],
+        'title': ['istartswith'], # ?title__istartswith= (trigram-indexed on PostgreSQL)
     }
-    search_fields = ['title', 'description', 'ingredients__item', 'tags__name', 'equipment__name']
     ordering_fields = ['created_at', 'title', 'difficulty']
     ordering = ['-created_at'] # Default ordering
 
@@ -59,10 +85,106 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """
         Optionally restricts the returned recipes to a given user,
         by filtering against a `author_id` query parameter in the URL.
+        Related objects rendered by the serializer are joined/prefetched
+        up front so a page costs a constant number of queries.
         """
-        queryset = super().get_queryset()
+        queryset = optimize_for_serializer(super().get_queryset(), self.get_serializer_class(), self.get_field_selection())
         author_id = self.request.query_params.get('author_id', None)
         if author_id is not None:
             queryset = queryset.filter(author__id=author_id)
         return queryset
 
+    def filter_queryset(self, queryset):
+        """
+        On reads, fetches only the columns the (sparse) representation renders.
+        """
+        queryset = super().filter_queryset(queryset)
+        if self.request.method in permissions.SAFE_METHODS:
+            queryset = only_serialized_columns(queryset, self.get_serializer_class(), self.get_field_selection())
+        return queryset
+
+    def filter_params(self):
+        """
+        The query parameters that narrow the list (as opposed to ordering,
+        paging and field selection).
+        """
+        params = {'author_id', RecipeSearchFilter.search_param, *RecipeRelationFilter.query_params()}
+        for field, lookups in self.filterset_fields.items():
+            params.update(field if lookup == 'exact' else f'{field}__{lookup}' for lookup in lookups)
+        return params
+
+    def get_serializer_class(self):
+        if self.action == 'pantry':
+            return PantryRecipeSerializer
+        if self.action == 'list':
+            return RecipeListSerializer
+        return super().get_serializer_class()
+
+    def get_field_selection(self):
+        """
+        The ?fields= / ?expand= selection for this request's serializer.
+        """
+        return field_selection(self.get_serializer_class(), self.request.query_params)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['field_selection'] = self.get_field_selection()
+        return context
+
+    @action(detail=False, methods=['get'], url_path='pantry')
+    def pantry(self, request):
+        """
+        "What can I make?": `?have=flour,eggs,milk` returns recipes using any of
+        those ingredients, ranked by fewest missing ingredients. `?max_missing=N`
+        drops recipes needing more than N extra ingredients.
+        Other filters (tags, difficulty, search, author_id) still apply.
+        """
+        pantry = [name for name in request.query_params.get('have', '').split(',') if name.strip()]
+        if not pantry:
+            raise ValidationError({'have': 'Provide a comma-separated list of ingredients.'})
+        max_missing = request.query_params.get('max_missing')
+        if max_missing is not None:
+            try:
+                max_missing = int(max_missing)
+            except ValueError:
+                raise ValidationError({'max_missing': 'Must be an integer.'})
+
+        queryset = pantry_queryset(self.filter_queryset(self.get_queryset()), pantry, max_missing=max_missing)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        return Response(self.get_serializer(queryset, many=True).data)
+
+    @action(detail=False, methods=['get'], url_path='facets')
+    def facets(self, request):
+        """
+        Recipe counts per tag, difficulty and total-time bucket for the list
+        filters in the query string (tags, difficulty, search, author_id...).
+        Without filters they are read from the FacetCount table; with filters
+        they are counted over the matching recipes in one query.
+        """
+        return self.cached_response(request, self.facet_response)
+
+    def facet_response(self, request):
+        if self.filter_params().intersection(request.query_params):
+            counts = facet_counts(self.filter_queryset(self.get_queryset()))
+        else:
+            counts = stored_facet_counts()
+        return Response(facet_summary(counts))
+
+    @action(detail=False, methods=['get'], url_path='export', renderer_classes=[NDJSONExportRenderer, CSVExportRenderer])
+    def export(self, request):
+        """
+        Streams every recipe matching the list filters (tags, difficulty,
+        search, author_id, ordering) as NDJSON, or as CSV with `?format=csv`
+        / `Accept: text/csv`, without buffering the result set.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            EXPORT_ENCODERS[renderer.format](iter_export_rows(queryset)),
+            content_type=renderer.media_type,
+        )
+        response['Content-Disposition'] = f'attachment; filename="recipes.{renderer.format}"'
+        return response
@@ -51,6 +51,12 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         null=True,
         help_text="User's profile picture"
     )
+    profile_picture_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text="Resized copies of the profile picture, rendered by recipes.images."
+    )
     bio = models.TextField(
         blank=True,
         help_text="A short biography about the user"
@@ -69,6 +75,9 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
 
     objects = CustomUserManager()
 
+    # Written with queryset updates elsewhere; left out of plain saves
+    externally_maintained_fields = ('recipe_count', 'profile_picture_variants')
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = [] # No additional required fields beyond email for createsuperuser
 
@@ -76,10 +85,28 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         verbose_name = 'user'
         verbose_name_plural = 'users'
         ordering = ['email']
+        indexes = [
+            # The public profile listing (CustomUserViewSet) in its email order
+            models.Index(fields=['email'], condition=models.Q(is_active=True, is_public=True), name='user_public_email_idx'),
+        ]
 
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        """
+        recipe_count is maintained with F() updates by recipes.counters and
+        profile_picture_variants by the recipes.images workers, so a plain
+        save() of an existing user never writes back stale in-memory values.
+        Pass update_fields to set them explicitly.
+        """
+        if not args and kwargs.get('update_fields') is None and not self._state.adding and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.externally_maintained_fields
+            ]
+        super().save(*args, **kwargs)
+
     def get_full_name(self):
         """
         Returns the first_name plus the last_name, with a space in between.
@@ -1,8 +1,10 @@
 from rest_framework import serializers
+from api.instrumentation import MeasuredSerializerMixin
+from recipes.images import ImageVariantsField
 from .models import CustomUser
 from django.contrib.auth import authenticate
 
-class UserRegistrationSerializer(serializers.ModelSerializer):
+class UserRegistrationSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for user registration.
     Handles creating a new CustomUser instance.
@@ -38,7 +40,7 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         )
         return user
 
-class UserLoginSerializer(serializers.Serializer):
+class UserLoginSerializer(MeasuredSerializerMixin, serializers.Serializer):
     """
     Serializer for user login.
     Handles authentication using email and password.
@@ -61,14 +63,16 @@ class UserLoginSerializer(serializers.Serializer):
         data['user'] = user
         return data
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for viewing and updating user profiles
     """
+    profile_picture_variants = ImageVariantsField()
+
     class Meta:
         model = CustomUser
         fields = (
-            'id', 'email', 'first_name', 'last_name', 'profile_picture',
+            'id', 'email', 'first_name', 'last_name', 'profile_picture', 'profile_picture_variants',
             'bio', 'is_public', 'recipe_count', 'date_joined'
         )
         read_only_fields = ('id', 'email', 'recipe_count', 'date_joined') # These fields cannot be updated directly via profile
@@ -91,3 +95,14 @@ class UserProfileSerializer(serializers.ModelSerializer):
 
         instance.save()
         return instance
+
+class UserSummarySerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
+    """
+    Compact, read-only author representation embedded in recipe lists
+    """
+    profile_picture_variants = ImageVariantsField()
+
+    class Meta:
+        model = CustomUser
+        fields = ('id', 'email', 'first_name', 'last_name', 'profile_picture', 'profile_picture_variants')
+        read_only_fields = fields